@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from tf_pwa.cal_angle import (
+    VECTORIZED_KINEMATICS,
+    cal_angle_from_momentum,
+    cal_angle_from_momentum_base,
+    identical_particles_swap_p,
+)
+from tf_pwa.config import temp_config
+from tf_pwa.particle import BaseParticle, DecayChain, DecayGroup
+from tf_pwa.phasespace import PhaseSpaceGenerator
+
+
+def _get_id_swap_data(num=200000):
+    a, b1, b2, c = [BaseParticle(i) for i in ["A", "B1", "B2", "C"]]
+    decs = DecayGroup(DecayChain.from_particles(a, [b1, b2, c]))
+    decs.identical_particles = [["B1", "B2"]]
+    p4 = PhaseSpaceGenerator(3.0, [0.5, 0.5, 0.3]).generate(num)
+    return dict(zip([b1, b2, c], p4)), decs
+
+
+@pytest.mark.benchmark(group="id_swap")
+def test_id_swap_shared(benchmark):
+    p, decs = _get_id_swap_data()
+    benchmark(cal_angle_from_momentum, p, decs)
+
+
+@pytest.mark.benchmark(group="id_swap")
+def test_id_swap_separate(benchmark):
+    p, decs = _get_id_swap_data()
+
+    def f():
+        data = cal_angle_from_momentum_base(p, decs)
+        data["id_swap"] = {
+            k: cal_angle_from_momentum_base(v, decs)
+            for k, v in identical_particles_swap_p(p, decs.identical_particles)
+        }
+        return data
+
+    benchmark(f)
+
+
+@pytest.mark.benchmark(group="kinematics")
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_kinematics_4body(benchmark, vectorized):
+    num = 100000
+    a, b, c, d, e = [BaseParticle(i) for i in ["A", "B", "C", "D", "E"]]
+    decs = DecayGroup(DecayChain.from_particles(a, [b, c, d, e]))
+    p4 = PhaseSpaceGenerator(4.0, [0.5, 0.5, 0.3, 0.3]).generate(num)
+    p = dict(zip([b, c, d, e], p4))
+    with temp_config(VECTORIZED_KINEMATICS, vectorized):
+        # warm up for tracing
+        cal_angle_from_momentum_base(p, decs)
+        benchmark(cal_angle_from_momentum_base, p, decs)
+    benchmark.extra_info["events/s"] = num / benchmark.stats.stats.mean
+
+
+@pytest.mark.benchmark(group="helicity_grid")
+@pytest.mark.parametrize("method", ["momentum", "helicity"])
+def test_helicity_grid_4body(benchmark, method):
+    from tf_pwa.amp import get_decay, get_particle
+    from tf_pwa.data_trans.helicity_angle import HelicityAngle
+
+    a, r, s, b, c, d, e = [
+        get_particle(i, mass=m)
+        for i, m in zip("ARSBCDE", [4.0, 2.5, 1.2, 0.5, 0.4, 0.3, 0.3])
+    ]
+    chain = DecayChain(
+        [get_decay(a, [r, b]), get_decay(r, [s, c]), get_decay(s, [d, e])]
+    )
+    decs = DecayGroup([chain])
+    ha = HelicityAngle(chain)
+    n = 300
+    m, cos_r = np.meshgrid(np.linspace(1.7, 3.4, n), np.linspace(-1, 1, n))
+    ms = ha.get_all_mass({"R": m.ravel()})
+    costheta = [cos_r.ravel(), np.full(n * n, 0.3), np.full(n * n, -0.2)]
+    phi = [np.zeros(n * n), np.full(n * n, 1.0), np.full(n * n, 2.0)]
+    if method == "momentum":
+        f = lambda: cal_angle_from_momentum(
+            ha.build_data(ms, costheta, phi), decs, batch=n * n
+        )
+    else:
+        f = lambda: ha.build_angle(ms, costheta, phi, decs)
+    f()
+    benchmark(f)
+    benchmark.extra_info["events/s"] = n * n / benchmark.stats.stats.mean
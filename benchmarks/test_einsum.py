@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from tf_pwa.einsum import Einsum, einsum
+from tf_pwa.tensorflow_wrapper import tf
+
+# helicity amplitudes of decay chains, A -> (R -> B C) D with the aligned
+# D-matrices of B and C, and A -> (R1 -> (R2 -> B C) D) E
+EXPR = {
+    "4body": (
+        "...aed,...ebc,...,...bB,...cC->...aBCd",
+        [(2, 3, 1), (3, 3, 3), (), (3, 3), (3, 3)],
+    ),
+    "5body": (
+        "...afe,...fgd,...gbc,...,...bB,...cC,...dD->...aBCDe",
+        [(2, 3, 1), (3, 3, 3), (3, 3, 3), (), (3, 3), (3, 3), (3, 3)],
+    ),
+}
+
+
+def _get_args(decay, num=10000):
+    expr, shapes = EXPR[decay]
+    args = [
+        tf.complex(
+            np.random.normal(size=(num,) + i),
+            np.random.normal(size=(num,) + i),
+        )
+        for i in shapes
+    ]
+    return expr, args
+
+
+def _no_cache(expr, *args):
+    return Einsum(expr, [i.shape for i in args])(*args)
+
+
+METHODS = {
+    "plan": einsum,
+    "fused": lambda expr, *args: einsum(expr, *args, fused=True),
+    "no_cache": _no_cache,
+    "tf": tf.einsum,
+}
+
+
+@pytest.mark.benchmark(group="einsum_4body")
+@pytest.mark.parametrize("method", list(METHODS))
+def test_einsum_4body(benchmark, method):
+    expr, args = _get_args("4body")
+    f = METHODS[method]
+    f(expr, *args)
+    benchmark(f, expr, *args)
+
+
+@pytest.mark.benchmark(group="einsum_5body")
+@pytest.mark.parametrize("method", list(METHODS))
+def test_einsum_5body(benchmark, method):
+    expr, args = _get_args("5body")
+    f = METHODS[method]
+    f(expr, *args)
+    benchmark(f, expr, *args)
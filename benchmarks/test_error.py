@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from tf_pwa.amp import variable_scope
+from tf_pwa.tensorflow_wrapper import tf
+from tf_pwa.variable import Variable
+
+
+def _get_quantities(n_params=20, n_vals=200):
+    with variable_scope() as vm:
+        var = [Variable(f"x{i}", value=1.0) for i in range(n_params)]
+    w = tf.constant(np.random.normal(size=(n_vals, n_params)))
+
+    def f():
+        x = tf.stack([i() for i in var])
+        return list(tf.unstack(tf.sin(tf.linalg.matvec(w, x))))
+
+    return vm, f, np.eye(n_params) * 0.01
+
+
+@pytest.mark.benchmark(group="propagate_error")
+def test_error_loop(benchmark):
+    vm, f, err_matrix = _get_quantities()
+
+    def loop():
+        with vm.error_trans(err_matrix) as pt:
+            vals = f()
+        ret = []
+        for i in vals:
+            g = pt.tape.gradient(i, vm.trainable_variables)
+            g = tf.stack(g)
+            ret.append(
+                tf.sqrt(tf.reduce_sum(g * tf.linalg.matvec(err_matrix, g)))
+            )
+        return ret
+
+    benchmark(loop)
+
+
+@pytest.mark.benchmark(group="propagate_error")
+@pytest.mark.parametrize("method", ["reverse", "forward"])
+def test_propagate_error(benchmark, method):
+    vm, f, err_matrix = _get_quantities()
+    with vm.error_trans(err_matrix) as pt:
+        pass
+    benchmark(pt.propagate_error, f, method=method)
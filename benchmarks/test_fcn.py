@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from tf_pwa.config_loader import ConfigLoader
+from tf_pwa.tests.test_full import gen_toy, this_dir
+
+
+def _get_fcn_points(num=10):
+    config = ConfigLoader(f"{this_dir}/config_precached.yml")
+    config.set_params(f"{this_dir}/gen_params.json")
+    fcn = config.get_fcn()
+    x0 = np.array(fcn.vm.get_all_val())
+    X = x0 + np.random.normal(scale=0.01, size=(num, x0.shape[0]))
+    return fcn, X
+
+
+@pytest.mark.benchmark(group="nll_many")
+def test_nll_many(benchmark, gen_toy):
+    fcn, X = _get_fcn_points()
+    fcn.nll_many(X)
+    benchmark(fcn.nll_many, X)
+
+
+@pytest.mark.benchmark(group="nll_many")
+def test_nll_serial(benchmark, gen_toy):
+    fcn, X = _get_fcn_points()
+    fcn(X[0])
+    benchmark(lambda: [fcn(x) for x in X])
+
+
+@pytest.mark.benchmark(group="combine_fcn")
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_combine_fcn(benchmark, gen_toy, n_workers):
+    from tf_pwa.config import temp_config
+    from tf_pwa.config_loader import MultiConfig
+    from tf_pwa.model.model import COMBINE_FCN_WORKERS
+
+    config = MultiConfig(
+        [f"{this_dir}/config_toy.yml", f"{this_dir}/config_toy2.yml"]
+    )
+    fcn = config.get_fcn()
+    with temp_config(COMBINE_FCN_WORKERS, n_workers):
+        fcn.nll_grad()
+        benchmark(fcn.nll_grad)
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+import pytest
+
+
+def run_python(code):
+    return subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True
+    ).stdout.decode()
+
+
+@pytest.mark.benchmark(group="import")
+def test_import_tf_pwa(benchmark):
+    benchmark.pedantic(run_python, args=("import tf_pwa",), rounds=3)
+    ret = run_python(
+        "import sys, tf_pwa.utils; print('tensorflow' in sys.modules)"
+    )
+    assert ret.strip().split("\n")[-1] == "False"
+
+
+@pytest.mark.benchmark(group="import")
+def test_import_config_loader(benchmark):
+    benchmark.pedantic(
+        run_python,
+        args=("from tf_pwa.config_loader import ConfigLoader",),
+        rounds=3,
+    )
+    ret = run_python(
+        "import sys\n"
+        "from tf_pwa.config_loader import ConfigLoader\n"
+        "print('sympy' in sys.modules, 'tf_pwa.amp.Kmatrix' in sys.modules)"
+    )
+    assert ret.strip().split("\n")[-1] == "False False"
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from tf_pwa.breit_wigner import BWR
+from tf_pwa.linalg import small_solve
+from tf_pwa.tensorflow_wrapper import tf
+
+
+def _kmatrix_system(n, num=1000000):
+    a = np.random.random((num, n, n)) + 1.0j * np.random.random((num, n, n))
+    a = tf.constant(a + n * np.eye(n))
+    b = tf.constant(np.random.random((num, n, 1)) + 0.0j)
+    return a, b
+
+
+@pytest.mark.benchmark(group="kmatrix_solve")
+@pytest.mark.parametrize("n", [2, 3, 5])
+def test_small_solve(benchmark, n):
+    a, b = _kmatrix_system(n)
+    benchmark(small_solve, a, b)
+
+
+@pytest.mark.benchmark(group="kmatrix_solve")
+@pytest.mark.parametrize("n", [2, 3, 5])
+def test_linalg_inv(benchmark, n):
+    a, b = _kmatrix_system(n)
+
+    def inv_solve():
+        return tf.reduce_sum(tf.linalg.inv(a) * b[..., 0, None, :], axis=-1)
+
+    benchmark(inv_solve)
+
+
+@pytest.mark.benchmark(group="kmatrix_solve")
+def test_BWR(benchmark):
+    m = tf.random.uniform((1000000,), 1.0, 3.0, dtype="float64")
+    q = tf.sqrt(tf.nn.relu(m**2 / 4 - 0.25))
+    benchmark(BWR, m, 2.0, 0.1, q, np.sqrt(0.75), 1, 3.0)
+
+
+@pytest.mark.benchmark(group="kmatrix")
+def test_pipi_swave(benchmark):
+    from tf_pwa.amp.ampgen_pipi_swave import kMatrix_fun
+
+    m = tf.random.uniform((1000000,), 0.3, 1.8, dtype="float64")
+    benchmark(kMatrix_fun, m * m, ["pole.0", "prod.1"])
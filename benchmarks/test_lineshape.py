@@ -0,0 +1,161 @@
+import numpy as np
+import pytest
+
+from tf_pwa.amp import *
+from tf_pwa.breit_wigner import BWR, BWR_vec
+from tf_pwa.cal_angle import cal_angle_from_momentum
+from tf_pwa.phasespace import PhaseSpaceGenerator
+
+
+def _get_dalitz_model(num=100000):
+    """20 BWR resonances in the three Dalitz channels of A -> B C D"""
+    a = Particle("A", J=0, P=-1, mass=5.28)
+    b = Particle("B", J=0, P=-1, mass=1.87)
+    c = Particle("C", J=0, P=-1, mass=0.494)
+    d = Particle("D", J=0, P=-1, mass=0.14)
+    chains = []
+    for n, (i, j, k, m_min) in enumerate(
+        [(b, c, d, 2.4)] * 8 + [(c, d, b, 0.7)] * 6 + [(b, d, c, 2.1)] * 6
+    ):
+        J = n % 3
+        mass = m_min + (0.1 * n) % 1.0
+        width = 0.05 + 0.01 * n
+        r = Particle(f"R{n}", J=J, P=(-1) ** J, mass=mass, width=width)
+        chains.append([HelicityDecay(a, [r, k]), HelicityDecay(r, [i, j])])
+    decs = DecayGroup(chains)
+    p = PhaseSpaceGenerator(5.28, [1.87, 0.494, 0.14]).generate(num)
+    data = cal_angle_from_momentum(dict(zip([b, c, d], p)), decs)
+    amp = AmplitudeModel(decs)
+    return amp, data
+
+
+@pytest.mark.benchmark(group="lineshape")
+@pytest.mark.parametrize("fuse", [True, False])
+def test_dalitz_20_resonances(benchmark, fuse):
+    amp, data = _get_dalitz_model()
+
+    def amp_sum(dat):
+        return tf.reduce_sum(amp(dat))
+
+    old = DecayGroup.fuse_lineshape
+    DecayGroup.fuse_lineshape = fuse
+    try:
+        benchmark(amp_sum, data)
+    finally:
+        DecayGroup.fuse_lineshape = old
+
+
+def _bwr_params(n_res=20, num=1000000):
+    m = tf.random.uniform((num,), 1.0, 3.0, dtype="float64")
+    q = tf.sqrt(tf.nn.relu(m**2 / 4 - 0.25))
+    m0 = np.linspace(1.2, 2.8, n_res)
+    g0 = np.linspace(0.05, 0.25, n_res)
+    q0 = np.sqrt(m0**2 / 4 - 0.25)
+    L = [i % 3 for i in range(n_res)]
+    d = [3.0] * n_res
+    return m, m0, g0, q, q0, L, d
+
+
+@pytest.mark.benchmark(group="BWR")
+def test_BWR_loop(benchmark):
+    m, m0, g0, q, q0, L, d = _bwr_params()
+
+    def f():
+        return tf.stack(
+            [
+                BWR(m, m0[i], g0[i], q, q0[i], L[i], d[i])
+                for i in range(len(L))
+            ],
+            axis=-1,
+        )
+
+    ret = benchmark(f)
+    assert np.allclose(ret, BWR_vec(m, m0, g0, q, q0, L, d))
+
+
+@pytest.mark.benchmark(group="BWR")
+def test_BWR_vec(benchmark):
+    m, m0, g0, q, q0, L, d = _bwr_params()
+    benchmark(BWR_vec, m, m0, g0, q, q0, L, d)
+
+
+@pytest.mark.benchmark(group="stack_chains")
+@pytest.mark.parametrize("stack", [True, False])
+def test_dalitz_stack_chains(benchmark, stack):
+    amp, data = _get_dalitz_model()
+
+    def amp_sum(dat):
+        return tf.reduce_sum(amp(dat))
+
+    old = DecayGroup.stack_chains
+    DecayGroup.stack_chains = stack
+    try:
+        benchmark(amp_sum, data)
+    finally:
+        DecayGroup.stack_chains = old
+
+
+def _get_baryon_model(num=100000):
+    """A -> (R -> B C) D with spin-1/2 and spin-1 final particles"""
+    a = Particle("A", J=0.5, P=1, mass=5.0)
+    b = Particle("B", J=0.5, P=1, mass=1.0)
+    c = Particle("C", J=1, P=-1, mass=0.8)
+    d = Particle("D", J=1, P=-1, mass=0.5)
+    chains = []
+    for n in range(6):
+        J = 1.5 + n % 3
+        r = Particle(f"R{n}", J=J, P=(-1) ** n, mass=2.5 + 0.1 * n, width=0.1)
+        chains.append([HelicityDecay(a, [r, d]), HelicityDecay(r, [b, c])])
+    decs = DecayGroup(chains)
+    p = PhaseSpaceGenerator(5.0, [1.0, 0.8, 0.5]).generate(num)
+    data = cal_angle_from_momentum(dict(zip([b, c, d], p)), decs)
+    amp = AmplitudeModel(decs)
+    return amp, data
+
+
+@pytest.mark.benchmark(group="sparse_helicity")
+@pytest.mark.parametrize("sparse", [True, False])
+def test_baryon_sparse_helicity(benchmark, sparse):
+    amp, data = _get_baryon_model()
+
+    def amp_sum(dat):
+        return tf.reduce_sum(amp(dat))
+
+    old = DecayChain.sparse_helicity
+    DecayChain.sparse_helicity = sparse
+    try:
+        benchmark(amp_sum, data)
+    finally:
+        DecayChain.sparse_helicity = old
+
+
+@pytest.mark.benchmark(group="helicity_block")
+@pytest.mark.parametrize("block", [None, 1])
+def test_baryon_helicity_block(benchmark, block):
+    amp, data = _get_baryon_model()
+
+    def amp_sum(dat):
+        return tf.reduce_sum(amp(dat))
+
+    old = DecayGroup.helicity_block
+    DecayGroup.helicity_block = block
+    try:
+        benchmark(amp_sum, data)
+    finally:
+        DecayGroup.helicity_block = old
+
+
+@pytest.mark.benchmark(group="interpolation")
+@pytest.mark.parametrize("model", ["spline_c", "interp_c", "interp1d3"])
+@pytest.mark.parametrize("cached", [True, False])
+def test_interpolation_50_points(benchmark, model, cached):
+    from tf_pwa.amp import interpolation
+
+    p = get_particle("R", model=model, min_m=1.0, max_m=3.0, interp_N=52)
+    m = np.random.uniform(1.0, 3.0, 100000)
+    data = {"m": m}
+    with variable_scope() as vm:
+        p.init_params()
+        if cached:
+            data["mass_cache"] = {"R": p.get_mass_cache(m)}
+        benchmark(p.get_amp, data)
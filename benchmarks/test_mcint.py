@@ -2,7 +2,7 @@ import pytest
 
 from tf_pwa.amp import *
 from tf_pwa.cal_angle import cal_angle_from_momentum
-from tf_pwa.phasespace import PhaseSpaceGenerator
+from tf_pwa.phasespace import LorentzVector, PhaseSpaceGenerator
 
 
 def generate_mc(num):
@@ -112,3 +112,19 @@ def test_mc_int_grad_CPU(benchmark):
 
     with tf.device("CPU:0"):
         benchmark(mc_int, data)
+
+
+@pytest.mark.benchmark(group="phsp_random")
+@pytest.mark.parametrize("random", ["pseudo", "sobol", "stratified"])
+def test_integral_replicas(benchmark, random):
+    from tf_pwa.generator.qmc import integral_replicas
+
+    a = PhaseSpaceGenerator(4.59925, [2.01026, 0.13957061, 2.00685])
+
+    def f(p):
+        return LorentzVector.M(p[0] + p[1]) ** 2
+
+    value, error = benchmark(
+        integral_replicas, f, a, 2**16, 16, random=random, weighted=True
+    )
+    benchmark.extra_info["error"] = float(error)
@@ -13,11 +13,19 @@ import sys
 this_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, this_dir + "/..")
 
-from tf_pwa.amp import DECAY_MODEL, PARTICLE_MODEL, base, get_config
+from tf_pwa.amp import (
+    DECAY_MODEL,
+    PARTICLE_MODEL,
+    base,
+    get_config,
+    load_all_models,
+)
 from tf_pwa.experimental import (  # type: ignore  # pylint: disable=unused-import
     extra_amp,
 )
 
+load_all_models()
+
 # -- Project information -----------------------------------------------------
 project = "TFPWA"
 copyright = "2020, Yi Jiang"  # pylint: disable=redefined-builtin
@@ -3,4 +3,26 @@
 
 """
 
-from .data import load_data, save_data, set_random_seed
+import sys
+
+_lazy_attributes = {
+    "load_data": "tf_pwa.data",
+    "save_data": "tf_pwa.data",
+    "set_random_seed": "tf_pwa.data",
+}
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    from .data import load_data, save_data, set_random_seed
+else:
+
+    def __getattr__(name):
+        """import `tf_pwa.data` (and TensorFlow) only when it is used, so
+        `import tf_pwa.xxx` for modules without TensorFlow is fast."""
+        if name in _lazy_attributes:
+            import importlib
+
+            module = importlib.import_module(_lazy_attributes[name])
+            return getattr(module, name)
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name)
+        )
@@ -8,11 +8,6 @@ import numpy as np
 
 from .data import data_index, data_mask
 
-try:
-    import matplotlib.patches as mpathes
-except ImportError:
-    pass
-
 
 class AdaptiveBound(object):
     """adaptive bound cut for data value"""
@@ -46,18 +41,67 @@ class AdaptiveBound(object):
         bounds, _ = self.get_bounds_data()
         return bounds
 
+    @functools.lru_cache()
+    def get_split_tree(self):
+        """flatten the splitting into a list of split stages.
+
+        Bins are numbered in mixed radix of all split sizes (the first split
+        is the most significant digit), so each stage is described by the
+        index of splitting axis and the inner thresholds of every node of
+        this stage, with shape (n_nodes, size - 1).
+
+        """
+        bounds = self.get_bounds()
+        lbs = np.array([i[0] for i in bounds])
+        sizes = []
+        for level in self.bins:
+            for idx, size in enumerate(level):
+                sizes.append((idx, size))
+        n_bins = len(bounds)
+        stages = []
+        n_nodes = 1
+        for idx, size in sizes:
+            n_leaf = n_bins // (n_nodes * size)
+            first_leaf = np.arange(n_nodes * size).reshape((n_nodes, size))
+            first_leaf = first_leaf * n_leaf
+            thresholds = lbs[first_leaf[:, 1:], idx]
+            stages.append((idx, size, thresholds))
+            n_nodes = n_nodes * size
+        return stages
+
+    def get_bin_index(self, data):
+        """index of bin for each point of data (shape same as base_data),
+        -1 for points out of the bounds. It walks the split tree once, so the
+        cost is O(N log(bins)) instead of one mask per bin.
+
+        >>> data = np.array([[1.0, 2.0, 1.4, 3.1], [2.0, 1.0, 3.0, 1.0]])
+        >>> AdaptiveBound(data, [[2, 1]]).get_bin_index(data)
+        array([0, 1, 0, 1])
+
+        """
+        data = np.asarray(data)
+        bounds = self.get_bounds()
+        n_dim = bounds[0][0].shape[0]
+        idx_data = data[:n_dim]
+        lb, rb = self._base_bound
+        inside = np.all(
+            (idx_data >= np.reshape(lb, (-1, 1)))
+            & (idx_data < np.reshape(rb, (-1, 1))),
+            axis=0,
+        )
+        node = np.zeros(idx_data.shape[-1], dtype=np.int64)
+        for idx, size, thresholds in self.get_split_tree():
+            x = idx_data[idx]
+            child = np.zeros_like(node)
+            for j in range(size - 1):
+                child += x >= thresholds[node, j]
+            node = node * size + child
+        return np.where(inside, node, -1)
+
     def get_bool_mask(self, data):
         """bool mask for splitting data"""
-        bounds = self.get_bounds()
-        idx_data = data[: bounds[0][0].shape[0]]
-        ret = []
-        for lb, rb in bounds:
-            mask = np.logical_and(
-                idx_data >= lb[..., np.newaxis], idx_data < rb[..., np.newaxis]
-            )
-            mask = np.all(mask, axis=0)
-            ret.append(mask)
-        return ret
+        bin_index = self.get_bin_index(data)
+        return [bin_index == i for i in range(len(self.get_bounds()))]
 
     def split_full_data(self, data, base_index=None):
         """split structure data, (TODO because large IO,  the method is slow.)"""
@@ -70,12 +114,36 @@ class AdaptiveBound(object):
 
     def split_data(self, data):
         """split data, the shape is same as base_data"""
-        mask = self.get_bool_mask(data)
+        data = np.asarray(data)
+        bin_index = self.get_bin_index(data)
+        order = np.argsort(bin_index, kind="stable")
+        sorted_index = bin_index[order]
+        n_bins = len(self.get_bounds())
+        edges = np.searchsorted(sorted_index, np.arange(n_bins + 1))
         ret = []
-        for i in mask:
-            ret.append(data[..., i])
+        for i in range(n_bins):
+            ret.append(data[..., order[edges[i] : edges[i + 1]]])
         return ret
 
+    def bin_sum(self, data, weights=None):
+        """sum of weights (or number of points) in each bin, computed in
+        one reduction
+
+        >>> data = np.array([[1.0, 2.0, 1.4, 3.1], [2.0, 1.0, 3.0, 1.0]])
+        >>> AdaptiveBound(data, [[2, 1]]).bin_sum(data, [1.0, 2.0, 3.0, 4.0])
+        array([4., 6.])
+
+        """
+        bin_index = self.get_bin_index(data)
+        cut = bin_index >= 0
+        if weights is not None:
+            weights = np.broadcast_to(weights, bin_index.shape)[cut]
+        return np.bincount(
+            bin_index[cut],
+            weights=weights,
+            minlength=len(self.get_bounds()),
+        ).astype(np.float64)
+
     @staticmethod
     def single_split_bound(data, n=2, base_bound=None):
         """split data in the order of data value
@@ -162,6 +230,8 @@ class AdaptiveBound(object):
         return (lb, rb)
 
     def get_bound_patch(self, **kwargs):
+        import matplotlib.patches as mpathes
+
         ret = []
         for i, bnd in enumerate(self.get_bounds()):
             min_x, min_y = bnd[0]
@@ -219,3 +289,24 @@ def cal_chi2(numbers, n_fp):
         "chi2/ndf: ", np.sum(weights), "/", ndf
     )  # ,"another", np.sum(chi21))
     return chi2, ndf
+
+
+def binned_numbers(adapter, data, phsp, phsp_weight, data_weight=None):
+    """number of data and expected number from weighted phsp in each bin,
+    the phsp weights are normalized to the total data weights.
+
+    >>> data = np.array([[1.0, 2.0, 1.4, 3.1], [2.0, 1.0, 3.0, 1.0]])
+    >>> adapter = AdaptiveBound(data, [[2, 1]])
+    >>> binned_numbers(adapter, data, data, np.ones(4))
+    array([[2., 2.],
+           [2., 2.]])
+
+    """
+    ndata = adapter.bin_sum(data, data_weight)
+    nmc = adapter.bin_sum(phsp, phsp_weight)
+    if data_weight is None:
+        n_total = np.asarray(data).shape[-1]
+    else:
+        n_total = np.sum(data_weight)
+    nmc = nmc * n_total / np.sum(phsp_weight)
+    return np.stack([ndata, nmc], axis=-1)
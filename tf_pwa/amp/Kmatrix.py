@@ -5,6 +5,7 @@ from tf_pwa.amp import HelicityDecay, Particle
 from tf_pwa.amp import get_relative_p as get_relative_p2
 from tf_pwa.amp import register_decay, register_particle
 from tf_pwa.breit_wigner import Bprime_q2, get_bprime_coeff
+from tf_pwa.linalg import small_solve
 
 
 def get_relative_p(m0, m1, m2):
@@ -352,13 +353,7 @@ class KmatrixSplitLSParticle(Particle):
                 if i == j:
                     K[i][j] = den_prod + K[i][j]
 
-        # det = K[0][0] * K[1][1] - K[0][1]*K[1][0]
-        K_inv = tf.linalg.inv(
-            tf.stack([tf.stack(i, axis=-1) for i in K], axis=-2)
-        )  # [[K[1][1]/det, -K[1][0]/det],[-K[0][1]/det, K[0][0]/det]]
-        # K_inv = tf.stack([tf.stack(i, axis=-1) for i in K_inv], axis=-1)
-
-        # print("num of nan", tf.reduce_sum(tf.math.is_nan(K_inv)))
+        K = tf.stack([tf.stack(i, axis=-1) for i in K], axis=-2)
 
         P = [0 for i in self.ls_list]
         for i, l in enumerate(self.ls_list):
@@ -382,5 +377,8 @@ class KmatrixSplitLSParticle(Particle):
         # K_inv = tf.linalg.inv(E - tf.stack(K, axis=-2))
         # print("K_inv", K_inv)
         # print(P)
-        ret = tf.reduce_sum(K_inv * tf.stack(P, axis=-1)[:, None], axis=1)
+        # P_j sum_i (K^{-1})_{ij}, solved without the full inverse
+        ones = tf.ones_like(K[..., :1])
+        K_inv_sum = small_solve(tf.linalg.matrix_transpose(K), ones)
+        ret = K_inv_sum[..., 0] * tf.stack(P, axis=-1)
         return ret
@@ -6,14 +6,78 @@ DecayGroup: addition (+)
     DecayChain: multiplication (x)
         Decay, Particle(Propagator)
 
+Models out of :code:`core` and :code:`base` are registered by name, and
+their modules are imported when the models are used for the first time.
+
 """
 
+import sys
+
 # pylint: disable=unused-wildcard-import,unused-import
 from .amp import AmplitudeModel, create_amplitude
 from .base import *
 from .core import *
-from .flatte import ParticleFlatte
-from .Kmatrix import KmatrixSingleChannelParticle
-from .kmatrix_simple import KmatrixSimple
+from .core import load_all_models, register_lazy_model
 from .preprocess import create_preprocessor
-from .split_ls import ParticleBWRLS
+
+for _module, _models in {
+    "flatte": ["Flatte", "FlatteC", "FlatteGen", "Flatte2"],
+    "Kmatrix": ["KMatrixSingleChannel", "KMatrixSplitLS"],
+    "kmatrix_simple": ["KmatrixSimple"],
+    "split_ls": ["BWR_LS", "BWR_LS2", "MultiBWR", "MultiBW"],
+    "interpolation": [
+        "linear_npy",
+        "linear_txt",
+        "interp",
+        "interp_c",
+        "spline_c",
+        "interp1d3",
+        "interp_lagrange",
+        "interp_hist",
+        "hist_idx",
+        "spline_c_idx",
+        "interp_l3",
+        "sppchip",
+    ],
+    "ampgen_FOCUS": ["Kpi_Swave"],
+    "ampgen_pipi_swave": ["pipi_Swave"],
+}.items():
+    for _name in _models:
+        register_lazy_model(PARTICLE_MODEL, _name, __name__ + "." + _module)
+
+for _module, _models in {
+    "Kmatrix": ["LS-decay-Kmatrix"],
+    "split_ls": ["LS-decay"],
+    "cov_ten": ["cov_ten_simple"],
+}.items():
+    for _name in _models:
+        register_lazy_model(DECAY_MODEL, (2, _name), __name__ + "." + _module)
+
+register_lazy_model(DECAY_CHAIN_MODEL, "cov_ten", __name__ + ".cov_ten")
+
+_lazy_attributes = {
+    "ParticleFlatte": "flatte",
+    "KmatrixSingleChannelParticle": "Kmatrix",
+    "KmatrixSimple": "kmatrix_simple",
+    "ParticleBWRLS": "split_ls",
+}
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    load_all_models()
+    from .flatte import ParticleFlatte
+    from .Kmatrix import KmatrixSingleChannelParticle
+    from .kmatrix_simple import KmatrixSimple
+    from .split_ls import ParticleBWRLS
+else:
+
+    def __getattr__(name):
+        if name in _lazy_attributes:
+            import importlib
+
+            module = importlib.import_module(
+                __name__ + "." + _lazy_attributes[name]
+            )
+            return getattr(module, name)
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name)
+        )
@@ -50,6 +50,8 @@ class AbsPDF:
         use_tf_function=False,
         no_id_cached=False,
         jit_compile=False,
+        graph_cache=None,
+        graph_cache_key="",
         **kwargs
     ):
         self.name = name
@@ -64,7 +66,13 @@ class AbsPDF:
         if use_tf_function:
             from tf_pwa.experimental.wrap_function import WrapFun
 
-            self.cached_fun = WrapFun(self.pdf, jit_compile=jit_compile)
+            self.cached_fun = WrapFun(
+                self.pdf,
+                jit_compile=jit_compile,
+                cache_dir=graph_cache,
+                cache_key=graph_cache_key,
+                variables=lambda: self.vm.variables,
+            )
         else:
             self.cached_fun = self.pdf
         self.extra_kwargs = kwargs
@@ -98,6 +106,23 @@ class AbsPDF:
     def cached_available(self):
         return True
 
+    def pdf_many(self, data, xs):
+        """
+        PDF for many sets of trainable parameters.
+
+        :param data: Data dict
+        :param xs: Array with the shape :math:`(K, n_{par})`
+        :return: Tensor with the shape :math:`(K, n_{data})`
+        """
+        if isinstance(data, LazyCall):
+            data = data.eval()
+        ret = []
+        with self.temp_params(self.get_params()):
+            for x in xs:
+                self.vm.set_all(x)
+                ret.append(self.pdf(data))
+        return tf.stack(ret)
+
     def __call__(self, data, cached=False):
         if isinstance(data, LazyCall):
             data = data.eval()
@@ -225,6 +250,50 @@ class CachedAmpAmplitudeModel(BaseAmplitudeModel):
         amp = tf.reduce_sum(ret, axis=0)
         return self.decay_group.sum_with_polarization(amp)
 
+    def pdf_many(self, data, xs):
+        """
+        Only the parameters vector is calculated for each set of parameters,
+        the cached angular amplitude is contracted with all of them at once.
+        """
+        if isinstance(data, LazyCall):
+            data = data.eval()
+        cached_data = data["cached_amp"]
+        params_vector = self.get_params_vector_function(data)
+        pvs = []
+        with self.temp_params(self.get_params()):
+            for x in xs:
+                self.vm.set_all(x)
+                pvs.append(params_vector(data))
+        partial_cached_data = [
+            cached_data[i] for i in self.decay_group.chains_idx
+        ]
+        amp = 0
+        for i, j in zip(zip(*pvs), partial_cached_data):
+            # (n, K, c) x (n, c, ...) -> (n, K, ...)
+            i = tf.transpose(tf.stack(i), (1, 0, 2))
+            j = tf.stack(j, axis=1)
+            shape = j.shape[2:]
+            j = tf.reshape(j, (j.shape[0], j.shape[1], -1))
+            amp += tf.matmul(i, j)
+        amp = tf.reshape(tf.transpose(amp, (1, 0, 2)), (-1, *shape))
+        ret = self.decay_group.sum_with_polarization(amp)
+        return tf.reshape(ret, (len(pvs), -1))
+
+    def get_params_vector_function(self, data):
+        from tf_pwa.experimental.build_amp import build_params_vector
+
+        if not hasattr(self, "_params_vector_function"):
+            self._params_vector_function = {}
+        key = tuple(self.decay_group.chains_idx)
+        if key not in self._params_vector_function:
+            # eager call first for the lazy initialized parts, such as mass
+            build_params_vector(self.decay_group, data)
+            self._params_vector_function[key] = tf.function(
+                lambda data: build_params_vector(self.decay_group, data),
+                reduce_retracing=True,
+            )
+        return self._params_vector_function[key]
+
 
 @register_amp_model("cached_shape")
 class CachedShapeAmplitudeModel(BaseAmplitudeModel):
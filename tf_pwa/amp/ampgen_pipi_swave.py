@@ -2,6 +2,7 @@ import numpy as np
 import tensorflow as tf
 
 from tf_pwa.amp import Particle, register_particle
+from tf_pwa.linalg import small_inv, small_solve
 
 
 @register_particle("pipi_Swave")
@@ -111,7 +112,21 @@ def getPropagator(kMatrix, phaseSpace):
     nChannels = kMatrix.shape[-1]
     Id = tf.eye(nChannels, dtype=kMatrix.dtype)
     T = Id - 1j * kMatrix * tf.expand_dims(phaseSpace, axis=-2)
-    return tf.linalg.inv(T)
+    return small_inv(T)
+
+
+def getPropagatorRows(kMatrix, phaseSpace, rows):
+    """
+    :code:`getPropagator(kMatrix, phaseSpace)[..., rows, :]` without the
+    full inverse
+    """
+    nChannels = kMatrix.shape[-1]
+    Id = tf.eye(nChannels, dtype=kMatrix.dtype)
+    T = Id - 1j * kMatrix * tf.expand_dims(phaseSpace, axis=-2)
+    e = tf.gather(Id, rows, axis=-1)
+    # F[i, :] = (T^{-1})[i, :] = (T^{T})^{-1} e_i
+    ret = small_solve(tf.linalg.matrix_transpose(T), e)
+    return tf.linalg.matrix_transpose(ret)
 
 
 def constructKMatrix(this_s, nChannels, poleConfigs):
@@ -215,34 +230,45 @@ def kMatrix_fun(
     )
 
     kMatrix = tf.cast(to_matrix(adlerTerm), kMatrix.dtype) * kMatrix
-    F = getPropagator(kMatrix, phaseSpace)
+
+    def channel_index(token):
+        if len(token) == 4:
+            return 0
+        return channels.index(token[4:])
+
+    # only the rows used by P-vector are solved
+    rows = []
+    for tokens in all_tokens:
+        if tokens[0].startswith("pole") or tokens[0].startswith("prod"):
+            idx = channel_index(tokens[0])
+            if idx not in rows:
+                rows.append(idx)
+    if rows:
+        F_rows = getPropagatorRows(kMatrix, phaseSpace, rows)
+    if any(tokens[0] == "scatt" for tokens in all_tokens):
+        F = getPropagator(kMatrix, phaseSpace)
 
     all_ret = []
     for tokens in all_tokens:
         if tokens[0] == "scatt":
             i = int(tokens[1])
             j = int(tokens[2])
-            M = tf.mathmul(F, kMatrix)
+            M = tf.matmul(F, kMatrix)
             ret_i = M[..., j, i]
         elif tokens[0].startswith("pole"):
-            if len(tokens[0]) == 4:
-                idx = 0
-            else:
-                idx = channels.index(tokens[0][4:])
+            idx = rows.index(channel_index(tokens[0]))
             pTerm = int(tokens[1])
             pole = poleConfigs[pTerm]
             M = tf.reduce_sum(
-                F[..., idx, :] * tf.cast(pole.couplings, F.dtype), axis=-1
+                F_rows[..., idx, :] * tf.cast(pole.couplings, F_rows.dtype),
+                axis=-1,
             )
             ret_i = M / (pole.s - tf.cast(sInGeV, pole.s.dtype))
         elif tokens[0].startswith("prod"):
-            if len(tokens[0]) == 4:
-                idx = 0
-            else:
-                idx = channels.index(tokens[0][4:])
+            idx = rows.index(channel_index(tokens[0]))
             pTerm = int(tokens[1])
             pd = (1 - s0_prod) / (sInGeV - s0_prod)
-            ret_i = F[..., idx, pTerm] * tf.cast(pd, F.dtype)
+            ret_i = F_rows[..., idx, pTerm] * tf.cast(pd, F_rows.dtype)
         else:
             print(
                 "Modifier not found: , expecting one of {scatt, pole, poleKK, prod, prodKK}"
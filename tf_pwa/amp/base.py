@@ -606,7 +606,27 @@ class HelicityDecayNP(HelicityDecay):
         self.H.set_fix_idx([free_idx[0]], 1.0)
 
     def get_H_zero_mask(self):
+        """boolean mask of the zero entries of H"""
         fix_index, free_idx = self.get_zero_index()
+        mask = np.zeros(self.H.shape, dtype=bool)
+        for i in fix_index:
+            mask[i] = True
+        return mask
+
+    def get_amp_mask(self):
+        # the helicity amplitudes of models with H in the same way
+        known = [
+            HelicityDecayNP.get_helicity_amp,
+            HelicityDecayNPbf.get_helicity_amp,
+        ]
+        cls = type(self)
+        if (
+            cls.get_amp is not HelicityDecay.get_amp
+            or cls.get_helicity_amp not in known
+        ):
+            return None
+        H = ~self.get_H_zero_mask()
+        return np.broadcast_to(H, (len(self.core.spins), *H.shape))
 
     def get_factor(self):
         _, free_index = self.get_zero_index()
@@ -833,6 +853,22 @@ class HelicityDecayReduceH0(HelicityDecay):
                 reduce_item.append(hi)
         return all_hel, reduce_item
 
+    def get_amp_mask(self):
+        """the helicity amplitudes of massless particles with helicity 0 are
+        zero too"""
+        mask = super().get_amp_mask()
+        if mask is None:
+            return None
+        mask = np.array(mask)
+        for i, (p, hel) in enumerate(
+            zip(self.outs, self.list_helicity_inner())
+        ):
+            if p.get_mass() == 0 and 0 in hel:
+                idx = [slice(None)] * 3
+                idx[i + 1] = list(hel).index(0)
+                mask[tuple(idx)] = False
+        return mask
+
     def get_g_ls(self, charge=1):
         gls = self.g_ls(charge)
         gls = tf.stack(gls)
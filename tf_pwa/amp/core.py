@@ -16,15 +16,21 @@ from itertools import combinations
 from pprint import pprint
 
 import numpy as np
-import sympy as sym
 
-from tf_pwa.breit_wigner import BW, BWR, Bprime, Bprime_q2, to_complex
+from tf_pwa.breit_wigner import (
+    BW,
+    BWR,
+    BWR_vec,
+    Bprime,
+    Bprime_q2,
+    to_complex,
+)
 from tf_pwa.cg import cg_coef
 from tf_pwa.config import get_config, regist_config, temp_config
 from tf_pwa.data import LazyCall, data_map, data_shape, split_generator
 from tf_pwa.dec_parser import load_dec_file
 from tf_pwa.dfun import get_D_matrix_lambda
-from tf_pwa.einsum import einsum
+from tf_pwa.einsum import einsum, sparse_einsum
 from tf_pwa.particle import DEFAULT_DECAY, BaseParticle, Decay
 from tf_pwa.particle import DecayChain as BaseDecayChain
 from tf_pwa.particle import DecayGroup as BaseDecayGroup
@@ -35,8 +41,11 @@ from tf_pwa.particle import (
     split_particle_type,
 )
 from tf_pwa.tensorflow_wrapper import tf
+from tf_pwa.utils import LazyModule
 from tf_pwa.variable import Variable, VarsManager
 
+sym = LazyModule("sympy")
+
 # from pysnooper import snoop
 
 
@@ -126,11 +135,56 @@ regist_particle = register_particle
 regist_decay = register_decay
 
 
-def get_particle_model(name):
-    all_model = get_config(PARTICLE_MODEL)
+_lazy_models = {PARTICLE_MODEL: {}, DECAY_MODEL: {}, DECAY_CHAIN_MODEL: {}}
+
+
+def register_lazy_model(kind, name, module):
+    """register model `name` defined in `module`, the module is imported when
+    the model is required for the first time.
+
+    :params kind: one of `PARTICLE_MODEL`, `DECAY_MODEL` and
+        `DECAY_CHAIN_MODEL`
+    :params name: model name used in configuration, `(num_outs, name)` for
+        decay model
+    :params module: full name of the module
+    """
+    _lazy_models[kind][name] = module
+
+
+def _import_lazy_module(module):
+    import importlib
+
+    # models registered before the import are not overridden, the same as
+    # the module has been imported at first
+    old_models = {k: dict(get_config(k)) for k in _lazy_models}
+    importlib.import_module(module)
+    for k, v in old_models.items():
+        get_config(k).update(v)
+    for k, v in _lazy_models.items():
+        for name in [i for i, j in v.items() if j == module]:
+            v.pop(name)
+
+
+def _get_model(kind, name):
+    all_model = get_config(kind)
+    if name not in all_model and name in _lazy_models[kind]:
+        _import_lazy_module(_lazy_models[kind][name])
     return all_model.get(name, None)
 
 
+def load_all_models():
+    """import all the modules registered by `register_lazy_model`"""
+    modules = set()
+    for v in _lazy_models.values():
+        modules.update(v.values())
+    for i in sorted(modules):
+        _import_lazy_module(i)
+
+
+def get_particle_model(name):
+    return _get_model(PARTICLE_MODEL, name)
+
+
 def get_particle_model_name(p):
     all_model = get_config(PARTICLE_MODEL)
     for k, v in all_model.items():
@@ -184,7 +238,10 @@ def trans_model(model):
 
 def get_decay_model(model, num_outs=2):
     id_ = (num_outs, model)
-    return get_config(DECAY_MODEL)[id_]
+    ret = _get_model(DECAY_MODEL, id_)
+    if ret is None:
+        raise KeyError(id_)
+    return ret
 
 
 def get_decay(core, outs, **kwargs):
@@ -213,8 +270,10 @@ def get_decay_chain(decays, **kwargs):
     new_kwargs = {**decay_params, **kwargs}
 
     model = new_kwargs.pop("model", "default")
-
-    return get_config(DECAY_CHAIN_MODEL)[model](decays, **new_kwargs)
+    model_class = _get_model(DECAY_CHAIN_MODEL, model)
+    if model_class is None:
+        raise KeyError(model)
+    return model_class(decays, **new_kwargs)
 
 
 def data_device(data):
@@ -428,6 +487,75 @@ class Particle(BaseParticle, AmpBase):
             return tf.cast(c_width, ret.dtype) * ret
         return ret
 
+    def get_tabulated_amp(self, m):
+        """
+        Lineshape from the interpolation table (:code:`tabulated: True`),
+        see :code:`~tf_pwa.amp.tabulated.LineshapeTable`. The table is
+        built from :code:`self(m)` in the range of
+        :code:`get_mass_range()` and rebuilt when the parameters change.
+        The options :code:`tabulated_rtol` (default 1e-6) and
+        :code:`tabulated_range` control the table.
+        """
+        from tf_pwa.amp.tabulated import LineshapeTable
+
+        with tf.init_scope():
+            params = [self.get_mass(), self.get_width()]
+            params += [i.get_mass() for i in self.decay[0].outs]
+            var_map = getattr(self, "_variables_map", {})
+            params += [i() for i in var_map.values()]
+            key = tuple(
+                np.asarray(i).tolist() for i in params if i is not None
+            )
+            if getattr(self, "_lineshape_table_key", None) != key:
+                m_range = getattr(self, "tabulated_range", None)
+                if m_range is None:
+                    m_range = self.get_mass_range()
+                self._lineshape_table = LineshapeTable(
+                    self,
+                    *m_range,
+                    rtol=getattr(self, "tabulated_rtol", 1e-6),
+                )
+                self._lineshape_table_key = key
+        return self._lineshape_table(m)
+
+    def get_mass_range(self):
+        """kinematic range of the invariant mass"""
+
+        def min_mass(p):
+            if len(p.decay) > 0:
+                return sum(min_mass(i) for i in p.decay[0].outs)
+            return float(p.get_mass())
+
+        def max_mass(p):
+            if len(p.creators) == 0:
+                return float(p.get_mass())
+            ret = []
+            for decay in p.creators:
+                others = [min_mass(i) for i in decay.outs if i is not p]
+                ret.append(max_mass(decay.core) - sum(others))
+            return max(ret)
+
+        return min_mass(self), max_mass(self)
+
+    def can_tabulate(self):
+        """if the lineshape only depends on the fixed parameters and the
+        invariant mass"""
+        if not getattr(self, "tabulated", False) or len(self.decay) == 0:
+            return False
+        if not self.is_fixed_shape():
+            warnings.warn(f"{self} is not tabulated, it has free parameters")
+            return False
+        if any(len(i.decay) > 0 for i in self.decay[0].outs):
+            warnings.warn(f"{self} is not tabulated, it decays to resonances")
+            return False
+        return True
+
+    def get_mass_cache(self, m):
+        """parameter independent cache of the lineshape for the invariant
+        mass **m**, it is stored along with the particle data as
+        :code:`data["mass_cache"][str(self)]`. :code:`None` for no cache."""
+        return None
+
     def __call__(self, m):
         mass = self.get_mass()
         m1 = self.decay[0].outs[0].get_mass()
@@ -665,6 +793,14 @@ class AmpDecay(Decay, AmpBase):
                 ret.append(i.spins)
         return ret
 
+    def get_amp_mask(self):
+        """
+        Boolean mask of the structurally non-zero entries of `get_amp`, with
+        the shape :code:`(len(core.spins), *n_helicity_inner())`. None if
+        unknown.
+        """
+        return None
+
 
 @regist_decay("default")
 @regist_decay("gls-bf")
@@ -1182,6 +1318,23 @@ class HelicityDecay(AmpDecay):
         self.add_algin(ret, data)
         return ret
 
+    def get_amp_mask(self):
+        """
+        The helicity amplitudes with all the CG coefficients zero (by the
+        spins and parity) are zero, the others are non-zero in general.
+        """
+        cls = type(self)
+        if (
+            cls.get_amp is not HelicityDecay.get_amp
+            or cls.get_helicity_amp is not HelicityDecay.get_helicity_amp
+        ):
+            return None
+        cg = np.abs(np.array(self.get_cg_matrix())) > 1e-10
+        H = np.any(cg, axis=0).reshape(self.n_helicity_inner())
+        if self.allow_cc:
+            H = H | H[::-1, ::-1]
+        return np.broadcast_to(H, (len(self.core.spins), *H.shape))
+
     def get_angle_amp(self, data, data_p, **kwargs):
         a = self.core
         b = self.outs[0]
@@ -1337,9 +1490,70 @@ class AmpDecayChain(BaseDecayChain, AmpBase):
         return self.params_head
 
 
+def _sparse_helicity_amp(idx_s, amp_d, masks):
+    """
+    Contract the first :code:`len(masks)` amplitudes by `sparse_einsum` to
+    the indices used by the others (the D-matrices of alignment), and then
+    the others by :code:`tf.einsum`.
+    """
+    n = len(masks)
+    in_idx, final_idx = idx_s.split("->")
+    in_idx = in_idx.split(",")
+    used = set("".join(in_idx[n:]) + final_idx)
+    letters = set("".join(in_idx[:n]).replace("...", "")) & used
+    mid_idx = [i for i in final_idx if i in letters]
+    mid_idx = "...{}".format("".join(mid_idx + sorted(letters - set(mid_idx))))
+    ret = sparse_einsum(
+        "{}->{}".format(",".join(in_idx[:n]), mid_idx), *amp_d[:n], masks=masks
+    )
+    if n == len(amp_d) and mid_idx == final_idx:
+        return ret
+    expr = "{}->{}".format(",".join([mid_idx] + in_idx[n:]), final_idx)
+    return tf.einsum(expr, ret, *amp_d[n:])
+
+
+def _slice_axis(x, axis, start, stop):
+    """slice :code:`x[..., start:stop, ...]` in the negative **axis**"""
+    idx = (Ellipsis, slice(start, stop)) + (slice(None),) * (-axis - 1)
+    return x[idx]
+
+
+def _helicity_block_amp(idx_s, amp_d, masks, block):
+    """
+    Slice the amplitudes (and masks) of einsum **idx_s** to the helicity
+    block :code:`(axis, start, stop)` of the output, **axis** is negative
+    and counted from the last helicity index.
+    """
+    axis, start, stop = block
+    in_idx, final_idx = idx_s.split("->")
+    letter = final_idx.replace("...", "")[axis]
+    new_amp, new_masks = [], []
+    for k, (idx, x) in enumerate(zip(in_idx.split(","), amp_d)):
+        idx = idx.replace("...", "")
+        mask = masks[k] if k < len(masks) else None
+        if letter in idx:
+            i = idx.index(letter) - len(idx)
+            if x.shape[i] != 1:
+                x = _slice_axis(x, i, start, stop)
+            if mask is not None and mask.shape[i] != 1:
+                mask = _slice_axis(mask, i, start, stop)
+        new_amp.append(x)
+        new_masks.append(mask)
+    return new_amp, new_masks[: len(masks)]
+
+
 @register_decay_chain("default")
 class DecayChain(AmpDecayChain):
-    """A list of Decay as a chain decay"""
+    """
+    A list of Decay as a chain decay
+
+    With :code:`DecayChain.sparse_helicity = True`, the amplitudes of
+    decays are contracted over the structurally non-zero helicity
+    combinations only (see `AmpDecay.get_amp_mask`), by gather and
+    segment sum (`tf_pwa.einsum.sparse_einsum`).
+    """
+
+    sparse_helicity = False
 
     def init_params(self, name=""):
         self.total = self.add_var(
@@ -1429,6 +1643,7 @@ class DecayChain(AmpDecayChain):
             # print(total)*self.get_amp_total()
             amp_d.append(total)
             indices.append([])
+        n_amp = len(amp_d)
 
         if self.aligned:
             for i in self:
@@ -1454,6 +1669,18 @@ class DecayChain(AmpDecayChain):
         idx_s = "{}->{}".format(idx, final_indices)
         # ret = amp * tf.reshape(rs, [-1] + [1] * len(self.amp_shape()))
         # print(idx_s)#, amp_d)
+        masks = []
+        if self.sparse_helicity:
+            masks = [i.get_amp_mask() for i in self]
+            if any(i is not None for i in masks):
+                masks += [None] * (n_amp - len(masks))
+            else:
+                masks = []
+        block = all_data.get("helicity_block") if all_data else None
+        if block is not None:
+            amp_d, masks = _helicity_block_amp(idx_s, amp_d, masks, block)
+        if masks:
+            return _sparse_helicity_amp(idx_s, amp_d, masks)
         try:
             ret = einsum(idx_s, *amp_d)
         except:
@@ -1579,23 +1806,25 @@ class DecayChain(AmpDecayChain):
             amp_d.append(total)
         return amp_d
 
+    def get_inner_decay(self, i):
+        """the decay of inner particle `i` in this decay chain"""
+        for j in i.decay:
+            if j in self:
+                return j
+        raise IndexError("not found {} decay in {}".format(i, self))
+
     def get_amp_particle(self, data_p, data_c, all_data=None):
         amp_p = []
         if not self.inner:
             return 1.0
+        fused = {} if all_data is None else all_data.get("fused_lineshape", {})
         for i in self.inner:
-            if len(i.decay) >= 1:
-                decay_i = i.decay[0]
-                found = False
-                for j in i.decay:
-                    if j in self:
-                        decay_i = j
-                        found = True
-                        break
-                if not found:
-                    raise IndexError(
-                        "not found {} decay in {}".format(i, self)
-                    )
+            if i in fused:
+                amp_p.append(fused[i])
+            elif getattr(i, "tabulated", False) and i.can_tabulate():
+                amp_p.append(i.get_tabulated_amp(data_p[i]["m"]))
+            elif len(i.decay) >= 1:
+                decay_i = self.get_inner_decay(i)
                 data_c_i = data_c[decay_i]
                 if "|q|" not in data_c_i:
                     data_c_i["|q|"] = decay_i.get_relative_momentum(
@@ -1654,7 +1883,17 @@ class DecayChain(AmpDecayChain):
 
 
 class DecayGroup(BaseDecayGroup, AmpBase):
-    """A Group of Decay Chains with the same final particles."""
+    """
+    A Group of Decay Chains with the same final particles.
+
+    With :code:`DecayGroup.helicity_block = n`, `sum_amp` accumulates
+    :math:`\\sum|A|^2` over blocks of **n** helicities of a final particle
+    (`sum_amp_block`), instead of building the full amplitude.
+    """
+
+    fuse_lineshape = True
+    stack_chains = False
+    helicity_block = None
 
     def __init__(self, chains):
         self.chains_idx = list(range(len(chains)))
@@ -1722,7 +1961,8 @@ class DecayGroup(BaseDecayGroup, AmpBase):
         used_chains = tuple([self.chains[i] for i in self.chains_idx])
         chain_maps = self.get_chains_map(used_chains)
         base_map = self.get_base_map()
-        ret = []
+        chain_data = []
+        stack_keys = []
         for chains in chain_maps:
             for decay_chain in chains:
                 chain_topo = decay_chain.standard_topology()
@@ -1736,16 +1976,255 @@ class DecayGroup(BaseDecayGroup, AmpBase):
                     raise KeyError("not found {}".format(chain_topo))
                 data_c = rename_data_dict(data_decay_i, chains[decay_chain])
                 data_p = rename_data_dict(data_particle, chains[decay_chain])
-                # print("$$$$$",data_c)
-                # print("$$$$$",data_p)
+                chain_data.append((decay_chain, data_c, data_p))
+                stack_keys.append((id(data_decay_i), chains[decay_chain]))
+        if self.fuse_lineshape:
+            fused = self.get_fused_lineshape(chain_data)
+            if fused:
+                data = {**data, "fused_lineshape": fused}
+        if self.stack_chains:
+            groups = self.get_stacked_chains(chain_data, stack_keys)
+        else:
+            groups = [[(*i, None)] for i in chain_data]
+        block = data.get("helicity_block", None)
+        ret = []
+        for group in groups:
+            if len(group) == 1:
+                decay_chain, data_c, data_p, _ = group[0]
                 amp = decay_chain.get_amp(
                     data_c, data_p, base_map=base_map, all_data=data
                 )
-                ret.append(amp)
-                # print(decay_chain, amp[:10])
+            else:
+                amp = self.get_stacked_amp(group, base_map, all_data=data)
+            if (
+                block is not None
+                and amp.shape[block[0]] != block[2] - block[1]
+            ):
+                # chains without the support of helicity block
+                amp = _slice_axis(amp, *block)
+            ret.append(amp)
         ret = tf.reduce_sum(ret, axis=0)
         return ret
 
+    def get_stacked_chains(self, chain_data, stack_keys):
+        """
+        Group the chains with the same topology and the same spin structure.
+        They have the same angular part and only differ in the helicity
+        couplings and lineshapes.
+
+        :param chain_data: list of `(decay_chain, data_c, data_p)`
+        :param stack_keys: list of `(data_key, topology_map)` for each chain
+        :return: list of groups, each item is
+            `(decay_chain, data_c, data_p, decays)`, where `decays` are
+            ordered in the same way in a group
+        """
+        groups = {}
+        for idx, chain_i in enumerate(chain_data):
+            data_key, idx_map = stack_keys[idx]
+            decay_chain, data_c, data_p = chain_i
+            topo = {v: k for k, v in idx_map.items()}
+            key = self._stack_key(decay_chain, topo)
+            decays = sorted(decay_chain, key=lambda x: str(topo.get(x, x)))
+            if key is None:
+                key = ("unique", idx)
+            else:
+                key = (data_key, key)
+            groups.setdefault(key, []).append(
+                (decay_chain, data_c, data_p, decays)
+            )
+        return list(groups.values())
+
+    @staticmethod
+    def _stack_key(decay_chain, topo):
+        if (
+            type(decay_chain).get_amp is not DecayChain.get_amp
+            or not decay_chain.need_amp_particle
+        ):
+            return None
+        ret = []
+        for i in decay_chain:
+            if type(i).get_amp is not HelicityDecay.get_amp or i not in topo:
+                return None
+            ret.append(
+                (
+                    str(topo[i]),
+                    i.core.J,
+                    tuple(i.core.spins),
+                    tuple(tuple(j) for j in i.list_helicity_inner()),
+                    tuple((j.J, tuple(j.spins)) for j in i.outs),
+                    getattr(i, "helicity_inner_full", False),
+                )
+            )
+        return (decay_chain.aligned, tuple(sorted(ret)))
+
+    def get_stacked_amp(self, group, base_map=None, all_data=None):
+        """
+        Amplitude of a group of chains from :code:`get_stacked_chains`.
+        The D-matrices are calculated once with the first chain, the
+        helicity amplitudes and the lineshapes of all chains are stacked in
+        the index `i`, which is summed in one einsum.
+        """
+        chain_0, data_c_0, data_p_0, decays_0 = group[0]
+        base_map = chain_0.get_base_map(base_map)
+        iter_idx = ["..."]
+        amp_d = []
+        indices = []
+        final_indices = "".join(iter_idx + chain_0.amp_index(base_map))
+        masks = []
+        for k, decay in enumerate(decays_0):
+            ang = data_c_0[decay][decay.outs[0]]["ang"]
+            D_conj = get_D_matrix_lambda(
+                ang,
+                decay.core.J,
+                decay.core.spins,
+                *decay.list_helicity_inner(),
+            )
+            H = []
+            for _, data_c, data_p, decays in group:
+                H_i = decays[k].get_helicity_amp(
+                    data_c[decays[k]], data_p, all_data=all_data
+                )
+                H_i = tf.reshape(H_i, (-1, 1, *decay.n_helicity_inner()))
+                H.append(tf.cast(H_i, D_conj.dtype))
+            H = _stack_broadcast(H, axis=1)
+            D_conj = tf.expand_dims(tf.stop_gradient(D_conj), axis=1)
+            amp_d.append(H * D_conj)
+            indices.append(["i"] + decay.amp_index(base_map))
+            if chain_0.sparse_helicity:
+                mask = [decays[k].get_amp_mask() for *_, decays in group]
+                masks.append(
+                    None if any(i is None for i in mask) else np.stack(mask)
+                )
+
+        charge = all_data.get("charge_conjugation", 1)
+        total = []
+        for decay_chain, data_c, data_p, _ in group:
+            rs = decay_chain.get_amp_particle(
+                data_p, data_c, all_data=all_data
+            )
+            total_i = decay_chain.get_cp_amp_total(charge=charge)
+            if rs is not None:
+                total_i = total_i * tf.cast(rs, total_i.dtype)
+            total.append(total_i)
+        amp_d.append(_stack_broadcast(total, axis=-1))
+        indices.append(["i"])
+        masks += [None] * (len(amp_d) - len(masks))
+
+        if chain_0.aligned:
+            for i in decays_0:
+                for idxj, j in enumerate(i.outs):
+                    if j.J != 0:
+                        ang = data_c_0[i][j].get("aligned_angle", None)
+                        if ang is None and not getattr(
+                            i, "helicity_inner_full", False
+                        ):
+                            continue
+                        dt = get_D_matrix_lambda(
+                            ang, j.J, i.list_helicity_inner()[idxj], j.spins
+                        )
+                        amp_d.append(tf.stop_gradient(dt))
+                        idx = [base_map[j], base_map[j].upper()]
+                        indices.append(idx)
+                        final_indices = final_indices.replace(*idx)
+        idx = ",".join("".join(iter_idx + i) for i in indices)
+        idx_s = "{}->{}".format(idx, final_indices)
+        if not any(i is not None for i in masks):
+            masks = []
+        block = all_data.get("helicity_block") if all_data else None
+        if block is not None:
+            amp_d, masks = _helicity_block_amp(idx_s, amp_d, masks, block)
+        if masks:
+            return _sparse_helicity_amp(idx_s, amp_d, masks)
+        try:
+            ret = einsum(idx_s, *amp_d)
+        except Exception:
+            ret = tf.einsum(idx_s, *amp_d)
+        return ret
+
+    def build_mass_cache(self, data):
+        """
+        Add the cache of resonances (:code:`Particle.get_mass_cache`) to
+        :code:`data["particle"][...]["mass_cache"]`, it is built once for
+        the dataset and used in :code:`get_amp`.
+        """
+        data_particle = data["particle"]
+        for chains in self.get_chains_map():
+            for decay_chain, chain_map in chains.items():
+                for k, i in chain_map.items():
+                    if i not in decay_chain.inner or k not in data_particle:
+                        continue
+                    data_k = data_particle[k]
+                    cache = data_k.get("mass_cache", {})
+                    if str(i) in cache:
+                        continue
+                    value = i.get_mass_cache(data_k["m"])
+                    if value is not None:
+                        cache[str(i)] = value
+                        data_k["mass_cache"] = cache
+        return data
+
+    def get_fused_lineshape(self, chain_data):
+        """
+        Lineshape of the resonances with the default model (`BWR`) sharing
+        the same invariant mass, evaluated together by :code:`BWR_vec`.
+
+        :param chain_data: list of `(decay_chain, data_c, data_p)`
+        :return: dict of `{particle: amplitude}`
+        """
+        groups = {}
+        used = set()
+        for decay_chain, data_c, data_p in chain_data:
+            for i in decay_chain.inner:
+                if (
+                    type(i) is not Particle
+                    or getattr(i, "tabulated", False)
+                    or not i.running_width
+                    or i.get_width() is None
+                    or i in used
+                    or len(i.decay) == 0
+                ):
+                    continue
+                used.add(i)
+                decay_i = decay_chain.get_inner_decay(i)
+                if len(decay_i.outs) != 2 or decay_i.below_threshold:
+                    continue
+                # the same data for the same invariant mass
+                key = tuple(id(data_p[j]["m"]) for j in [i, *decay_i.outs])
+                groups.setdefault(key, []).append(
+                    (i, decay_i, data_c[decay_i], data_p)
+                )
+        ret = {}
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            _, decay_0, data_c_0, data_p_0 = members[0]
+            m = data_p_0[decay_0.core]["m"]
+            if "|q|" in data_c_0:
+                q = data_c_0["|q|"]
+            else:
+                q = decay_0.get_relative_momentum(data_p_0, True)
+            mass, width, q0, bw_l, d = [], [], [], [], []
+            for i, decay_i, _, data_p in members:
+                if i.bw_l is None:
+                    i.bw_l = min(i.decay[0].get_l_list())
+                mass.append(i.get_mass())
+                width.append(i.get_width())
+                q0.append(decay_i.get_relative_momentum(data_p, False))
+                bw_l.append(i.bw_l)
+                d.append(i.d)
+            mass = tf.stack([tf.cast(i, m.dtype) for i in mass])
+            width = tf.stack([tf.cast(i, m.dtype) for i in width])
+            q0 = tf.stack([tf.cast(i, m.dtype) for i in q0])
+            amp = BWR_vec(m, mass, width, q, q0, bw_l, d)
+            for idx, (i, _, _, _) in enumerate(members):
+                ret_i = amp[..., idx]
+                if i.width_norm:
+                    ret_i = (
+                        tf.cast(to_complex(width[idx]), ret_i.dtype) * ret_i
+                    )
+                ret[i] = ret_i
+        return ret
+
     def get_m_dep(self, data):
         """get mass dependent items"""
         data_particle = data["particle"]
@@ -1890,12 +2369,16 @@ class DecayGroup(BaseDecayGroup, AmpBase):
     def get_amp2(self, data):
         amp = self.get_amp(data)
         id_swap = data.get("id_swap", {})
+        block = data.get("helicity_block", None)
         for k, v in id_swap.items():
             new_data = {**data, **v}
             factor = self.get_swap_factor(k)
+            swap_index = self.get_id_swap_transpose(k, len(amp.shape))
+            if block is not None:
+                axis = swap_index[block[0]] - len(amp.shape)
+                new_data["helicity_block"] = (axis, *block[1:])
             amp_swap = factor * self.get_amp(new_data)
             # print(k, amp, amp_swap)
-            swap_index = self.get_id_swap_transpose(k, len(amp_swap.shape))
             # print(swap_index)
             amp_swap = tf.transpose(amp_swap, swap_index)
             amp = amp + amp_swap
@@ -1904,7 +2387,6 @@ class DecayGroup(BaseDecayGroup, AmpBase):
     def get_amp3(self, data):
         amp = self.get_amp2(data)
         if "cp_swap" in data:
-            amp_swap = self.get_amp2(data["cp_swap"])
             cg = cp_charge_group(
                 [str(i) for i in self.outs],
                 self.identical_particles,
@@ -1921,9 +2403,17 @@ class DecayGroup(BaseDecayGroup, AmpBase):
                         frac = frac * getattr(name_map[i], "C", -1)
                     else:
                         change.append((i, j))
-            transpose = self.get_swap_transpose(
-                tuple(change), len(amp_swap.shape)
-            )
+            transpose = self.get_swap_transpose(tuple(change), len(amp.shape))
+            data_swap = data["cp_swap"]
+            block = data.get("helicity_block", None)
+            if block is not None:
+                # reversed helicity in the transposed axis
+                axis, start, stop = block
+                n = len(([self.top] + list(self.outs))[axis].spins)
+                axis = transpose[axis] - len(amp.shape)
+                block = (axis, n - stop, n - start)
+                data_swap = {**data_swap, "helicity_block": block}
+            amp_swap = self.get_amp2(data_swap)
             p_reverse = [Ellipsis] + [
                 slice(None, None, -1) for i in range(len(amp_swap.shape) - 1)
             ]
@@ -1941,6 +2431,8 @@ class DecayGroup(BaseDecayGroup, AmpBase):
         """
         if not cached:
             data = simple_deepcopy(data)
+        if self.helicity_block is not None:
+            return self.sum_amp_block(data)
         if self.polarization != "none":
             return self.sum_amp_polarization(data)
         amp = self.get_amp3(data)
@@ -1949,6 +2441,29 @@ class DecayGroup(BaseDecayGroup, AmpBase):
         sum_A = tf.reduce_sum(amp2s, idx)
         return sum_A
 
+    def sum_amp_block(self, data, block_size=None):
+        """
+        the same as `sum_amp`, but accumulated over the blocks of
+        **block_size** (default :code:`self.helicity_block`) helicities of
+        the final particle with the most helicities. The blocks are
+        evaluated one after another, so only a block of the amplitude is
+        kept in memory, while the amplitudes of decays are recalculated for
+        each block.
+        """
+        if block_size is None:
+            block_size = self.helicity_block
+        sizes = [len(i.spins) for i in self.outs]
+        axis = int(np.argmax(sizes)) - len(sizes)
+        n = sizes[axis]
+        ret, deps = 0.0, []
+        for start in range(0, n, block_size):
+            block = (axis, start, min(start + block_size, n))
+            with tf.control_dependencies(deps):
+                amp = self.get_amp3({**data, "helicity_block": block})
+                ret = ret + self.sum_with_polarization(amp)
+            deps = [ret]
+        return ret
+
     def sum_with_polarization(self, amp):
         if self.polarization != "none":
             # (i, la, lb lc ld ...)
@@ -2162,6 +2677,15 @@ def index_generator(base_map=None):
         yield i
 
 
+def _stack_broadcast(values, axis=0):
+    """stack tensors after broadcasting them to the same shape"""
+    values = [tf.convert_to_tensor(i) for i in values]
+    shape = tf.shape(values[0])
+    for i in values[1:]:
+        shape = tf.broadcast_dynamic_shape(shape, tf.shape(i))
+    return tf.stack([tf.broadcast_to(i, shape) for i in values], axis=axis)
+
+
 def rename_data_dict(data, idx_map):
     if isinstance(data, dict):
         return {
@@ -44,6 +44,9 @@ class InterpolationParticle(Particle):
 
     def get_amp(self, data, *args, **kwargs):
         m = data["m"]
+        cache = data.get("mass_cache", {}).get(str(self), None)
+        if cache is not None:
+            return self.interp_from_cache(cache)
         fm = self.interp(m)
         return fm
 
@@ -56,7 +59,55 @@ class InterpolationParticle(Particle):
         return self.interp(mass)
 
     def interp(self, mass):
-        raise NotImplementedError
+        basis = self.interp_basis(mass)
+        if basis is None:
+            raise NotImplementedError
+        _, p_r, p_i = self.get_basis_values()
+        basis = tf.stop_gradient(basis)
+        ret_r = tf.linalg.matvec(basis, tf.cast(p_r, basis.dtype))
+        ret_i = tf.linalg.matvec(basis, tf.cast(p_i, basis.dtype))
+        return tf.complex(ret_r, ret_i)
+
+    def interp_basis(self, mass):
+        """
+        Basis matrix :math:`B(m)` with shape :math:`(N, n_{points})` for the
+        models linear in the point values :math:`p`, :math:`f(m) = B(m) p`.
+        It depends only on the mass and the knots. :code:`None` for the
+        other models.
+        """
+        return None
+
+    def get_basis_values(self):
+        """point values matched to the columns of :code:`interp_basis`"""
+        p = tf.convert_to_tensor(self.point_value())
+        return self.points, tf.math.real(p), tf.math.imag(p)
+
+    def get_mass_cache(self, m):
+        """
+        Parameter independent basis of the interpolation for mass **m**, see
+        :code:`sparse_basis`.
+        """
+        m = tf.convert_to_tensor(m)
+        if self.interp_basis(m[:1]) is None:
+            return None
+        return sparse_basis(lambda x: self.interp_basis(x).numpy(), m.numpy())
+
+    def interp_from_cache(self, cache):
+        _, p_r, p_i = self.get_basis_values()
+        value = cache["value"]
+        if "idx" not in cache:
+            ret_r = tf.linalg.matvec(value, tf.cast(p_r, value.dtype))
+            ret_i = tf.linalg.matvec(value, tf.cast(p_i, value.dtype))
+            return tf.complex(ret_r, ret_i)
+        ret_r = tf.reduce_sum(
+            tf.gather(tf.cast(p_r, value.dtype), cache["idx"]) * value,
+            axis=-1,
+        )
+        ret_i = tf.reduce_sum(
+            tf.gather(tf.cast(p_i, value.dtype), cache["idx"]) * value,
+            axis=-1,
+        )
+        return tf.complex(ret_r, ret_i)
 
     def get_point_values(self):
         p = self.point_value()
@@ -89,6 +140,49 @@ class InterpolationParticle(Particle):
         return bin_idx
 
 
+def sparse_basis(f, m, chunk_size=100000):
+    """
+    Evaluate the dense basis **f(m)** in chunks and keep the nonzero columns
+    of each row as :code:`{"idx": (N, w), "value": (N, w)}`. Rows with less
+    nonzero columns are padded with zeros. If more than half of the columns
+    are used, the dense basis :code:`{"value": (N, n)}` is kept instead.
+
+    >>> m = np.array([0.5, 1.5, 2.5])
+    >>> f = lambda x: np.stack([x < 1, x > 1, x > 2, x > 3, x > 4], -1) * 1.0
+    >>> cache = sparse_basis(f, m)
+    >>> cache["idx"]
+    array([[0, 1],
+           [1, 0],
+           [1, 2]])
+    >>> cache["value"]
+    array([[1., 0.],
+           [1., 0.],
+           [1., 1.]])
+    >>> sparse_basis(lambda x: np.stack([x, x, x], -1), m)["value"].shape
+    (3, 3)
+
+    """
+    chunks = range(0, max(m.shape[0], 1), chunk_size)
+    idx, value = [], []
+    for i in chunks:
+        basis = f(m[i : i + chunk_size])
+        nonzero = basis != 0
+        w = max(int(np.max(np.sum(nonzero, axis=-1), initial=0)), 1)
+        idx_i = np.argsort(~nonzero, axis=-1, kind="stable")[:, :w]
+        idx.append(idx_i)
+        value.append(np.take_along_axis(basis, idx_i, axis=-1))
+    w = max(i.shape[-1] for i in idx)
+    if 2 * w > basis.shape[-1]:
+        return {
+            "value": np.concatenate([f(m[i : i + chunk_size]) for i in chunks])
+        }
+    pad = lambda x: np.pad(x, [(0, 0), (0, w - x.shape[-1])])
+    return {
+        "idx": np.concatenate([pad(i) for i in idx]),
+        "value": np.concatenate([pad(i) for i in value]),
+    }
+
+
 @register_particle("linear_npy")
 class InterpLinearNpy(InterpolationParticle):
     """
@@ -208,10 +302,9 @@ class Interp(InterpolationParticle):
 class Interp(InterpolationParticle):
     """linear interpolation for complex number"""
 
-    def interp(self, m):
+    def interp_basis(self, m):
         # q = data_extra[self.outs[0]]["|q|"]
         # a = self.a()
-        p = self.point_value()
         zeros = tf.zeros_like(m)
         ones = tf.ones_like(m)
 
@@ -233,12 +326,7 @@ class Interp(InterpolationParticle):
             [poly_i(i, self.points) for i in range(1, self.interp_N - 1)],
             axis=-1,
         )
-        h = tf.stop_gradient(h)
-        p_r = tf.math.real(p)
-        p_i = tf.math.imag(p)
-        ret_r = tf.reduce_sum(h * p_r, axis=-1)
-        ret_i = tf.reduce_sum(h * p_i, axis=-1)
-        return tf.complex(ret_r, ret_i)
+        return h
 
 
 @register_particle("spline_c")
@@ -249,29 +337,23 @@ class Interp1DSpline(InterpolationParticle):
         self.bc_type = "not-a-knot"
         super(Interp1DSpline, self).__init__(*args, **kwargs)
         assert self.interp_N > 2, "points need large than 2"
-        self.h_matrix = None
-
-    def init_params(self):
-        super(Interp1DSpline, self).init_params()
         h_matrix = spline_xi_matrix(self.points, self.bc_type)
         if self.with_bound:
             self.h_matrix = tf.convert_to_tensor(h_matrix)
         else:
             self.h_matrix = tf.convert_to_tensor(h_matrix[..., 1:-1])
 
-    def interp(self, m):
-        zeros = tf.zeros_like(m)
-        p = self.point_value()
-        p_r = tf.math.real(p)
-        p_i = tf.math.imag(p)
-        xi_m = self.h_matrix
-        x_m = spline_x_matrix(m, self.points)
-        x_m = tf.expand_dims(x_m, axis=-1)
-        m_xi = tf.reduce_sum(xi_m * x_m, axis=[-3, -2])
-        m_xi = tf.stop_gradient(m_xi)
-        ret_r = tf.reduce_sum(tf.cast(m_xi, p_r.dtype) * p_r, axis=-1)
-        ret_i = tf.reduce_sum(tf.cast(m_xi, p_i.dtype) * p_i, axis=-1)
-        return tf.complex(ret_r, ret_i)
+    def interp_basis(self, m):
+        # only the polynomial of the bin m in is used
+        n = len(self.points) - 1
+        idx = tf.raw_ops.Bucketize(input=m, boundaries=list(self.points)) - 1
+        xi_m = tf.gather(
+            tf.cast(self.h_matrix, m.dtype), tf.clip_by_value(idx, 0, n - 1)
+        )
+        x_p = tf.stack([tf.ones_like(m), m, m * m, m * m * m], axis=-1)
+        m_xi = tf.reduce_sum(xi_m * tf.expand_dims(x_p, axis=-1), axis=-2)
+        cut = tf.expand_dims((idx >= 0) & (idx < n), axis=-1)
+        return tf.where(cut, m_xi, tf.zeros_like(m_xi))
 
 
 def spline_x_matrix(x, xi):
@@ -382,10 +464,9 @@ def spline_xi_matrix(xi, bc_type="not-a-knot"):
 class Interp1D3(InterpolationParticle):
     """Piecewise third order interpolation"""
 
-    def interp(self, m):
-        p = self.point_value()
-        ret = interp1d3(m, self.points, tf.stack(p))
-        return ret
+    def interp_basis(self, m):
+        h, _ = get_matrix_interp1d3(m, self.points)
+        return h
 
 
 def interp1d3(x, xi, yi):
@@ -424,13 +505,9 @@ def get_matrix_interp1d3(x, xi):
 class Interp1DLang(InterpolationParticle):
     """Lagrange interpolation"""
 
-    def interp(self, m):
-        zeros = tf.zeros_like(m)
-        p = self.point_value()
-        xs = []
-
+    def interp_basis(self, m):
         def poly_i(i):
-            x = 1.0
+            x = tf.ones_like(m)
             for j in range(self.interp_N):
                 if i == j:
                     continue
@@ -442,18 +519,14 @@ class Interp1DLang(InterpolationParticle):
             return x
 
         xs = tf.stack([poly_i(i) for i in range(self.interp_N)], axis=-1)
-        zeros = tf.zeros_like(xs)
-        xs = tf.complex(xs, zeros)
-        ret = tf.reduce_sum(xs[:, 1:-1] * p, axis=-1)
-        return ret
+        return xs[:, 1:-1]
 
 
 @register_particle("interp_hist")
 class InterpHist(InterpolationParticle):
     """Interpolation for each bins as constant"""
 
-    def interp(self, m):
-        p = self.point_value()
+    def interp_basis(self, m):
         ones = tf.ones_like(m)
         zeros = tf.zeros_like(m)
 
@@ -471,12 +544,7 @@ class InterpHist(InterpolationParticle):
             ],
             axis=-1,
         )
-        p_r = tf.math.real(p)
-        p_i = tf.math.imag(p)
-        x_bin = tf.stop_gradient(x_bin)
-        ret_r = tf.reduce_sum(x_bin * p_r, axis=-1)
-        ret_i = tf.reduce_sum(x_bin * p_i, axis=-1)
-        return tf.complex(ret_r, ret_i)
+        return x_bin
 
 
 class HistParticle(InterpolationParticle):
@@ -563,10 +631,6 @@ class Interp1DSplineIdx(InterpolationParticle):
         self.bc_type = "not-a-knot"
         super().__init__(*args, **kwargs)
         assert self.interp_N > 2, "points need large than 2"
-        self.h_matrix = None
-
-    def init_params(self):
-        super(Interp1DSplineIdx, self).init_params()
         h_matrix = spline_xi_matrix(self.points, self.bc_type)
         if self.with_bound:
             self.h_matrix = tf.convert_to_tensor(h_matrix.transpose((1, 0, 2)))
@@ -585,6 +649,13 @@ class Interp1DSplineIdx(InterpolationParticle):
         ret_i = do_spline_hmatrix(self.h_matrix, p_i, m, idx)
         return tf.complex(ret_r, ret_i)
 
+    def interp_basis(self, m):
+        idx = self.get_bin_index(m)
+        idx = tf.clip_by_value(idx, 0, self.h_matrix.shape[1] - 1)
+        h = tf.gather(tf.cast(self.h_matrix, m.dtype), idx, axis=1)
+        x_p = tf.stack([tf.ones_like(m), m, m * m, m * m * m])
+        return tf.reduce_sum(h * tf.expand_dims(x_p, axis=-1), axis=0)
+
 
 def do_spline_hmatrix(h_matrix, y, m, idx):
     ai, bi, ci, di = tf.unstack(tf.reduce_sum(h_matrix * y, axis=-1), axis=0)
@@ -600,20 +671,9 @@ def do_spline_hmatrix(h_matrix, y, m, idx):
 
 @register_particle("interp_l3")
 class InterpL3(InterpolationParticle):
-    def interp(self, m):
-        p = self.point_value()
-        ones = tf.ones_like(m)
-        zeros = tf.zeros_like(m)
-        p_r = tf.math.real(p)
-        p_i = tf.math.imag(p)
-        h, b = get_matrix_interp1d3_v2(m, self.points)
-        h = tf.stop_gradient(h)
-        f = lambda x: tf.reshape(
-            tf.matmul(tf.cast(h, x.dtype), tf.reshape(x, (-1, 1))), b.shape
-        ) + tf.cast(b, x.dtype)
-        ret_r = f(p_r)
-        ret_i = f(p_i)
-        return tf.complex(ret_r, ret_i)
+    def interp_basis(self, m):
+        h, _ = get_matrix_interp1d3_v2(m, self.points)
+        return h
 
 
 def get_matrix_interp1d3_v2(x, xi):
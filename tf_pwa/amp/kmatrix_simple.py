@@ -5,6 +5,7 @@ import tensorflow as tf
 from tf_pwa.amp import HelicityDecay, Particle, register_particle
 from tf_pwa.amp.Kmatrix import KmatrixSplitLSParticle
 from tf_pwa.breit_wigner import Bprime_polynomial
+from tf_pwa.linalg import small_solve
 
 
 def get_relative_p(m, m1, m2):
@@ -130,10 +131,8 @@ class KmatrixSimple(KmatrixSplitLSParticle):
         dom = (
             tf.cast(tf.eye(self.n_channel), K.dtype) - 1.0j * K_i_rho_n2
         )  # .einsum("...ij,...jk->...ik", np.eye(self.n_channel) * rho[:,:,None], K)
-        k_inv = tf.linalg.inv(dom)
-        ret = tf.reduce_sum(k_inv * P[..., None, :], axis=-1) * tf.cast(
-            n2, P.dtype
-        )
+        # (1 - i K rho)^{-1} P
+        ret = small_solve(dom, P[..., None])[..., 0] * tf.cast(n2, P.dtype)
         return tf.stack([ret[..., i] for i in self.index_list], axis=-1)
 
     def build_barrier_factor(self, s):
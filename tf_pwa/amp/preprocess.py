@@ -68,6 +68,10 @@ class BasePreProcessor(HeavyCall):
             if k in self.kwargs:
                 kwargs[k] = self.kwargs[k]
         ret = cal_angle_from_momentum(p4, self.decay_struct, **kwargs)
+        if self.kwargs.get("mass_cache", True):
+            decay_group = getattr(self.root_config, "full_decay", None)
+            if decay_group is not None:
+                ret = decay_group.build_mass_cache(ret)
         return ret
 
 
@@ -0,0 +1,117 @@
+"""
+Tabulated lineshape for particles with fixed shape.
+
+The lineshape is evaluated on an adaptive mass grid once, and the amplitude
+is a cubic Hermite interpolation of the table.
+"""
+
+import numpy as np
+
+from tf_pwa.tensorflow_wrapper import tf
+
+
+def hermite_slopes(x, y):
+    """
+    Slopes at the grid points from the three points formula, the end points
+    use the one side formula. **y** has the shape :math:`(n, k)`.
+
+    >>> x = np.array([0.0, 0.5, 1.5, 2.0])
+    >>> np.allclose(hermite_slopes(x, x[:, None]**2), 2 * x[:, None])
+    True
+
+    """
+    h = np.diff(x)[:, None]
+    delta = np.diff(y, axis=0) / h
+    d = np.empty_like(y)
+    d[1:-1] = (h[1:] * delta[:-1] + h[:-1] * delta[1:]) / (h[1:] + h[:-1])
+    d[0] = ((2 * h[0] + h[1]) * delta[0] - h[0] * delta[1]) / (h[0] + h[1])
+    d[-1] = ((2 * h[-1] + h[-2]) * delta[-1] - h[-1] * delta[-2]) / (
+        h[-1] + h[-2]
+    )
+    return d
+
+
+def hermite_coeffs(x, y):
+    """
+    Coefficients of the cubic polynomial
+    :math:`y_i + c_1 t + c_2 t^2 + c_3 t^3` with :math:`t = (m - x_i)/h_i`
+    for each interval.
+
+    :return: array with shape :math:`(4, n-1, k)`
+    """
+    h = np.diff(x)[:, None]
+    d = hermite_slopes(x, y)
+    y0, y1, d0, d1 = y[:-1], y[1:], d[:-1] * h, d[1:] * h
+    c2 = 3 * (y1 - y0) - 2 * d0 - d1
+    c3 = 2 * (y0 - y1) + d0 + d1
+    return np.stack([y0, d0, c2, c3])
+
+
+class LineshapeTable:
+    """
+    Cubic Hermite interpolation table of the complex function :code:`f(m)` in
+    :math:`[m_{min}, m_{max}]`. :code:`f(m)` can have extra dimensions after
+    the first one, such as the different channels of K matrix.
+
+    Starting from **n_init** uniform points, the intervals whose midpoint
+    differs from :code:`f` by more than :code:`rtol * max(abs(f))` are split,
+    until all the midpoints pass or there are **max_points** points.
+    :code:`error` is the largest relative error at the midpoints of the
+    final grid.
+
+    >>> from tf_pwa.breit_wigner import BW
+    >>> table = LineshapeTable(lambda m: BW(m, 1.0, 0.1), 0.5, 1.5)
+    >>> bool(table.error < 1e-6)
+    True
+    >>> m = tf.constant([0.6, 0.95, 1.0, 1.2], dtype=tf.float64)
+    >>> np.allclose(table(m), BW(m, 1.0, 0.1), rtol=1e-5)
+    True
+
+    """
+
+    def __init__(
+        self, f, m_min, m_max, rtol=1e-6, n_init=64, max_points=100000
+    ):
+        self.f = f
+        self.rtol = rtol
+        x = np.linspace(m_min, m_max, n_init)
+        y = self.eval_f(x)
+        scale = np.max(np.abs(y))
+        while True:
+            coeffs = hermite_coeffs(x, y)
+            x_mid = (x[1:] + x[:-1]) / 2
+            y_mid = self.eval_f(x_mid)
+            # value at t = 0.5
+            t = np.array([1.0, 0.5, 0.25, 0.125])[:, None, None]
+            y_interp = np.sum(coeffs * t, axis=0)
+            err = np.max(np.abs(y_mid - y_interp), axis=-1) / scale
+            bad = err > rtol
+            if not np.any(bad) or x.shape[0] + np.sum(bad) > max_points:
+                break
+            x = np.concatenate([x, x_mid[bad]])
+            y = np.concatenate([y, y_mid[bad]])
+            idx = np.argsort(x)
+            x, y = x[idx], y[idx]
+        self.error = float(np.max(err))
+        self.x = x
+        self.coeffs = coeffs
+
+    def eval_f(self, x):
+        y = np.asarray(self.f(tf.convert_to_tensor(x, tf.float64)))
+        self.shape = y.shape[1:]
+        y = np.reshape(y.astype(np.complex128), (x.shape[0], -1))
+        if not np.all(np.isfinite(y)):
+            raise ValueError("lineshape is not finite in the table range")
+        return y
+
+    def __call__(self, m):
+        m = tf.convert_to_tensor(m)
+        x = tf.convert_to_tensor(self.x, m.dtype)
+        idx = tf.searchsorted(x, m, side="right") - 1
+        idx = tf.clip_by_value(idx, 0, self.x.shape[0] - 2)
+        h = tf.gather(x[1:] - x[:-1], idx)
+        t = (m - tf.gather(x, idx)) / h
+        t = tf.cast(t, tf.complex128)[:, None]
+        c0, c1, c2, c3 = [tf.gather(i, idx) for i in self.coeffs]
+        ret = c0 + t * (c1 + t * (c2 + t * c3))
+        return tf.reshape(ret, (-1, *self.shape))
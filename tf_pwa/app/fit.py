@@ -1,8 +1,6 @@
 import json
 from pprint import pprint
 
-from tf_pwa.config_loader import ConfigLoader
-from tf_pwa.experimental import extra_amp, extra_data
 from tf_pwa.main import regist_subcommand
 from tf_pwa.utils import error_print
 
@@ -18,6 +16,9 @@ def fit(config="config.yml", init_params="init_params.json", method="BFGS"):
     """
     simple fit script
     """
+    from tf_pwa.config_loader import ConfigLoader
+    from tf_pwa.experimental import extra_amp, extra_data
+
     # load config.yml
     config = ConfigLoader(config)
 
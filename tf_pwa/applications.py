@@ -8,7 +8,6 @@ import os
 import time
 import warnings
 
-import matplotlib.pyplot as plt
 import numpy as np
 import tensorflow as tf
 from scipy.stats import norm as Norm
@@ -23,7 +22,14 @@ from .fitfractions import (
 )
 from .phasespace import PhaseSpaceGenerator
 from .significance import significance
-from .utils import check_positive_definite, error_print, std_periodic_var
+from .utils import (
+    LazyModule,
+    check_positive_definite,
+    error_print,
+    std_periodic_var,
+)
+
+plt = LazyModule("matplotlib.pyplot")
 
 
 def fit_fractions(
@@ -521,7 +527,7 @@ def fit(Use="scipy", **kwargs):
     For ``fit_scipy``
 
     :param fcn: FCN object to be minimized.
-    :param method: String. Options in ``scipy.optimize``. For now, it implements interface to such as "BFGS", "L-BFGS-B", "basinhopping".
+    :param method: String. Options in ``scipy.optimize``. For now, it implements interface to such as "BFGS", "L-BFGS-B", "basinhopping". ``"staged-<method>"`` fits subsamples of increasing size before the full sample with ``<method>``, see ``tf_pwa.fit.fit_staged``.
     :param bounds_dict: Dictionary of boundary constrain to variables.
     :param kwargs: Other arguments passed on to ``scipy.optimize`` functions.
     :return: FitResult object, List of NLLs, List of point arrays.
@@ -0,0 +1,256 @@
+"""
+Tuning of batch sizes.
+
+The batch size of a call site (such as ``"nll_grad"`` or ``"hessian"``) is
+chosen by probing its function on the first events of a sample, with the
+batch sizes :math:`2^k` times ``min_batch``. The time and the peak memory
+of each probe are measured, and the smallest batch with the throughput
+close to the best one under the memory limit is used. The results are
+saved in a JSON file with the fingerprint of the model in the key, so the
+later runs start with the tuned batch sizes.
+
+.. code::
+
+    tuner = BatchTuner(memory_limit=4000, cache_file="batch.json")
+    batch = tuner.tune(amp, phsp, key=tuner.cache_key(fingerprint, "plot"))
+
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from tf_pwa.data import data_shape, data_split
+from tf_pwa.tensorflow_wrapper import tf
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def _device():
+    if tf.config.list_logical_devices("GPU"):
+        return "GPU:0"
+    return "CPU:0"
+
+
+def _memory_info(device):
+    """statistics of the allocator of TensorFlow, None if not supported"""
+    try:
+        return tf.config.experimental.get_memory_info(device)
+    except Exception:  # not supported by the device or TensorFlow version
+        return None
+
+
+def _max_rss():
+    """peak resident memory (MB) of this process"""
+    if resource is None:
+        return 0.0
+    # ru_maxrss is in bytes on macOS and in KB on Linux
+    scale = 2**20 if sys.platform == "darwin" else 2**10
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def _current_rss():
+    """resident memory (MB) of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return _max_rss()
+
+
+def _sync(x):
+    """wait for the results of asynchronous devices"""
+    return tf.nest.map_structure(
+        lambda i: i.numpy() if hasattr(i, "numpy") else i, x
+    )
+
+
+def measure_peak_memory(f, *args, base=None, interval=0.002, **kwargs):
+    """
+    Call **f** and measure the peak memory (MB) in the call. It comes from
+    the statistics of the allocator of TensorFlow, above the memory before
+    the call. If the statistics are not supported, the resident memory of
+    the process is polled every **interval** seconds in a thread, and the
+    peak is above **base** (the memory before the call by default).
+
+    :return: The result of **f**, and the peak memory.
+    """
+    device = _device()
+    info = _memory_info(device)
+    if info is not None:
+        tf.config.experimental.reset_memory_stats(device)
+        ret = f(*args, **kwargs)
+        peak = _memory_info(device)["peak"]
+        return ret, max(peak - info["current"], 0) / 2**20
+    if base is None:
+        base = _current_rss()
+    peak = [_current_rss()]
+    done = threading.Event()
+
+    def _poll():
+        while not done.wait(interval):
+            peak[0] = max(peak[0], _current_rss())
+
+    thread = threading.Thread(target=_poll, daemon=True)
+    thread.start()
+    try:
+        ret = f(*args, **kwargs)
+    finally:
+        done.set()
+        thread.join()
+    peak = max(peak[0], _current_rss())
+    return ret, max(peak - base, 0.0)
+
+
+class BatchTuner:
+    """
+    Batch size tuner with cache.
+
+    :param memory_limit: Peak memory (MB) allowed for a batch, no limit if
+        it is None.
+    :param cache_file: JSON file for the tuned results.
+    :param min_batch: The smallest batch size to probe.
+    :param max_batch: The largest batch size to use.
+    :param repeat: Number of timed calls for each probe, after one call of
+        warm up (tracing of :code:`tf.function`).
+    :param tol: Relative loss of throughput allowed for a smaller batch.
+    """
+
+    def __init__(
+        self,
+        memory_limit=None,
+        cache_file=None,
+        min_batch=1000,
+        max_batch=1000000,
+        repeat=2,
+        tol=0.1,
+    ):
+        self.memory_limit = memory_limit
+        self.cache_file = cache_file
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.repeat = repeat
+        self.tol = tol
+        self.results = {}
+        if cache_file is not None and os.path.exists(cache_file):
+            with open(cache_file) as f:
+                self.results = json.load(f)
+
+    def cache_key(self, fingerprint, site):
+        """key of cache, also depends on the memory limit and device"""
+        return "{}/{}/{}/{}".format(
+            fingerprint, site, self.memory_limit, _device()
+        )
+
+    def save(self):
+        if self.cache_file is None:
+            return
+        tmp_file = "{}.{}.tmp".format(self.cache_file, os.getpid())
+        with open(tmp_file, "w") as f:
+            json.dump(self.results, f, indent=2)
+        os.replace(tmp_file, self.cache_file)
+
+    def probe(self, f, data, batch, base=None):
+        """
+        Time of one call and peak memory (above **base**) of **f** for the
+        first **batch** events of **data**.
+        """
+        data_i = next(iter(data_split(data, batch)))
+
+        def _run():
+            _sync(f(data_i))
+            cost = []
+            for _ in range(self.repeat):
+                now = time.perf_counter()
+                _sync(f(data_i))
+                cost.append(time.perf_counter() - now)
+            return min(cost)
+
+        return measure_peak_memory(_run, base=base)
+
+    def tune(self, f, data, key=None, multiple=1, default=None):
+        """
+        Batch size of **f**, from the cache of **key** or the probes on
+        **data**. The probes stop when the memory exceeds the limit, or the
+        throughput drops, or the batch exceeds the size of **data**.
+
+        :param multiple: The batch size is the multiple of it, for example
+            the resolution size.
+        :param default: Batch size if there are no probes, since **data**
+            is too small.
+        """
+        if key is not None and key in self.results:
+            return self.results[key]["batch"]
+        n_data = data_shape(data)
+        batch = -(-self.min_batch // multiple) * multiple
+        probes = []
+        best = 0.0
+        # the same base of resident memory for all probes, freed memory
+        # may be kept by malloc for the next probe
+        base = _current_rss()
+        while batch <= min(n_data, self.max_batch):
+            cost, memory = self.probe(f, data, batch, base)
+            probes.append([batch, cost, memory])
+            if self.memory_limit is not None and memory > self.memory_limit:
+                break
+            rate = batch / cost
+            if rate < best * (1 - self.tol):
+                break
+            best = max(best, rate)
+            batch *= 2
+        if not probes:
+            return default
+        limited = batch <= self.max_batch and batch > n_data
+        ret = self.choose(probes, multiple, limited)
+        if key is not None:
+            self.results[key] = {"batch": ret, "probes": probes}
+            self.save()
+        return ret
+
+    def memory_batch(self, probes, multiple=1):
+        """the largest batch under the memory limit by a linear fit"""
+        batch, _, memory = np.array(probes).T
+        if batch.shape[0] > 1:
+            k, b = np.polyfit(batch, memory, 1)
+        else:
+            k, b = memory[0] / batch[0], 0.0
+        if k * batch[-1] < 1.0:
+            # no increase of memory is found
+            return int(batch[-1])
+        ret = int((self.memory_limit - b) / k) // multiple * multiple
+        return min(max(ret, multiple), self.max_batch)
+
+    def choose(self, probes, multiple=1, limited=False):
+        """
+        The smallest batch of **probes** with throughput within **tol** of
+        the best one under the memory limit. If the best one is the
+        largest probe and the probes are **limited** by the size of data,
+        the batch is extrapolated to the memory limit.
+
+        :param probes: List of :code:`[batch, time, memory]`.
+        """
+        batch, cost, memory = np.array(probes).T
+        if self.memory_limit is None:
+            ok = np.ones(batch.shape, dtype=bool)
+        else:
+            ok = memory <= self.memory_limit
+        if not np.any(ok):
+            return self.memory_batch(probes, multiple)
+        rate = np.where(ok, batch / cost, 0.0)
+        idx = np.argmax(rate >= (1 - self.tol) * np.max(rate))
+        ret = int(batch[idx])
+        if (
+            limited
+            and self.memory_limit is not None
+            and np.argmax(rate) == len(probes) - 1
+        ):
+            ret = max(ret, self.memory_batch(probes, multiple))
+        return ret
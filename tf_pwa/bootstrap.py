@@ -0,0 +1,275 @@
+"""
+Bootstrap replicas of the likelihood by weight matrix.
+
+The replicas of a sample differ only in the weights of events, so they are
+kept as a weight matrix with the shape :math:`(N_{events}, K)` instead of
+:math:`K` reweighted datasets. At a common point of parameters, the NLLs
+and gradients of all the replicas come from the per-event log PDF and its
+Jacobian by one matrix product, see `BootstrapFCN.nll_grad_replicas`.
+
+The replica fits start from the nominal fit, take one Newton step with the
+nominal Hessian together, and are finished by BFGS in lockstep, see
+`BootstrapFCN.fit`.
+"""
+
+import numpy as np
+
+from tf_pwa.data import data_shape
+from tf_pwa.model.model import Model, clip_log
+from tf_pwa.tensorflow_wrapper import tf
+from tf_pwa.weight_smear import get_weight_smear
+
+
+def _event_log_pdf(amp, data, weight, resolution_size):
+    """log PDF and weight of each event, the same as `_batch_sum`"""
+    part_y = amp(data) * tf.cast(weight, tf.float64)
+    part_y = tf.reduce_sum(tf.reshape(part_y, (-1, resolution_size)), axis=-1)
+    event_w = tf.reduce_sum(tf.reshape(weight, (-1, resolution_size)), axis=-1)
+    dom_event_w = tf.where(event_w == 0, tf.ones_like(event_w), event_w)
+    return clip_log(part_y / dom_event_w), event_w
+
+
+class BootstrapFCN:
+    """
+    :math:`K` bootstrap replicas of the data weights of **fcn**. The
+    weights of replica :math:`k` are :math:`w_{i} r_{ik}`, with the smear
+    factors :math:`r_{ik}` from `tf_pwa.weight_smear` (the same factor for
+    all the resolution points of an event).
+
+    :param fcn: FCN object.
+    :param n_replica: Number of replicas.
+    :param smear: Name of the weight smear function, "Poisson", "Dirichlet"
+        or "Gamma".
+    :param seed: Random seed.
+    """
+
+    def __init__(self, fcn, n_replica=100, smear="Poisson", seed=None):
+        self.fcn = fcn
+        self.vm = fcn.vm
+        self.n_replica = n_replica
+        self.resolution_size = getattr(fcn.model, "resolution_size", 1)
+        rng = np.random.default_rng(seed)
+        smear_function = get_weight_smear(smear)
+        n_event = data_shape(fcn.data) // self.resolution_size
+        self.factors = np.stack(
+            [
+                smear_function(np.ones(n_event), rng=rng)
+                for _ in range(n_replica)
+            ],
+            axis=-1,
+        )
+        self.x = None
+        self.nll = None
+        self.nit = None
+        self.converged = None
+
+    @property
+    def trainable_variables(self):
+        return self.vm.trainable_variables
+
+    def _batch_factors(self):
+        n = 0
+        for w in self.fcn.batch_weight:
+            m = data_shape(w) // self.resolution_size
+            yield self.factors[n : n + m]
+            n += m
+
+    def replica_weight(self, k):
+        """batches of the data weights of replica **k**"""
+        return [
+            w * tf.constant(np.repeat(r[:, k], self.resolution_size))
+            for w, r in zip(self.fcn.batch_weight, self._batch_factors())
+        ]
+
+    def nll_grad_many(self, X, replicas=None):
+        """
+        NLLs and gradients of the replicas at their own parameters **X**
+        with the shape :math:`(K, n_{par})`, K evaluations of the model.
+
+        :param replicas: Indices of the replicas of **X**, default is all.
+        :return: Arrays with the shape :math:`(K,)` and :math:`(K, n_{par})`
+        """
+        fcn = self.fcn
+        if replicas is None:
+            replicas = range(self.n_replica)
+        params = self.vm.get_all_dic()
+        nlls, grads = [], []
+        for k, x in zip(replicas, X):
+            self.vm.set_all(x)
+            nll, g = fcn.model.nll_grad_batch(
+                fcn.batch_data,
+                fcn.batch_mcdata,
+                weight=self.replica_weight(k),
+                mc_weight=fcn.batch_mc_weight,
+            )
+            nlls.append(float(nll + fcn.gauss_constr.get_constrain_term()))
+            grads.append(np.array(g) + fcn.gauss_constr.get_constrain_grad())
+        self.vm.set_all(params)
+        return np.array(nlls), np.array(grads)
+
+    def nll_grad_replicas(self, x):
+        """
+        NLLs and gradients of all the replicas at the same parameters
+        **x**. The log PDF :math:`\\ln f_i` and its Jacobian :math:`J_{ip}`
+        (by forward mode, one pass per parameter) are calculated once, and
+
+        .. math::
+          NLL_k = -\\sum_i w_i r_{ik} \\ln f_i + S_k \\ln I,
+          \\quad
+          \\frac{\\partial NLL_k}{\\partial \\theta_p} =
+          -\\sum_i J_{ip} w_i r_{ik} + \\frac{S_k}{I}
+          \\frac{\\partial I}{\\partial \\theta_p}
+
+        with :math:`S_k = \\sum_i w_i r_{ik}`. Models other than `Model`
+        use `nll_grad_many`.
+
+        :return: Arrays with the shape :math:`(K,)` and :math:`(K, n_{par})`
+        """
+        from tensorflow.python.eager import forwardprop
+
+        fcn = self.fcn
+        if type(fcn.model) is not Model or self.vm.strategy is not None:
+            return self.nll_grad_many(np.tile(x, (self.n_replica, 1)))
+        base_model = fcn.model.model
+        amp = base_model.signal
+        var = self.trainable_variables
+        params = self.vm.get_all_dic()
+        self.vm.set_all(x)
+        ln_data = 0.0
+        g_ln_data = 0.0
+        sw = 0.0
+        for data_i, w_i, r_i in zip(
+            fcn.batch_data, fcn.batch_weight, self._batch_factors()
+        ):
+            cols = []
+            for p in range(len(var)):
+                tangents = [tf.zeros_like(v) for v in var]
+                tangents[p] = tf.ones_like(var[p])
+                with forwardprop.ForwardAccumulator(var, tangents) as acc:
+                    ln_f, event_w = _event_log_pdf(
+                        amp, data_i, w_i, self.resolution_size
+                    )
+                cols.append(acc.jvp(ln_f, unconnected_gradients="zero"))
+            # (n, K) weight matrix of replicas
+            w_k = event_w[:, None] * r_i
+            ln_data += tf.linalg.matvec(w_k, ln_f, transpose_a=True)
+            g_ln_data += tf.matmul(
+                w_k, tf.stack(cols, axis=-1), transpose_a=True
+            )
+            sw += tf.reduce_sum(w_k, axis=0)
+        with tf.GradientTape() as tape:
+            int_mc = 0.0
+            for mc_i, mc_w_i in zip(fcn.batch_mcdata, fcn.batch_mc_weight):
+                int_mc += tf.reduce_sum(amp(mc_i) * mc_w_i)
+        g_int_mc = tape.gradient(int_mc, var, unconnected_gradients="zero")
+        g_int_mc = tf.stack(g_int_mc) * base_model.int_g(int_mc)
+        nll = -ln_data + sw * base_model.int_f(int_mc)
+        grad = -g_ln_data + sw[:, None] * g_int_mc[None, :]
+        nll = nll.numpy() + fcn.gauss_constr.get_constrain_term()
+        grad = grad.numpy() + fcn.gauss_constr.get_constrain_grad()
+        self.vm.set_all(params)
+        return nll, grad
+
+    def fit(
+        self,
+        x0=None,
+        hess_inv=None,
+        gtol=1e-3,
+        maxiter=100,
+        max_line_search=10,
+        c1=1e-4,
+    ):
+        """
+        Fit all the replicas. Starting from the nominal fit **x0** (the
+        current parameters by default), all the replicas take one Newton
+        step :math:`\\theta_k = x_0 - H^{-1} g_k(x_0)` with the nominal
+        Hessian, whose gradients come from `nll_grad_replicas`. Then BFGS
+        iterations with backtracking line search are done in lockstep,
+        until the max of absolute gradient of each replica is less than
+        **gtol**. A replica restarts from steepest descent when its line
+        search fails, and stops if it fails again.
+
+        :param x0: Nominal fit parameters.
+        :param hess_inv: Nominal inverse Hessian, calculated at **x0** if
+            it is None.
+        :return: Array with the shape :math:`(K, n_{par})`, parameters of
+            the replicas.
+        """
+        if x0 is None:
+            x0 = self.vm.get_all_val()
+        x0 = np.array(x0, dtype=np.float64)
+        if hess_inv is None:
+            params = self.vm.get_all_dic()
+            _, _, hess = self.fcn.nll_grad_hessian(x0)
+            self.vm.set_all(params)
+            hess_inv = np.linalg.inv(np.array(hess))
+        K = self.n_replica
+        n_par = x0.shape[0]
+        x = np.tile(x0, (K, 1))
+        f, g = self.nll_grad_replicas(x0)
+        H = np.tile(hess_inv, (K, 1, 1))
+        nit = np.zeros(K, dtype=int)
+        # replicas with H reset to identity, and stopped by line search
+        reset = np.zeros(K, dtype=bool)
+        stopped = np.zeros(K, dtype=bool)
+        for _ in range(maxiter):
+            active = (np.max(np.abs(g), axis=-1) > gtol) & ~stopped
+            if not np.any(active):
+                break
+            idx = np.nonzero(active)[0]
+            p = -np.einsum("kij,kj->ki", H[idx], g[idx])
+            slope = np.sum(p * g[idx], axis=-1)
+            # reset to steepest descent for non descent directions
+            bad = slope >= 0
+            p[bad] = -g[idx][bad]
+            H[idx[bad]] = np.eye(n_par)
+            slope = np.sum(p * g[idx], axis=-1)
+            alpha = np.ones(idx.shape[0])
+            todo = np.ones(idx.shape[0], dtype=bool)
+            f_new = np.array(f[idx])
+            g_new = np.array(g[idx])
+            for _ in range(max_line_search):
+                i = np.nonzero(todo)[0]
+                f_i, g_i = self.nll_grad_many(
+                    x[idx[i]] + alpha[i, None] * p[i], idx[i]
+                )
+                ok = f_i <= f[idx[i]] + c1 * alpha[i] * slope[i]
+                f_new[i[ok]], g_new[i[ok]] = f_i[ok], g_i[ok]
+                todo[i[ok]] = False
+                # minimum of quadratic interpolation, in [0.1, 0.5] alpha
+                i, f_i = i[~ok], f_i[~ok]
+                df = f_i - f[idx[i]] - slope[i] * alpha[i]
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    ratio = -slope[i] * alpha[i] / (2 * df)
+                ratio = np.where(np.isfinite(ratio), ratio, 0.1)
+                alpha[i] *= np.clip(ratio, 0.1, 0.5)
+                if not np.any(todo):
+                    break
+            done = ~todo
+            k = idx[done]
+            s = alpha[done, None] * p[done]
+            y = g_new[done] - g[k]
+            x[k] += s
+            f[k], g[k] = f_new[done], g_new[done]
+            nit[k] += 1
+            for k_i, s_i, y_i in zip(k, s, y):
+                rho_inv = np.dot(y_i, s_i)
+                if rho_inv > 0:
+                    a = np.eye(n_par) - np.outer(s_i, y_i) / rho_inv
+                    H[k_i] = a @ H[k_i] @ a.T + np.outer(s_i, s_i) / rho_inv
+            reset[k] = False
+            # retry failed line search with steepest descent once
+            k = idx[todo]
+            stopped[k[reset[k]]] = True
+            H[k] = np.eye(n_par)
+            reset[k] = True
+        self.x = x
+        self.nll = f
+        self.nit = nit
+        self.converged = np.max(np.abs(g), axis=-1) <= gtol
+        return x
+
+    def get_params_error(self):
+        """standard deviation of the parameters of the fitted replicas"""
+        std = np.std(self.x, axis=0, ddof=1)
+        return dict(zip(self.vm.trainable_vars, std))
@@ -8,9 +8,10 @@ import functools
 import math
 import warnings
 
-import sympy as sym
-
 from .tensorflow_wrapper import tf
+from .utils import LazyModule
+
+sym = LazyModule("sympy")
 
 breit_wigner_dict = {}
 
@@ -337,24 +338,86 @@ def Bprime_polynomial(l, z):
     :param z: The variable in the polynomial
     :return: The calculated value
     """
-    coeff = {
-        0: [1.0],
-        1: [1.0, 1.0],
-        2: [1.0, 3.0, 9.0],
-        3: [1.0, 6.0, 45.0, 225.0],
-        4: [1.0, 10.0, 135.0, 1575.0, 11025.0],
-        5: [1.0, 15.0, 315.0, 6300.0, 99225.0, 893025.0],
-    }
-    l = int(l + 0.01)
-    if l not in coeff:
-        coeff[l] = [float(i) for i in get_bprime_coeff(l)]
-        # raise NotImplementedError
     z = tf.convert_to_tensor(z)
-    cof = [tf.convert_to_tensor(i, z.dtype) for i in coeff[l]]
+    cof = [tf.convert_to_tensor(i, z.dtype) for i in bprime_coeff(l)]
     ret = tf.math.polyval(cof, z)
     return ret
 
 
+_bprime_coeff = {
+    0: (1.0,),
+    1: (1.0, 1.0),
+    2: (1.0, 3.0, 9.0),
+    3: (1.0, 6.0, 45.0, 225.0),
+    4: (1.0, 10.0, 135.0, 1575.0, 11025.0),
+    5: (1.0, 15.0, 315.0, 6300.0, 99225.0, 893025.0),
+}
+
+
+def bprime_coeff(l):
+    """The coefficients of the polynomial in :code:`Bprime_polynomial`,
+    from the highest order. They are calculated only once for each :math:`L`.
+
+    >>> bprime_coeff(2)
+    (1.0, 3.0, 9.0)
+
+    """
+    l = int(l + 0.01)
+    if l not in _bprime_coeff:
+        _bprime_coeff[l] = tuple(float(i) for i in get_bprime_coeff(l))
+    return _bprime_coeff[l]
+
+
+def Bprime_polynomial_vec(l, z):
+    """
+    Blatt-Weisskopf polynomial for a list of orders.
+
+    :param l: list of orders with shape :math:`(R,)`
+    :param z: The variable in the polynomial, with shape :math:`(..., R)`
+    :return: The calculated value with the same shape as **z**
+    """
+    z = tf.convert_to_tensor(z)
+    l = [int(i + 0.01) for i in l]
+    n = max(l) + 1
+    # padding the lower order with leading 0
+    cof = [[0.0] * (n - i - 1) + list(bprime_coeff(i)) for i in l]
+    cof = tf.unstack(tf.convert_to_tensor(cof, z.dtype), axis=-1)
+    return tf.math.polyval(cof, z)
+
+
+def BWR_vec(m, m0, g0, q, q0, L, d):
+    """
+    Relativistic Breit-Wigner function :code:`BWR` for :math:`R` resonances
+    with the same invariant mass in one kernel.
+
+    :param m: invariant mass with shape :math:`(N,)`
+    :param m0: masses with shape :math:`(R,)`
+    :param g0: widths with shape :math:`(R,)`
+    :param q: relative momentum with shape :math:`(N,)`
+    :param q0: relative momentum at **m0** with shape :math:`(R,)`
+    :param L: list of orbital angular momentum, the length is :math:`R`
+    :param d: list of barrier radius, the length is :math:`R`
+    :return: complex tensor with shape :math:`(N, R)`
+    """
+    m = tf.expand_dims(m, -1)
+    q = tf.expand_dims(tf.cast(q, m.dtype), -1)
+    m0 = tf.cast(m0, m.dtype)
+    g0 = tf.cast(g0, m.dtype)
+    q0 = tf.cast(q0, m.dtype)
+    L_f = tf.convert_to_tensor(L, m.dtype)
+    d = tf.convert_to_tensor(d, m.dtype)
+    _epsilon = 1e-15
+    qq0 = tf.where(q0 > _epsilon, (q / q0) ** (2 * L_f + 1), 1.0)
+    z0 = (q0 * d) ** 2
+    z = (q * d) ** 2
+    bp = Bprime_polynomial_vec(L, z0) / Bprime_polynomial_vec(L, z)
+    gamma = g0 * qq0 * (m0 / m) * bp
+    x = m0 * m0 - m * m
+    y = m0 * gamma
+    s = x * x + y * y
+    return tf.complex(x / s, y / s)
+
+
 def reverse_bessel_polynomials(n, x):
     """Reverse Bessel polynomials.
 
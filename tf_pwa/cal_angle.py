@@ -49,12 +49,13 @@ The full data structure provided is ::
 Inner nodes are named as tuple of particles.
 
 """
+
 import itertools
 
 import numpy as np
 
 from .angle import SU2M, EulerAngle, LorentzVector, Vector3, _epsilon
-from .config import get_config
+from .config import get_config, regist_config
 from .data import (
     HeavyCall,
     LazyCall,
@@ -77,6 +78,9 @@ from .particle import (
 )
 from .tensorflow_wrapper import tf
 
+VECTORIZED_KINEMATICS = "vectorized_kinematics"
+regist_config(VECTORIZED_KINEMATICS, True)
+
 
 class CalAngleData(dict):
     def get_decay(self):
@@ -272,6 +276,11 @@ def cal_helicity_angle(
 
     to   `{A->B+C:{B:{"ang":{"alpha":...,"beta":...,"gamma":...},"x":...,"z"},...}}`
     """
+    if get_config(
+        VECTORIZED_KINEMATICS
+    ) and HelicityAngleSchedule.is_supported(decay_chain):
+        schedule = get_helicity_schedule(decay_chain)
+        return schedule(data, base_z, base_x)
     ret = {}
     # boost all in them mother rest frame
 
@@ -343,6 +352,150 @@ def cal_helicity_angle(
     return ret
 
 
+class HelicityAngleSchedule:
+    """
+    Static schedule of `cal_helicity_angle` for a decay chain.
+
+    The decays are grouped into levels by the depth of the core particle.
+    All the boosts of one level are done by one batched operation on the
+    stacked momenta, and so are the Euler angles and the SU2 matrices. The
+    whole calculation runs as one :code:`tf.function`.
+
+    Decays into three particles are not supported, see `is_supported`.
+    """
+
+    def __init__(self, decay_chain):
+        self.decay_chain = decay_chain
+        top = decay_chain.top
+        st = decay_chain.sorted_table()
+        self.particles = [i for i in st if i != top]
+        lab_index = {j: n for n, j in enumerate(self.particles)}
+        parent = {j: i for i in decay_chain for j in i.outs}
+        children = {
+            k: [j for j in self.particles if j != k and set(st[j]) <= set(v)]
+            for k, v in st.items()
+        }
+        self.levels = []
+        level = [i for i in decay_chain if i.core == top]
+        boost_prev, out_prev = None, None
+        while level:
+            # boost all children of core into the rest frame of core
+            boost = [(i, j) for i in level for j in children[i.core]]
+            out = [(i, j, k) for i in level for k, j in enumerate(i.outs)]
+            boost_idx = {k: n for n, k in enumerate(boost)}
+            lv = {
+                "out": out,
+                "idx_z": [boost_idx[(i, j)] for i, j, _ in out],
+                "bias": [-np.pi * (k + 1) for _, _, k in out],
+            }
+            if boost_prev is None:
+                lv["idx_v"] = [lab_index[j] for _, j in boost]
+            else:
+                prev_idx = {k: n for n, k in enumerate(boost_prev)}
+                out_idx = {(i, j): n for n, (i, j, _) in enumerate(out_prev)}
+                lv["idx_v"] = [prev_idx[(parent[i.core], j)] for i, j in boost]
+                lv["idx_b"] = [
+                    prev_idx[(parent[i.core], i.core)] for i, _ in boost
+                ]
+                lv["idx_frame"] = [
+                    out_idx[(parent[i.core], i.core)] for i, _, _ in out
+                ]
+            self.levels.append(lv)
+            boost_prev, out_prev = boost, out
+            cores = [j for _, j, _ in out]
+            level = [i for i in decay_chain if i.core in cores]
+        self._cal = tf.function(self._cal_stacked, reduce_retracing=True)
+
+    @staticmethod
+    def is_supported(decay_chain):
+        return all(len(i.outs) != 3 for i in decay_chain)
+
+    def _cal_stacked(self, p_top, p, base_z, base_x):
+        ret = []
+        prev = None
+        for lv in self.levels:
+            if prev is None:
+                v = tf.gather(p, lv["idx_v"])
+                b = -LorentzVector.boost_vector(p_top)
+                z1, x1 = base_z, base_x
+            else:
+                v = tf.gather(prev["p"], lv["idx_v"])
+                b = tf.gather(prev["p"], lv["idx_b"])
+                b = -LorentzVector.boost_vector(b)
+                z1 = tf.gather(prev["z"], lv["idx_frame"])
+                x1 = tf.gather(prev["x"], lv["idx_frame"])
+            p_boost = LorentzVector.boost(v, b)
+            p_rest = tf.gather(p_boost, lv["idx_z"])
+            z2 = LorentzVector.vect(p_rest)
+            ang, x = EulerAngle.angle_zx_z_getx(z1, x1, z2)
+            # set range to make sure opposite allow be - phi
+            bias = tf.cast(lv["bias"], z2.dtype)[:, None]
+            alpha = (ang["alpha"] - bias) % (2 * np.pi) + bias
+            b_matrix = SU2M.Boost_z_from_p(p_rest)
+            r_matrix = SU2M.Rotation_y(ang["beta"]) * SU2M.Rotation_z(alpha)
+            if prev is not None:
+                idx = lv["idx_frame"]
+                gather = lambda m: SU2M(
+                    [[tf.gather(k, idx) for k in row] for row in m["x"]]
+                )
+                r_matrix = (
+                    r_matrix
+                    * gather(prev["b_matrix"])
+                    * gather(prev["r_matrix"])
+                )
+            prev = {
+                "p": p_boost,
+                "z": z2,
+                "x": x,
+                "b_matrix": b_matrix,
+                "r_matrix": r_matrix,
+            }
+            ret.append(
+                (alpha, ang["beta"], x, z2, b_matrix["x"], r_matrix["x"])
+            )
+        return ret
+
+    def __call__(self, data, base_z, base_x):
+        """the same as `cal_helicity_angle`"""
+        p_top = data[self.decay_chain.top]["p"]
+        p = tf.stack([data[i]["p"] for i in self.particles])
+        base_z = tf.cast(base_z, p.dtype)
+        base_x = tf.cast(base_x, p.dtype)
+        results = self._cal(p_top, p, base_z, base_x)
+        ret = {i: {} for i in self.decay_chain}
+        r_matrix, b_matrix = {}, {}
+        for lv, res in zip(self.levels, results):
+            alpha, beta, x, z, b_m, r_m = [
+                tf.nest.map_structure(tf.unstack, i) for i in res
+            ]
+            for n, (i, j, _) in enumerate(lv["out"]):
+                ret[i][j] = {
+                    "ang": EulerAngle(
+                        alpha[n], beta[n], tf.zeros_like(beta[n])
+                    ),
+                    "x": x[n],
+                    "z": z[n],
+                }
+                b_matrix[j] = SU2M([[k[n] for k in row] for row in b_m])
+                r_matrix[j] = SU2M([[k[n] for k in row] for row in r_m])
+        ret["r_matrix"] = r_matrix
+        ret["b_matrix"] = b_matrix
+        return ret
+
+
+def get_helicity_schedule(decay_chain):
+    """
+    `HelicityAngleSchedule` of **decay_chain**, built once for each object.
+    Decay chains of different models can be equal with different order of
+    outs, so the schedule is not shared by equal chains.
+    """
+    schedule = decay_chain.__dict__.get("_helicity_schedule", None)
+    if schedule is None:
+        schedule = HelicityAngleSchedule(decay_chain)
+        decay_chain._helicity_schedule = schedule
+    return schedule
+
+
 def aligned_angle_ref_rule1(decay_group, decay_chain_struct, decay_data, data):
     # calculate aligned angle of final particles in each decay chain
     set_x = {}  # reference particles
@@ -414,11 +567,14 @@ def cal_angle_from_particle(
     final_rest=True,
     align_ref=None,  # "center_mass",
     only_left_angle=False,
+    decay_data=None,
 ):
     """
     Calculate helicity angle for particle momentum, add aligned angle.
 
     :params data: dict as {particle: {"p":...}}
+    :params decay_data: dict of known results of `cal_helicity_angle` for
+        decay chains, the others will be calculated and added to it.
 
     :return: Dictionary of data
     """
@@ -426,7 +582,8 @@ def cal_angle_from_particle(
         decay_chain_struct = decay_group.topology_structure()
     else:
         decay_chain_struct = decay_group
-    decay_data = {}
+    if decay_data is None:
+        decay_data = {}
 
     # get base z axis
     p4 = data[decay_group.top]["p"]
@@ -438,8 +595,8 @@ def cal_angle_from_particle(
         base_z = tf.where(mask, base_z, p3)
     # calculate chain angle
     for i in decay_chain_struct:
-        data_i = cal_helicity_angle(data, i, base_z=base_z)
-        decay_data[i] = data_i
+        if i not in decay_data:
+            decay_data[i] = cal_helicity_angle(data, i, base_z=base_z)
     if align_ref == "center_mass":
         set_x, ref_matrix_final = aligned_angle_ref_rule2(
             decay_group, decay_chain_struct, decay_data, data
@@ -727,36 +884,46 @@ def cal_angle_from_momentum_id_swap(
     align_ref=None,
     only_left_angle=False,
 ) -> CalAngleData:
-    ret = []
     id_particles = decs.identical_particles
-    data = cal_angle_from_momentum_base(
-        p,
-        decs,
-        using_topology,
-        center_mass,
-        r_boost,
-        random_z,
-        batch,
-        align_ref=align_ref,
-        only_left_angle=only_left_angle,
-    )
     if id_particles is None or len(id_particles) == 0:
-        return data
+        return cal_angle_from_momentum_base(
+            p,
+            decs,
+            using_topology,
+            center_mass,
+            r_boost,
+            random_z,
+            batch,
+            align_ref=align_ref,
+            only_left_angle=only_left_angle,
+        )
+    swaps = {}
+    for i, _ in identical_particles_swap_p(p, id_particles):
+        swaps[i] = {str(j): str(k) for j, k in zip(p.keys(), i[0])}
+    kwargs = {
+        "using_topology": using_topology,
+        "center_mass": center_mass,
+        "r_boost": r_boost,
+        "random_z": random_z,
+        "align_ref": align_ref,
+        "only_left_angle": only_left_angle,
+    }
+    if data_shape(p) is None:
+        data, data_swap = cal_angle_from_momentum_swap_single(
+            p, decs, swaps, **kwargs
+        )
     else:
-        data["id_swap"] = {}
-        for i, pi in identical_particles_swap_p(p, id_particles):
-            data["id_swap"][i] = cal_angle_from_momentum_base(
-                pi,
-                decs,
-                using_topology,
-                center_mass,
-                r_boost,
-                random_z,
-                batch,
-                align_ref=align_ref,
-                only_left_angle=only_left_angle,
-            )
-        return data
+        ret = [
+            cal_angle_from_momentum_swap_single(i, decs, swaps, **kwargs)
+            for i in split_generator(p, batch)
+        ]
+        cache = {}
+        data = _data_merge_shared([i[0] for i in ret], cache)
+        data_swap = {
+            k: _data_merge_shared([i[1][k] for i in ret], cache) for k in swaps
+        }
+    data["id_swap"] = data_swap
+    return data
 
 
 def cal_angle_from_momentum(
@@ -831,12 +998,15 @@ def cal_angle_from_momentum_single(
     random_z=True,
     align_ref=None,
     only_left_angle=False,
+    decay_data=None,
 ) -> CalAngleData:
     """
     Transform 4-momentum data in files for the amplitude model automatically via DecayGroup.
 
     :param p: 4-momentum data
     :param decs: DecayGroup
+    :param decay_data: dict of known helicity angles of decay chains, see
+        `cal_angle_from_particle`.
     :return: Dictionary of data
     """
     p = {BaseParticle(k) if isinstance(k, str) else k: v for k, v in p.items()}
@@ -851,7 +1021,7 @@ def cal_angle_from_momentum_single(
         # print(data_p)
         # exit()
         data_p = add_mass(data_p, dec)
-    data_d = cal_angle_from_particle(
+    return _cal_angle_from_particle_data(
         data_p,
         decs,
         using_topology,
@@ -859,12 +1029,207 @@ def cal_angle_from_momentum_single(
         random_z=random_z,
         align_ref=align_ref,
         only_left_angle=only_left_angle,
+        decay_data=decay_data,
     )
+
+
+def _cal_angle_from_particle_data(data_p, decs, *args, **kwargs):
+    data_d = cal_angle_from_particle(data_p, decs, *args, **kwargs)
     data = {"particle": data_p, "decay": data_d}
     add_relative_momentum(data)
     return CalAngleData(data)
 
 
+def cal_angle_from_momentum_swap_single(
+    p,
+    decs: DecayGroup,
+    swaps,
+    using_topology=True,
+    center_mass=False,
+    r_boost=True,
+    random_z=True,
+    align_ref=None,
+    only_left_angle=False,
+):
+    """
+    Calculate the angles of momentum **p** and of the swapped momenta of
+    identical particles together.
+
+    The swapped momenta only rename the particles, so the masses and the
+    helicity angles (with all the boosts) of a decay chain are taken from the
+    decay chain of the same structure in **p** (see `swap_decay_chain_map`),
+    sharing the same arrays. Only the decay chains without such partner
+    and the aligned angles are calculated again.
+
+    :param p: 4-momentum data
+    :param decs: DecayGroup
+    :param swaps: dict of `{key: {name: new_name}}`, the swapped momentum is
+        `p_swap[new_name] = p[name]`
+    :return: data of **p** and dict of `{key: data of swapped momentum}`
+    """
+    p = {BaseParticle(k) if isinstance(k, str) else k: v for k, v in p.items()}
+    p = {i: p[i] for i in decs.outs}
+    data_p = struct_momentum(p, center_mass=center_mass)
+    if using_topology:
+        decay_chain_struct = decs.topology_structure()
+    else:
+        decay_chain_struct = decs
+    for dec in decay_chain_struct:
+        data_p = infer_momentum(data_p, dec)
+        data_p = add_mass(data_p, dec)
+    kwargs = {
+        "using_topology": using_topology,
+        "r_boost": r_boost,
+        "random_z": random_z,
+        "align_ref": align_ref,
+        "only_left_angle": only_left_angle,
+    }
+    decay_data = {}
+    data = _cal_angle_from_particle_data(
+        data_p, decs, decay_data=decay_data, **kwargs
+    )
+    ret = {}
+    for key, swap in swaps.items():
+        data_p_swap = swap_particle_data(data_p, decay_chain_struct, swap)
+        chain_map = swap_decay_chain_map(decay_chain_struct, swap)
+        decay_data_swap = {
+            k: remap_helicity_angle(decay_data[v], mapping)
+            for k, (v, mapping) in chain_map.items()
+        }
+        ret[key] = _cal_angle_from_particle_data(
+            data_p_swap, decs, decay_data=decay_data_swap, **kwargs
+        )
+    return data, ret
+
+
+def _particle_leaves(decay_chain, name_map=None):
+    """names of final particles for all particles in decay chain"""
+    if name_map is None:
+        name_map = {}
+    return {
+        k: frozenset(name_map.get(str(i), str(i)) for i in v)
+        for k, v in decay_chain.sorted_table().items()
+    }
+
+
+def swap_particle_data(data_p, decay_chain_struct, swap):
+    """
+    Particle data of the swapped momentum `p_swap[swap[name]] = p[name]`,
+    the particle with the same final particles in **data_p** is used.
+
+    >>> a, b, c, d = [BaseParticle(i) for i in "ABCD"]
+    >>> bc, bd = BaseParticle("(B, C)"), BaseParticle("(B, D)")
+    >>> decs = DecayGroup(
+    ...     [
+    ...         [BaseDecay(a, [bc, d]), BaseDecay(bc, [b, c])],
+    ...         [BaseDecay(a, [bd, c]), BaseDecay(bd, [b, d])],
+    ...     ]
+    ... )
+    >>> data_p = {i: {"p": str(i), "m": str(i)} for i in [a, b, c, d, bc, bd]}
+    >>> ret = swap_particle_data(data_p, decs, {"C": "D", "D": "C"})
+    >>> ret[bc]["m"], ret[d]["m"]
+    ('(B, D)', 'C')
+
+    """
+    inv = {v: k for k, v in swap.items()}
+    leaves = {}
+    for decay_chain in decay_chain_struct:
+        leaves.update(_particle_leaves(decay_chain))
+    particles = {v: k for k, v in leaves.items()}
+    ret = {}
+    for k, v in leaves.items():
+        k0 = particles.get(frozenset(inv.get(i, i) for i in v))
+        if k0 is not None:
+            ret[k] = {"p": data_p[k0]["p"], "m": data_p[k0]["m"]}
+    for decay_chain in decay_chain_struct:
+        ret = infer_momentum(ret, decay_chain)
+    for k, v in ret.items():
+        if "m" not in v:
+            v["m"] = LorentzVector.M(v["p"])
+    return ret
+
+
+def swap_decay_chain_map(decay_chain_struct, swap):
+    """
+    For the swapped momentum `p_swap[swap[name]] = p[name]`, find the decay
+    chains in **decay_chain_struct**, which have the same helicity angles
+    as the decay chains of swapped momentum. They have the same structure
+    after renaming the final particles, including the order of outs in
+    each decay.
+
+    >>> a, b, c, d = [BaseParticle(i) for i in "ABCD"]
+    >>> bc, bd = BaseParticle("(B, C)"), BaseParticle("(B, D)")
+    >>> decs = DecayGroup(
+    ...     [
+    ...         [BaseDecay(a, [bc, d]), BaseDecay(bc, [b, c])],
+    ...         [BaseDecay(a, [bd, c]), BaseDecay(bd, [b, d])],
+    ...     ]
+    ... )
+    >>> ret = swap_decay_chain_map(decs, {"C": "D", "D": "C"})
+    >>> [(str(k), str(v)) for k, (v, _) in ret.items()]
+    [('[A->(B, C)+D, (B, C)->B+C]', '[A->(B, D)+C, (B, D)->B+D]'), ('[A->(B, D)+C, (B, D)->B+D]', '[A->(B, C)+D, (B, C)->B+C]')]
+    >>> swap_decay_chain_map(decs, {"B": "C", "C": "B"})
+    {}
+
+    :return: dict of `{decay_chain: (decay_chain_0, {particle or decay: particle_0 or decay_0})}`
+    """
+    inv = {v: k for k, v in swap.items()}
+
+    def structure(decay_chain, name_map):
+        leaves = _particle_leaves(decay_chain, name_map)
+        decays = {
+            (leaves[i.core], tuple(leaves[j] for j in i.outs)): i
+            for i in decay_chain
+        }
+        return leaves, decays
+
+    origin = [(i, *structure(i, {})) for i in decay_chain_struct]
+    ret = {}
+    for decay_chain in decay_chain_struct:
+        leaves, decays = structure(decay_chain, inv)
+        for decay_chain_0, leaves_0, decays_0 in origin:
+            if set(decays) != set(decays_0):
+                continue
+            particles_0 = {v: k for k, v in leaves_0.items()}
+            mapping = {k: particles_0[v] for k, v in leaves.items()}
+            mapping.update({v: decays_0[k] for k, v in decays.items()})
+            ret[decay_chain] = (decay_chain_0, mapping)
+            break
+    return ret
+
+
+def remap_helicity_angle(decay_data, mapping):
+    """results of `cal_helicity_angle` for the decay chain mapped to the
+    decay chain of **decay_data** by **mapping**, without aligned angle"""
+    inv = {v: k for k, v in mapping.items()}
+    ret = {}
+    for k, v in decay_data.items():
+        if k in ["r_matrix", "b_matrix"]:
+            ret[k] = {inv[i]: j for i, j in v.items()}
+            continue
+        ret[inv[k]] = {}
+        for i, j in v.items():
+            if isinstance(i, BaseParticle):
+                j = {a: b for a, b in j.items() if a != "aligned_angle"}
+                ret[inv[k]][inv[i]] = j
+            else:
+                ret[inv[k]][i] = j
+    return ret
+
+
+def _data_merge_shared(data, cache):
+    """`data_merge`, the same arrays are merged only once and shared"""
+    if isinstance(data[0], dict):
+        idx = set.intersection(*[set(i) for i in data])
+        return type(data[0])(
+            {i: _data_merge_shared([j[i] for j in data], cache) for i in idx}
+        )
+    key = tuple(id(i) for i in data)
+    if key not in cache:
+        cache[key] = data_merge(*data)
+    return cache[key]
+
+
 def prepare_data_from_dat_file4(fnames):
     """
     [deprecated] angle for amplitude4.py
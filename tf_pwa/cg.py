@@ -5,14 +5,12 @@ This function has interface to `SymPy <https://www.sympy.org/en/index.html>`_ fu
 Otherwise, it will depend on the input file **tf_pwa/cg_table.json**.
 """
 
+import importlib.util
 import json
 import os
 
-has_sympy = True
-try:
-    from sympy.physics.quantum.cg import CG
-except ImportError:
-    has_sympy = False
+# sympy is imported in cg_coef, since it is slow to import
+has_sympy = importlib.util.find_spec("sympy") is not None
 
 
 def cg_coef(jb, jc, mb, mc, ja, ma):
@@ -21,6 +19,8 @@ def cg_coef(jb, jc, mb, mc, ja, ma):
     and *c*. It will either call **sympy.physics.quantum.cg()** or **get_cg_coef()**.
     """
     if has_sympy:
+        from sympy.physics.quantum.cg import CG
+
         return float(CG(jb, mb, jc, mc, ja, ma).doit().evalf())
     else:
         return get_cg_coef(jb, jc, mb, mc, ja, ma)
@@ -11,3 +11,4 @@ from .particle_function import ParticleFunction
 from .plot import export_legend, hist_error, hist_line
 from .plotter import Plotter
 from .sample import single_sampling
+from .significance import significance_scan
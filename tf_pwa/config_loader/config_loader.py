@@ -1,6 +1,7 @@
 import contextlib
 import copy
 import functools
+import hashlib
 import itertools
 import json
 import os
@@ -8,9 +9,7 @@ import re
 import time
 import warnings
 
-import matplotlib.pyplot as plt
 import numpy as np
-import sympy as sy
 import yaml
 from scipy.interpolate import UnivariateSpline, interp1d
 from scipy.optimize import BFGS, basinhopping, minimize
@@ -33,7 +32,9 @@ from tf_pwa.applications import (
     force_pos_def,
     num_hess_inv_3point,
 )
+from tf_pwa.batch_tuner import BatchTuner
 from tf_pwa.cal_angle import prepare_data_from_decay
+from tf_pwa.config import get_config
 from tf_pwa.data import (
     ReadData,
     data_index,
@@ -47,22 +48,33 @@ from tf_pwa.data import (
 from tf_pwa.fit import FitResult
 from tf_pwa.fit_improve import minimize as my_minimize
 from tf_pwa.model import FCN, CombineFCN, MixLogLikehoodFCN, Model, Model_new
+from tf_pwa.model.model import clip_log, sum_gradient, sum_hessian
 from tf_pwa.model.cfit import Model_cfit, Model_cfit_cached, ModelCfitExtended
 from tf_pwa.model.opt_int import ModelCachedAmp, ModelCachedInt
 from tf_pwa.particle import split_particle_type
 from tf_pwa.root_io import has_uproot, save_dict_to_root
 from tf_pwa.tensorflow_wrapper import tf
-from tf_pwa.utils import time_print
+from tf_pwa.utils import LazyModule, time_print
 from tf_pwa.variable import Variable, VarsManager
 
 from .base_config import BaseConfig
 from .data import load_data_mode
 from .decay_config import DecayConfig
 
+plt = LazyModule("matplotlib.pyplot")
+sy = LazyModule("sympy")
+
 
 class ConfigLoader(BaseConfig):
     """class for loading config.yml"""
 
+    default_batch = {
+        "nll_grad": 65000,
+        "hessian": 10000,
+        "fitfractions": 25000,
+        "plot": 65000,
+    }
+
     def __init__(self, file_name, vm=None, share_dict=None):
         if share_dict is None:
             share_dict = {}
@@ -94,6 +106,7 @@ class ConfigLoader(BaseConfig):
         self.inv_he = None
         self._Ngroup = 1
         self.cached_fcn = {}
+        self.batch_tuner = None
         self.extra_constrains = {}
         self.resolution_size = self.config.get("data", {}).get(
             "resolution_size", 1
@@ -216,6 +229,7 @@ class ConfigLoader(BaseConfig):
         jit_compile = amp_config.get("jit_compile", False)
         amp_model = amp_config.get("amp_model", "default")
         cached_shape_idx = amp_config.get("cached_shape_idx", None)
+        graph_cache = amp_config.get("graph_cache", None)
         decay_group = self.full_decay
         self.check_valid_jp(decay_group)
         if vm is None:
@@ -231,12 +245,38 @@ class ConfigLoader(BaseConfig):
             jit_compile=jit_compile,
             model=amp_model,
             cached_shape_idx=cached_shape_idx,
+            graph_cache=graph_cache,
+            graph_cache_key=self.get_fingerprint(),
             all_config=amp_config,
         )
         self.add_constraints(amp)
         self.amps[vm] = amp
         return amp
 
+    def get_fingerprint(self):
+        """fingerprint of the configuration for the amplitude, the list of
+        files in `data` is not included."""
+
+        def _is_files(v):
+            if isinstance(v, str):
+                return True
+            if isinstance(v, (list, tuple)):
+                return len(v) > 0 and all(_is_files(i) for i in v)
+            return False
+
+        config = dict(self.config)
+        config["data"] = {
+            k: v
+            for k, v in config.get("data", {}).items()
+            if not (isinstance(v, (list, tuple)) and _is_files(v))
+        }
+        info = json.dumps(
+            [config, str(self.full_decay), str(get_config("dtype"))],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(info.encode()).hexdigest()
+
     def eval_amplitude(self, *p, extra=None):
         extra = {} if extra is None else extra
         if len(p) == len(self.decay_struct.outs):
@@ -657,13 +697,14 @@ class ConfigLoader(BaseConfig):
             w_bkg = tmp
         return w_bkg, w_inmc
 
-    def get_fcn(self, all_data=None, batch=65000, vm=None, name=""):
+    def get_fcn(self, all_data=None, batch=None, vm=None, name=""):
         if all_data is None:
             if vm in self.cached_fcn:
                 return self.cached_fcn[vm]
             data, phsp, bg, inmc = self.get_all_data()
         else:
             data, phsp, bg, inmc = all_data
+        batch = self.get_batch("nll_grad", batch, phsp)
         self._Ngroup = len(data)
         if inmc is None:
             inmc = [None] * self._Ngroup
@@ -720,6 +761,65 @@ class ConfigLoader(BaseConfig):
             self.cached_fcn[vm] = fcn
         return fcn
 
+    def get_batch_tuner(self):
+        if self.batch_tuner is None:
+            tuner_config = self.config["data"].get("auto_batch", None)
+            if not isinstance(tuner_config, dict):
+                tuner_config = {}
+            self.batch_tuner = BatchTuner(
+                memory_limit=tuner_config.get("memory_limit", None),
+                cache_file=tuner_config.get("cache", None),
+                min_batch=tuner_config.get("min_batch", 1000),
+                max_batch=tuner_config.get("max_batch", 1000000),
+            )
+        return self.batch_tuner
+
+    def get_batch(self, site, batch=None, phsp=None):
+        """
+        Batch size for the call site **site** (one of
+        :code:`ConfigLoader.default_batch`). **batch** is used directly if
+        it is a number. If it is :code:`"auto"`, or None with
+        :code:`data: {auto_batch: ...}` in config, the batch size is tuned
+        by `BatchTuner` on the first sample of **phsp** (phase space by
+        default), and cached with the fingerprint of the configuration.
+        Otherwise it is the default of the call site.
+        """
+        if batch is None:
+            if not self.config["data"].get("auto_batch", False):
+                return self.default_batch[site]
+            batch = "auto"
+        if batch != "auto":
+            return batch
+        tuner = self.get_batch_tuner()
+        key = tuner.cache_key(self.get_fingerprint(), site)
+        if key in tuner.results:
+            return tuner.results[key]["batch"]
+        if phsp is None:
+            phsp = self.get_all_data()[1]
+        if not isinstance(phsp[0], dict):
+            # lazy call data
+            return self.default_batch[site]
+        return tuner.tune(
+            self._batch_probe_function(site),
+            phsp[0],
+            key=key,
+            multiple=self.resolution_size,
+            default=self.default_batch[site],
+        )
+
+    def _batch_probe_function(self, site):
+        amp = self.get_amplitude()
+        var = amp.vm.trainable_variables
+        if site in ["nll_grad", "fitfractions"]:
+            return lambda x: sum_gradient(
+                amp, [x], var, trans=clip_log, resolution_size=1
+            )
+        if site == "hessian":
+            return lambda x: sum_hessian(
+                amp, [x], var, trans=clip_log, resolution_size=1
+            )
+        return amp
+
     def get_ndf(self):
         amp = self.get_amplitude()
         args_name = amp.vm.trainable_vars
@@ -749,7 +849,7 @@ class ConfigLoader(BaseConfig):
         phsp=None,
         bg=None,
         inmc=None,
-        batch=65000,
+        batch=None,
         method="BFGS",
         check_grad=False,
         improve=False,
@@ -760,6 +860,8 @@ class ConfigLoader(BaseConfig):
         callback=None,
         grad_scale=1.0,
         gtol=1e-3,
+        checkpoint=None,
+        resume=False,
     ):
         if data is None and phsp is None:
             data, phsp, bg, inmc = self.get_all_data()
@@ -796,6 +898,8 @@ class ConfigLoader(BaseConfig):
             callback=callback,
             grad_scale=grad_scale,
             gtol=gtol,
+            checkpoint=checkpoint,
+            resume=resume,
         )
         if self.fit_params.hess_inv is not None:
             self.inv_he = self.fit_params.hess_inv
@@ -819,7 +923,7 @@ class ConfigLoader(BaseConfig):
         phsp=None,
         bg=None,
         inmc=None,
-        batch=10000,
+        batch=None,
         using_cached=False,
         method=None,
         force_pos=True,
@@ -828,6 +932,7 @@ class ConfigLoader(BaseConfig):
         """
         calculate parameters error
         """
+        batch = self.get_batch("hessian", batch, phsp)
         if params is None:
             params = {}
         if correct_params is None:
@@ -897,9 +1002,10 @@ class ConfigLoader(BaseConfig):
         mcdata=None,
         res=None,
         exclude_res=[],
-        batch=25000,
+        batch=None,
         method="old",
     ):
+        batch = self.get_batch("fitfractions", batch)
         if hasattr(params, "params"):
             params = getattr(params, "params")
         if mcdata is None:
@@ -916,7 +1022,8 @@ class ConfigLoader(BaseConfig):
         )
         return frac_and_err
 
-    def cal_signal_yields(self, params={}, mcdata=None, batch=25000):
+    def cal_signal_yields(self, params={}, mcdata=None, batch=None):
+        batch = self.get_batch("fitfractions", batch)
         if hasattr(params, "params"):
             params = getattr(params, "params")
         if mcdata is None:
@@ -98,6 +98,7 @@ class SimpleData:
         preprocessor_model = self.dic.get("preprocessor", "default")
         no_p4 = self.dic.get("no_p4", False)
         no_angle = self.dic.get("no_angle", False)
+        mass_cache = self.dic.get("mass_cache", True)
         self.preprocessor = create_preprocessor(
             decay_struct,
             center_mass=center_mass,
@@ -110,6 +111,7 @@ class SimpleData:
             no_p4=no_p4,
             no_angle=no_angle,
             cp_trans=cp_trans,
+            mass_cache=mass_cache,
         )
 
     def get_data_file(self, idx):
@@ -185,6 +187,9 @@ class SimpleData:
             prefetch = self.dic.get("lazy_prefetch", -1)
             data.set_cached_file(cached_file, name)
             data.prefetch = prefetch
+            data.prefetch_memory = self.dic.get("lazy_prefetch_memory", None)
+            data.num_parallel_calls = self.dic.get("lazy_num_parallel", 1)
+            data.cache_chunk = self.dic.get("lazy_cache_chunk", 65000)
 
     def get_n_data(self):
         data = self.get_data("data")
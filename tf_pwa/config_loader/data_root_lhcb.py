@@ -1,10 +1,12 @@
 import numpy as np
-import sympy
 import tensorflow as tf
 
 from tf_pwa.config_loader.data import MultiData, register_data_mode
 from tf_pwa.data import data_mask
 from tf_pwa.root_io import uproot, uproot_version
+from tf_pwa.utils import LazyModule
+
+sympy = LazyModule("sympy")
 
 
 def build_matrix(order, matrix):
@@ -25,16 +25,11 @@ def cal_bins_numbers(
     phsp_cut = read_data(
         phsp
     )  # np.array([data_index(phsp, idx) for idx in data_idx])
-    phsp_slice = np.concatenate([phsp_cut, [amp_weight]], axis=0)
-    phsps = adapter.split_data(phsp_slice)
-    datas = adapter.split_data(data_cut)
-    bound = adapter.get_bounds()
     weight_scale = self.config["data"].get("weight_scale", False)
     if bg is not None:
         bg_cut = read_data(
             bg
         )  # np.array([data_index(bg, idx) for idx in data_idx])
-        bgs = adapter.split_data(bg_cut)
         if weight_scale:
             int_norm = (
                 data_cut.shape[-1] * (1 - bg_weight) / np.sum(amp_weight)
@@ -46,18 +41,11 @@ def cal_bins_numbers(
     else:
         int_norm = data_cut.shape[-1] / np.sum(amp_weight)
     # print("int norm:", int_norm)
-    ret = []
-    for i, bnd in enumerate(bound):
-        min_x, min_y = bnd[0]
-        max_x, max_y = bnd[1]
-        ndata = datas[i].shape[-1]
-        print(ndata)
-        nmc = np.sum(phsps[i][2]) * int_norm
-        if bg is not None:
-            nmc += bgs[i].shape[-1] * bg_weight
-        n_exp = nmc
-        ret.append((ndata, nmc))
-    return ret
+    ndata = adapter.bin_sum(data_cut)
+    nmc = adapter.bin_sum(phsp_cut, amp_weight) * int_norm
+    if bg is not None:
+        nmc = nmc + adapter.bin_sum(bg_cut) * bg_weight
+    return list(zip(ndata, nmc))
 
 
 @ConfigLoader.register_function()
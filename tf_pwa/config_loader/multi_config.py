@@ -8,9 +8,7 @@ import re
 import time
 import warnings
 
-import matplotlib.pyplot as plt
 import numpy as np
-import sympy as sy
 import yaml
 from scipy.interpolate import interp1d
 from scipy.optimize import BFGS, basinhopping, minimize
@@ -44,12 +42,15 @@ from tf_pwa.model import FCN, CombineFCN, Model, Model_new
 from tf_pwa.model.cfit import Model_cfit
 from tf_pwa.particle import split_particle_type
 from tf_pwa.root_io import has_uproot, save_dict_to_root
-from tf_pwa.utils import time_print
+from tf_pwa.utils import LazyModule, time_print
 from tf_pwa.variable import Variable, VarsManager
 
 from .config_loader import ConfigLoader
 from .decay_config import DecayConfig
 
+plt = LazyModule("matplotlib.pyplot")
+sy = LazyModule("sympy")
+
 
 class MultiConfig(object):
     def __init__(
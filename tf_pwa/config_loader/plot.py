@@ -1,9 +1,7 @@
 import itertools
 import os
 
-import matplotlib.pyplot as plt
 import numpy as np
-import sympy as sym
 import yaml
 
 from tf_pwa.adaptive_bins import AdaptiveBound
@@ -22,9 +20,13 @@ from tf_pwa.data import (
 )
 from tf_pwa.histogram import Hist1D, interp_hist
 from tf_pwa.root_io import has_uproot, save_dict_to_root
+from tf_pwa.utils import LazyModule
 
 from .config_loader import ConfigLoader, validate_file_name
 
+plt = LazyModule("matplotlib.pyplot")
+sym = LazyModule("sympy")
+
 
 def _reverse(gen, idx):
     for i in gen:
@@ -282,7 +284,7 @@ def plot_partial_wave(
     :param chains_id_method: method of how legend label display, string
 
     :param bin_scale: more binning in partial waves for a smooth histogram. int
-    :param batch: batching in calculating weights, int
+    :param batch: batching in calculating weights, int, or "auto" for `ConfigLoader.get_batch`
 
     :param smooth: if plot smooth binned kde shape or histogram, bool
     :param single_legend: if save all legend in a file "legend.pdf", bool
@@ -399,7 +401,7 @@ def _get_plot_partial_wave_input(
     :param chains_id_method: method of how legend label display, string
 
     :param bin_scale: more binning in partial waves for a smooth histogram. int
-    :param batch: batching in calculating weights, int
+    :param batch: batching in calculating weights, int, or "auto" for `ConfigLoader.get_batch`
 
     :param smooth: if plot smooth binned kde shape or histogram, bool
     :param single_legend: if save all legend in a file "legend.pdf", bool
@@ -425,7 +427,8 @@ def _get_plot_partial_wave_input(
         phsp = self.get_phsp_plot()
         phsp_rec = self.get_phsp_plot("_rec")
     phsp_rec = phsp if phsp_rec is None else phsp_rec
-    batch = kwargs.get("batch", 65000)
+    batch = self.get_batch("plot", kwargs.get("batch", None), phsp)
+    kwargs["batch"] = batch
     if bg is None:
         if self.config["data"].get("model", "auto") == "cfit":
             bg = _get_cfit_bg(self, data, phsp, batch)
@@ -1348,26 +1351,15 @@ def plot_function_2dpull(
         np.max(phsp_cut, axis=-1) + 1e-6,
     )
     adapter = AdaptiveBound(data_cut, binning, base_bound)
-    phsps = adapter.split_data(np.array([x_phsp, y_phsp, w_phsp]))
-    datas = adapter.split_data(np.array([x, y, w]))
+    ndata = adapter.bin_sum(np.array([x, y]), w)
+    nmc = adapter.bin_sum(np.array([x_phsp, y_phsp]), w_phsp)
     if bg_dict != {}:
         x_bg = var_x_f(**get_var(bg_dict, "_sideband"))
         y_bg = var_y_f(**get_var(bg_dict, "_sideband"))
         w_bg = bg_dict["sideband_weights"]
-        bgs = adapter.split_data(np.array([x_bg, y_bg, w_bg]))
+        nmc = nmc + adapter.bin_sum(np.array([x_bg, y_bg]), w_bg)
     bound = adapter.get_bounds()
-    numbers = []
-    pulls = []
-    int_norm = 1
-    for i, bnd in enumerate(bound):
-        min_x, min_y = bnd[0]
-        max_x, max_y = bnd[1]
-        ndata = np.sum(datas[i][2])
-        nmc = np.sum(phsps[i][2])
-        if bg_dict != {}:
-            nmc += np.sum(bgs[i][2])
-        numbers.append((ndata, nmc))
-        pulls.append((ndata - nmc) / np.sqrt(nmc))
+    pulls = (ndata - nmc) / np.sqrt(nmc)
 
     max_weight = max(np.max(np.abs(pulls)), 5)
 
@@ -3,7 +3,6 @@ import itertools
 import logging
 import os
 
-import matplotlib.pyplot as plt
 import numpy as np
 import tensorflow as tf
 import yaml
@@ -17,6 +16,9 @@ from tf_pwa.config_loader.plot import (
 )
 from tf_pwa.data import ReadData, batch_call, data_index, data_shape
 from tf_pwa.histogram import Hist1D, WeightedData
+from tf_pwa.utils import LazyModule
+
+plt = LazyModule("matplotlib.pyplot")
 
 logger = logging.getLogger(__file__)
 
@@ -126,7 +128,7 @@ class Frame:
         return hist
 
     def set_axis(self, axis, **config):
-        if axis is plt:
+        if axis == plt:
             axis = plt.gca()
         config = {**self.extra, **config}
         delta = (self.x_range[1] - self.x_range[0]) / self.nbins
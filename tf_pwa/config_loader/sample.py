@@ -201,16 +201,27 @@ class AfterGenerator(BaseGenerator):
     def cal_max_weight(self):
         self.gen.cal_max_weight()
 
+    @property
+    def random(self):
+        return self.gen.random
+
+    def set_random(self, random):
+        self.gen.set_random(random)
+
 
 @ConfigLoader.register_function()
-def get_phsp_p_generator(config, nodes=[]):
+def get_phsp_p_generator(config, nodes=[], random=None):
+    """
+    :param random: source of uniform random numbers, such as "sobol", see
+        `tf_pwa.generator.qmc`
+    """
     decay_group = config.get_decay()
 
     m0, mi, idx = build_phsp_chain(decay_group)
     for node in nodes:
         (m0, mi), idx = perfer_node((m0, mi), idx, node)
 
-    chain_gen = ChainGenerator(m0, mi)
+    chain_gen = ChainGenerator(m0, mi, random=random)
     chain_gen.unpack_map = idx
 
     # pi = chain_gen.generate(N)
@@ -227,8 +238,8 @@ def get_phsp_p_generator(config, nodes=[]):
 
 
 @ConfigLoader.register_function()
-def generate_phsp_p(config, N=1000, cal_max=False):
-    gen = get_phsp_p_generator(config)
+def generate_phsp_p(config, N=1000, cal_max=False, random=None):
+    gen = get_phsp_p_generator(config, random=random)
     if cal_max:
         gen.cal_max_weight()
     return gen.generate(N)
@@ -247,15 +258,19 @@ def create_cal_calangle(config, include_charge=False):
 
 
 @ConfigLoader.register_function()
-def get_phsp_generator(config, include_charge=False, nodes=[]):
-    gen_p = get_phsp_p_generator(config, nodes=nodes)
+def get_phsp_generator(config, include_charge=False, nodes=[], random=None):
+    gen_p = get_phsp_p_generator(config, nodes=nodes, random=random)
     f_after = create_cal_calangle(config, include_charge=include_charge)
     return AfterGenerator(gen_p, f_after)
 
 
 @ConfigLoader.register_function()
-def generate_phsp(config, N=1000, include_charge=False, cal_max=False):
-    gen = get_phsp_generator(config, include_charge=include_charge)
+def generate_phsp(
+    config, N=1000, include_charge=False, cal_max=False, random=None
+):
+    gen = get_phsp_generator(
+        config, include_charge=include_charge, random=random
+    )
     if cal_max:
         gen.cal_max_weight()
     return gen.generate(N)
@@ -427,7 +442,7 @@ def get_SDP_p_generator_legacy(config, node):
 
 
 @ConfigLoader.register_function()
-def get_SDP_p_generator(config, node, legacy=True):
+def get_SDP_p_generator(config, node, legacy=True, random=None):
     if legacy:
         return get_SDP_p_generator_legacy(config, node)
 
@@ -502,6 +517,7 @@ def get_SDP_p_generator(config, node, legacy=True):
         return [pi[i] for i in new_order]
 
     chain_gen.gen[gen_idx] = AfterGenerator(sdp_gen, reorder)
+    chain_gen.set_random(random)
 
     def loop_index(tree, idx):
         for i in idx:
@@ -0,0 +1,202 @@
+"""
+Significance of resonances (or couplings) from the fits without them.
+
+Each reduced model is the nominal amplitude with some parameters fixed, for
+a resonance, the total couplings of all the decay chains including it are
+fixed to 0. The parameters only used by the removed part (with exactly
+zero gradient after fixing) are fixed too, and counted in the ndf. The
+reduced fits start from the nominal parameters.
+"""
+
+import concurrent.futures
+import contextlib
+import multiprocessing
+import warnings
+
+import numpy as np
+
+from tf_pwa.applications import fit
+from tf_pwa.significance import significance
+
+from .config_loader import ConfigLoader
+
+
+def get_drop_params(config, drop):
+    """
+    Values of the parameters to fix for removing **drop**, which is the
+    name of a resonance or a parameter, a list of parameter names (fixed
+    to 0), or a dict of parameter values.
+    """
+    vm = config.get_amplitude().vm
+    if isinstance(drop, dict):
+        return dict(drop)
+    if isinstance(drop, (list, tuple)):
+        return {i: 0.0 for i in drop}
+    if drop in vm.variables:
+        return {drop: 0.0}
+    ret = {}
+    for chain in config.get_decay():
+        if any(str(i) == drop for i in chain.inner):
+            for name in vm.var_head.get(chain.total, []):
+                # real, or parts of complex variables
+                for i in ["", "r", "i", "deltar", "deltai"]:
+                    if name + i in vm.variables:
+                        ret[name + i] = 0.0
+    if not ret:
+        raise ValueError(f"{drop} is neither a resonance nor a parameter")
+    return ret
+
+
+@contextlib.contextmanager
+def fix_params(vm, values):
+    """
+    Fix the parameters to **values** (None for the current value), and
+    restore the values and trainable parameters after.
+    """
+    params = vm.get_all_dic()
+    trainable = list(vm.trainable_vars)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for k, v in values.items():
+            vm.set_fix(k, v)
+    try:
+        yield
+    finally:
+        for k in values:
+            if k in trainable:
+                vm.set_fix(k, unfix=True)
+        vm.trainable_vars[:] = trainable
+        vm.set_all(params)
+
+
+def _reduced_fix(fcn, fix):
+    """add the parameters with zero gradient after fixing **fix**"""
+    vm = fcn.vm
+    with fix_params(vm, fix):
+        _, grad = fcn.nll_grad()
+        unused = [
+            k for k, g in zip(vm.trainable_vars, np.array(grad)) if g == 0.0
+        ]
+    ret = dict(fix)
+    for k in unused:
+        ret[k] = None
+    ndf = len([k for k in ret if k in vm.trainable_vars])
+    return ret, ndf
+
+
+def _reduced_fit(config, fcn, nominal, fix, fit_kwargs):
+    fcn.vm.set_all(nominal)
+    with fix_params(fcn.vm, fix):
+        fit_result = fit(fcn=fcn, bounds_dict=config.bound_dic, **fit_kwargs)
+    return fit_result.min_nll, fit_result.success
+
+
+_worker = {}
+
+
+def _init_worker(config_dict, nominal, batch):
+    config = ConfigLoader(config_dict)
+    config.set_params(nominal)
+    _worker["config"] = config
+    _worker["fcn"] = config.get_fcn(batch=batch)
+    _worker["nominal"] = nominal
+
+
+def _worker_fit(fix, fit_kwargs):
+    return _reduced_fit(
+        _worker["config"], _worker["fcn"], _worker["nominal"], fix, fit_kwargs
+    )
+
+
+@ConfigLoader.register_function()
+def significance_scan(
+    config,
+    drops,
+    fit_result=None,
+    n_workers=1,
+    batch=None,
+    method="BFGS",
+    maxiter=None,
+    gtol=1e-3,
+    print_table=True,
+):
+    """
+    Significance of each item in **drops** by the fits without it.
+
+    .. code::
+
+        fit_result = config.fit()
+        table = config.significance_scan(["R_BC", "R_CD"], fit_result)
+
+    :param drops: List of resonance names, parameter names or the others
+        supported by `get_drop_params`, or dict of them with labels as keys.
+    :param fit_result: Nominal fit result, fit from the current parameters
+        if it is None.
+    :param n_workers: Number of processes for the reduced fits. Each
+        process builds the model from the config once and runs its fits on
+        it. The fits are done in this process for **n_workers=1**.
+    :return: dict of label to the dict of "NLL", "delta_NLL", "ndf",
+        "significance" and "success".
+    """
+    fit_kwargs = {"method": method, "maxiter": maxiter, "gtol": gtol}
+    fcn = config.get_fcn(batch=batch)
+    vm = fcn.vm
+    if fit_result is None:
+        fit_result = fit(fcn=fcn, bounds_dict=config.bound_dic, **fit_kwargs)
+    config.set_params(fit_result.params)
+    nominal = vm.get_all_dic()
+    if not isinstance(drops, dict):
+        drops = {i if isinstance(i, str) else ",".join(i): i for i in drops}
+    fixes, ndfs = {}, {}
+    for k, v in drops.items():
+        fixes[k], ndfs[k] = _reduced_fix(fcn, get_drop_params(config, v))
+
+    if n_workers <= 1:
+        results = {
+            k: _reduced_fit(config, fcn, nominal, v, fit_kwargs)
+            for k, v in fixes.items()
+        }
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(
+            n_workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(config.config, nominal, batch),
+        ) as executor:
+            futures = {
+                k: executor.submit(_worker_fit, v, fit_kwargs)
+                for k, v in fixes.items()
+            }
+            results = {k: v.result() for k, v in futures.items()}
+    vm.set_all(nominal)
+
+    ret = {}
+    for k, (nll, success) in results.items():
+        delta_nll = nll - fit_result.min_nll
+        if delta_nll < 0:
+            warnings.warn(
+                f"NLL without {k} is less than the nominal fit by "
+                f"{-delta_nll}, the nominal fit may not be the minimum."
+            )
+        ret[k] = {
+            "NLL": nll,
+            "delta_NLL": delta_nll,
+            "ndf": ndfs[k],
+            "significance": significance(fit_result.min_nll, nll, ndfs[k]),
+            "success": success,
+        }
+    if print_table:
+        width = max([len(k) for k in ret] + [8])
+        print(
+            "{:<{}} {:>12} {:>5} {:>12}".format(
+                "name", width, "delta NLL", "ndf", "significance"
+            )
+        )
+        for k, v in ret.items():
+            print(
+                "{:<{}} {:>12.3f} {:>5} {:>12.3f}".format(
+                    k, width, v["delta_NLL"], v["ndf"], v["significance"]
+                )
+            )
+    return ret
@@ -89,6 +89,9 @@ class LazyCall:
         self.cached_file = None
         self.name = ""
         self.prefetch = -1
+        self.prefetch_memory = None
+        self.num_parallel_calls = 1
+        self.cache_chunk = 65000
 
     def batch(self, batch, axis=0):
         return self.as_dataset(batch)
@@ -117,6 +120,20 @@ class LazyCall:
                 yield {**self.f(i, *self.args, **self.kwargs), **j}
 
     def as_dataset(self, batch=65000):
+        """
+        Build the `tf.data` pipeline of **batch** size. The options are
+
+        * :code:`num_parallel_calls`: Number of batches processed in
+          parallel (-1 for AUTOTUNE), the order of batches is kept.
+        * :code:`cached_file`: Prefix of cache files, the cache is sharded
+          per :code:`cache_chunk` events, so the shards are built
+          incrementally and shared between batch sizes. An empty string is
+          for the cache in memory.
+        * :code:`prefetch_memory`: Memory budget (MB) of prefetching,
+          instead of the number of batches :code:`prefetch` (-1 for
+          AUTOTUNE).
+
+        """
         self.batch_size = batch
         if isinstance(self.x, LazyCall):
             self.x.as_dataset(batch)
@@ -131,31 +148,18 @@ class LazyCall:
             ret = self.f(x, *self.args, **self.kwargs)
             return ret
 
-        if isinstance(self.x, LazyFile):
-            data = self.x.cached_batch[batch]
+        if self.cached_file:
+            data = self._sharded_cache(f, batch)
         else:
-            if isinstance(self.x, LazyCall):
-                real_x = self.x.eval()
-            else:
-                real_x = self.x
-            data = tf.data.Dataset.from_tensor_slices(real_x).batch(batch)
-        # data = data.batch(batch).cache().map(f)
-        if self.cached_file is not None:
-            from tf_pwa.utils import create_dir
-
-            cached_file = self.cached_file + self.name
-
-            cached_file += "_" + str(batch)
-            create_dir(cached_file)
-            data = data.map(f)
+            data = self._source(batch).map(f, **self._map_kwargs())
             if self.cached_file == "":
                 data = data.cache()
-            else:
-                data = data.cache(cached_file)
-        else:
-            data = data.map(f)
 
-        if self.prefetch > 0:
+        if self.prefetch_memory is not None:
+            size = _element_size(data.element_spec) * batch
+            n_prefetch = self.prefetch_memory * 2**20 // max(size, 1)
+            data = data.prefetch(max(int(n_prefetch), 1))
+        elif self.prefetch > 0:
             data = data.prefetch(self.prefetch)
         elif self.prefetch < 0:
             data = data.prefetch(tf.data.AUTOTUNE)
@@ -163,6 +167,53 @@ class LazyCall:
         self.cached_batch[batch] = data
         return self
 
+    def _map_kwargs(self):
+        n = self.num_parallel_calls
+        if n is not None and n < 0:
+            n = tf.data.AUTOTUNE
+        elif n is not None and n <= 1:
+            n = None
+        return {"num_parallel_calls": n, "deterministic": True}
+
+    def _source(self, batch, start=0, end=None, real_x=None):
+        """dataset of the input x in [start, end) with batch size"""
+        if isinstance(self.x, LazyFile):
+            if start == 0 and end is None:
+                return self.x.cached_batch[batch]
+            return self.x.slice_dataset(batch, start, end)
+        if real_x is None:
+            real_x = self.x
+            if isinstance(self.x, LazyCall):
+                real_x = self.x.eval()
+        if start != 0 or end is not None:
+            real_x = data_map(real_x, lambda x: x[start:end])
+        return tf.data.Dataset.from_tensor_slices(real_x).batch(batch)
+
+    def _sharded_cache(self, f, batch):
+        """
+        cache of :code:`cache_chunk` events for each file, the chunk is
+        split into :code:`num_parallel_calls` parts for parallel map.
+        """
+        from tf_pwa.utils import create_dir
+
+        chunk = self.cache_chunk
+        n_parallel = max(self.num_parallel_calls, 1)
+        map_batch = min(batch, -(-chunk // n_parallel))
+        cached_file = "{}{}_chunk{}".format(self.cached_file, self.name, chunk)
+        create_dir(cached_file)
+        real_x = self.x
+        if isinstance(self.x, LazyFile):
+            real_x = self.x.x
+        elif isinstance(self.x, LazyCall):
+            real_x = self.x.eval()
+        data = None
+        for i, start in enumerate(range(0, data_shape(real_x), chunk)):
+            shard = self._source(map_batch, start, start + chunk, real_x)
+            shard = shard.map(f, **self._map_kwargs())
+            shard = shard.cache("{}_{}".format(cached_file, i))
+            data = shard if data is None else data.concatenate(shard)
+        return data.rebatch(batch)
+
     def set_cached_file(self, cached_file, name):
         if isinstance(self.x, LazyCall):
             self.x.set_cached_file(cached_file, name)
@@ -188,6 +239,9 @@ class LazyCall:
         for i in other:
             ret.name += "_" + i.name
         ret.prefetch = self.prefetch
+        ret.prefetch_memory = self.prefetch_memory
+        ret.num_parallel_calls = self.num_parallel_calls
+        ret.cache_chunk = self.cache_chunk
         return ret
 
     def __setitem__(self, index, value):
@@ -214,6 +268,9 @@ class LazyCall:
         ret.cached_file = self.cached_file
         ret.name = self.name
         ret.prefetch = self.prefetch
+        ret.prefetch_memory = self.prefetch_memory
+        ret.num_parallel_calls = self.num_parallel_calls
+        ret.cache_chunk = self.cache_chunk
         return ret
 
     def eval(self):
@@ -246,25 +303,34 @@ class LazyFile(LazyCall):
         self.cached_file = None
         self.name = ""
         self.prefetch = -1
+        self.prefetch_memory = None
+        self.num_parallel_calls = 1
+        self.cache_chunk = 65000
 
     def as_dataset(self, batch=65000):
         if batch in self.cached_batch:
             return self.cached_batch[batch]
+        self.batch_size = batch
+        self.cached_batch[batch] = self.slice_dataset(batch)
+        return self
+
+    def slice_dataset(self, batch, start=0, end=None):
+        """dataset of events in [start, end) read from file by batch"""
+        x = self.x
+        if start != 0 or end is not None:
+            x = data_map(x, lambda a: a[start:end])
 
         def gen():
-            for i in data_split(self.x, batch_size=batch):
+            for i in data_split(x, batch_size=batch):
                 yield data_map(i, np.array)
 
         test_data = next(gen())
         from tf_pwa.experimental.wrap_function import _wrap_struct
 
         output_signature = _wrap_struct(test_data)
-        ret = tf.data.Dataset.from_generator(
+        return tf.data.Dataset.from_generator(
             gen, output_signature=output_signature
         )
-        self.batch_size = batch
-        self.cached_batch[batch] = ret
-        return self
 
     def create_new(self, f, x, *args, **kwargs):
         return LazyFile(x)
@@ -273,6 +339,17 @@ class LazyFile(LazyCall):
         return self.x
 
 
+def _element_size(spec):
+    """bytes of each event in the elements of dataset"""
+    size = 0
+    for i in tf.nest.flatten(spec):
+        n = 1
+        for j in i.shape[1:]:
+            n *= 1 if j is None else j
+        size += n * i.dtype.size
+    return size
+
+
 class EvalLazy:
     def __init__(self, f):
         self.f = f
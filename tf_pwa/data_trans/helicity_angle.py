@@ -2,6 +2,7 @@ import numpy as np
 import tensorflow as tf
 
 from tf_pwa.amp import get_relative_p
+from tf_pwa.angle import SU2M, EulerAngle
 from tf_pwa.angle import LorentzVector as lv
 
 
@@ -122,6 +123,88 @@ class HelicityAngle:
         # ret = self.generate_p(ms, costheta, phi)
         return ret  # dict(zip(self.par, ret))
 
+    def build_angle(
+        self,
+        ms,
+        costheta,
+        phi,
+        decay_group=None,
+        using_topology=True,
+        **kwargs
+    ):
+        """
+        Data for the amplitude from the same variables as `build_data`, the
+        same as `cal_angle` of the momenta from `build_data`. The momenta
+        and the helicity angles of the decay chain come from
+        `helicity_kinematics` directly, only the decay chains of other
+        topologies in **decay_group** and the aligned angles are calculated
+        from the momenta.
+
+        .. code::
+
+            ha = HelicityAngle(config.get_decay().get_decay_chain("R_BC"))
+            data = ha.build_angle(*ha.find_variable(toy), config.get_decay())
+            amp = config.get_amplitude()(data)
+
+        :param decay_group: DecayGroup of the amplitude, only the decay
+            chain by default.
+        :param kwargs: Other options of `cal_angle_from_momentum`, such as
+            ``r_boost`` and ``align_ref``. They should be the same as the
+            options in ``data`` of the config.
+        :return: CalAngleData
+        """
+        from tf_pwa.cal_angle import (
+            DecayGroup,
+            cal_angle_from_momentum,
+            cal_angle_from_momentum_single,
+        )
+
+        if decay_group is None:
+            decay_group = DecayGroup([self.decay_chain])
+        if using_topology:
+            decay_chain_struct = decay_group.topology_structure()
+        else:
+            decay_chain_struct = decay_group
+        p4 = None
+        decay_data = {}
+        for chain in decay_chain_struct:
+            if chain.topology_same(self.decay_chain, False):
+                var = self.map_variable(chain, ms, costheta, phi)
+                p4, decay_data[chain] = helicity_kinematics(chain, *var)
+        if p4 is None:
+            raise ValueError(
+                "{} is not in the decay group".format(self.decay_chain)
+            )
+        if decay_group.identical_particles or decay_group.cp_particles:
+            # the swapped momenta have no helicity variables
+            return cal_angle_from_momentum(
+                p4, decay_group, using_topology, **kwargs
+            )
+        return cal_angle_from_momentum_single(
+            p4,
+            decay_group,
+            using_topology,
+            decay_data=decay_data,
+            **kwargs,
+        )
+
+    def map_variable(self, decay_chain, ms, costheta, phi):
+        """
+        Variables of `build_data` for **decay_chain** with the same
+        topology, where the order of outs may be different.
+        """
+        topo_map = self.decay_chain.topology_map(decay_chain)
+        ms = {topo_map[k]: v for k, v in ms.items() if k in topo_map}
+        var = {}
+        for dec, c, i in zip(self.decay_chain, costheta, phi):
+            if topo_map[dec.outs[0]] == topo_map[dec].outs[0]:
+                var[topo_map[dec]] = (c, i)
+            else:
+                var[topo_map[dec]] = (-c, i + np.pi)
+        costheta = [var[i][0] for i in decay_chain]
+        phi = [var[i][1] for i in decay_chain]
+        return ms, costheta, phi
+
     def get_phsp_factor(self, name, m):
         m = tf.convert_to_tensor(m, tf.float64)
         ms = self.get_all_mass({name: m})
@@ -267,6 +350,88 @@ def create_rotate_p_decay(decay_chain, mass, data):
     return monmentum[decay_chain.top]
 
 
+def helicity_kinematics(decay_chain, ms, costheta, phi):
+    """
+    Momenta of the final particles in the rest frame of the top particle,
+    and the helicity angles of **decay_chain** (the results of
+    `cal_helicity_angle`), from the helicity variables directly. The
+    rest frame axes of each particle are rotated from its mother by the
+    angles, so the angles are not calculated from the momenta again. Each
+    step works on all the events at once, and the momenta of all the
+    final particles from a particle are boosted together.
+
+    :param ms: dict of masses of all particles in **decay_chain**.
+    :param costheta: list of :math:`\\cos\\theta` of ``outs[0]`` for each
+        decay in **decay_chain**.
+    :param phi: list of :math:`\\phi` of ``outs[0]`` for each decay.
+    :return: dict of momenta, and dict of helicity angles.
+    """
+    ms = {k: tf.convert_to_tensor(v, tf.float64) for k, v in ms.items()}
+    var = {}
+    ones = tf.ones((), tf.float64)
+    for dec, c, i in zip(decay_chain, costheta, phi):
+        c = tf.convert_to_tensor(c, tf.float64)
+        i = tf.convert_to_tensor(i, tf.float64)
+        var[dec] = (c, i)
+        ones = ones + tf.zeros_like(c) + tf.zeros_like(i)
+    for v in ms.values():
+        ones = ones + tf.zeros_like(v)
+    unit = lambda x: ones[..., None] * tf.constant(x, tf.float64)
+    frame = {
+        decay_chain.top: (unit([1, 0, 0]), unit([0, 1, 0]), unit([0, 0, 1]))
+    }
+    ret = {i: {} for i in decay_chain}
+    p_rest, r_matrix, b_matrix = {}, {}, {}
+    for _, dec in decay_chain.depth_first():
+        c, i = var[dec]
+        x, y, z = frame[dec.core]
+        s = tf.sqrt(1 - c**2)
+        cos_i, sin_i = tf.cos(i), tf.sin(i)
+        expand = lambda a: tf.expand_dims(a * ones, axis=-1)
+        z1 = expand(s * cos_i) * x + expand(s * sin_i) * y + expand(c) * z
+        y1 = expand(-sin_i) * x + expand(cos_i) * y
+        x1 = expand(c * cos_i) * x + expand(c * sin_i) * y - expand(s) * z
+        q = get_relative_p(ms[dec.core], ms[dec.outs[0]], ms[dec.outs[1]])
+        q = tf.cast(q, tf.float64) * ones
+        theta = tf.acos(c) * ones
+        outs = [
+            (1.0, i * ones, theta),
+            (-1.0, (i + np.pi) * ones, np.pi - theta),
+        ]
+        for k, (j, (sign, alpha, beta)) in enumerate(zip(dec.outs, outs)):
+            p3 = sign * expand(q) * z1
+            E = tf.sqrt(ms[j] ** 2 + q**2)
+            p_rest[j] = tf.concat([tf.expand_dims(E, axis=-1), p3], axis=-1)
+            frame[j] = (x1, sign * y1, sign * z1)
+            # the same range of alpha as cal_helicity_angle
+            bias = -np.pi * (k + 1)
+            alpha = (alpha - bias) % (2 * np.pi) + bias
+            ret[dec][j] = {
+                "ang": EulerAngle(alpha, beta, tf.zeros_like(beta)),
+                "x": x1,
+                "z": p3,
+            }
+            b_matrix[j] = SU2M.Boost_z_from_p(p_rest[j])
+            r = SU2M.Rotation_y(beta) * SU2M.Rotation_z(alpha)
+            if dec.core in r_matrix:
+                r = r * b_matrix[dec.core] * r_matrix[dec.core]
+            r_matrix[j] = r
+    ret["r_matrix"] = r_matrix
+    ret["b_matrix"] = b_matrix
+    momentum = {}
+    for _, dec in list(decay_chain.depth_first())[::-1]:
+        momentum[dec.core] = {}
+        for j in dec.outs:
+            if j in momentum:
+                keys = list(momentum[j])
+                p = tf.stack([momentum[j][k] for k in keys])
+                p = lv.boost(p, lv.boost_vector(p_rest[j]))
+                momentum[dec.core].update(zip(keys, tf.unstack(p)))
+            else:
+                momentum[dec.core][j] = p_rest[j]
+    return momentum[decay_chain.top], ret
+
+
 def lorentz_neg(pc):
     return tf.concat([pc[..., 0:1], -pc[..., 1:]], axis=-1)
 
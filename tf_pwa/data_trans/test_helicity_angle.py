@@ -128,6 +128,53 @@ def test_helicity_var(toy_config):
         np.allclose(p_rec[k], p_new[k])
 
 
+def test_build_angle(toy_config):
+    decay_group = toy_config.get_decay()
+    decay_chain = decay_group.get_decay_chain("R_BC")
+    ha = HelicityAngle(decay_chain)
+    toy = toy_config.generate_toy(100)
+    var = ha.find_variable(toy)
+    kwargs = {"r_boost": False, "random_z": False}
+    data = ha.build_angle(*var, decay_group, **kwargs)
+    p_new = ha.build_data(*var)
+    toy_new = toy_config.data.cal_angle(p_new)
+    for i in decay_group.outs:
+        assert np.allclose(data.get_momentum(i), p_new[i])
+    assert np.allclose(
+        toy.get_angle("(B, C)", "B")["beta"],
+        data.get_angle("(B, C)", "B")["beta"],
+    )
+    amp = toy_config.get_amplitude()
+    assert np.allclose(amp(data), amp(toy_new))
+
+
+def test_build_angle_outs_order():
+    from tf_pwa.amp import DecayChain, DecayGroup, get_decay, get_particle
+    from tf_pwa.cal_angle import cal_angle_from_momentum
+    from tf_pwa.data import data_to_numpy, flatten_dict_data
+
+    a, r, z, b, c, d = [
+        get_particle(i, mass=m)
+        for i, m in zip("ARZBCD", [3.0, 1.8, 1.8, 0.5, 0.4, 0.3])
+    ]
+    chain1 = DecayChain([get_decay(a, [r, b]), get_decay(r, [c, d])])
+    chain2 = DecayChain([get_decay(a, [b, z]), get_decay(z, [d, c])])
+    decay_group = DecayGroup([chain1, chain2])
+    ha = HelicityAngle(chain2)
+    ms = ha.get_all_mass({"Z": np.linspace(0.8, 2.4, 50)})
+    costheta = [np.linspace(-0.9, 0.9, 50), np.linspace(0.8, -0.8, 50)]
+    phi = [np.linspace(0.1, 6.0, 50), np.linspace(-3.0, 3.0, 50)]
+    data = ha.build_angle(ms, costheta, phi, decay_group)
+    ref = cal_angle_from_momentum(
+        ha.build_data(ms, costheta, phi), decay_group
+    )
+    data = flatten_dict_data(data_to_numpy(data))
+    ref = flatten_dict_data(data_to_numpy(ref))
+    assert set(data) == set(ref)
+    for k, v in ref.items():
+        assert np.allclose(data[k], v), k
+
+
 if __name__ == "__main__":
     test_gen_p()
     test_gen_p_mass()
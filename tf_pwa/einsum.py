@@ -1,19 +1,107 @@
+import functools
 import warnings
 
+import numpy as np
 from opt_einsum import contract, contract_path, get_symbol
 
+from .config import get_config, regist_config
 from .tensorflow_wrapper import tf
 
 # from pysnooper import snoop
 
+EINSUM_FUSED = "einsum_fused"
+regist_config(EINSUM_FUSED, False)
+
 
 class Einsum(object):
-    def __init__(self, expr, shapes):
+    """
+    Contraction plan of **expr** for the inputs with static **shapes**
+    (None for unknown size). The optimized path, the transposes, reshapes
+    and summed axes of each pairwise step are found once, and then only the
+    TensorFlow operations are done for each call.
+
+    With :code:`fused=True`, each pairwise step is one :code:`tf.einsum`
+    operation instead of transpose, reshape, product and reduce_sum.
+
+    >>> a, b = tf.ones((3, 2, 4)), tf.ones((3, 4, 5))
+    >>> f = Einsum("...ab,...bc->...ac", [(None, 2, 4), (None, 4, 5)])
+    >>> f(a, b).shape
+    TensorShape([3, 2, 5])
+
+    """
+
+    def __init__(self, expr, shapes, fused=False):
         self.expr = expr
-        self.shapes = shapes
+        self.shapes = [tuple(i) for i in shapes]
+        self.fused = fused
+        self.build()
+
+    def build(self):
+        shapes = [replace_none_in_shape(i, 10000) for i in self.shapes]
+        expr, extra = replace_ellipsis(self.expr, shapes)
+        path, path_info = contract_path(
+            expr, *shapes, shapes=True, optimize="auto"
+        )
+        final_idx = expr.split("->")[1]
+        expr2, in_shapes, size_map = _remove_size1_plan(
+            expr, self.shapes, extra
+        )
+        self.input_shapes = [
+            None if i == tuple(j) else replace_none_in_shape(i, -1)
+            for i, j in zip(in_shapes, self.shapes)
+        ]
+        self.final_shape = replace_none_in_shape(
+            [size_map[i] for i in final_idx], -1
+        )
+        base_order = ordered_indices(expr2, shapes)
+        ein_s = expr2.split("->")
+        final_index = ein_s[1]
+        in_idx = ein_s[0].split(",")
+        in_shapes = list(in_shapes)
+        self.steps = []
+        for idx in path:
+            part_in_idx = [in_idx[i] for i in idx]
+            part_shapes = [in_shapes[i] for i in idx]
+            for i in sorted(idx)[::-1]:
+                del in_idx[i]
+                del in_shapes[i]
+            out_idx = set("".join(part_in_idx)) & set(
+                final_index + "".join(in_idx)
+            )
+            out_idx = "".join(sorted(out_idx, key=lambda x: base_order[x]))
+            expr_i = "{}->{}".format(",".join(part_in_idx), out_idx)
+            step, out_shape = _reduce_sum_plan(expr_i, part_shapes, base_order)
+            in_idx.append(out_idx)
+            in_shapes.append(out_shape)
+            self.steps.append((idx, expr_i, step))
 
     def __call__(self, *args):
-        return contract(self.expr, *args, backend="tensorflow")
+        data = [
+            j if i is None else tf.reshape(j, i)
+            for i, j in zip(self.input_shapes, args)
+        ]
+        for idx, expr_i, step in self.steps:
+            part_data = [data[i] for i in idx]
+            for i in sorted(idx)[::-1]:
+                del data[i]
+            if self.fused:
+                result = tf.einsum(expr_i, *part_data)
+            elif step is None:  # inner product
+                warnings.warn("inner product")
+                result = tf.einsum(expr_i, *part_data)
+            else:
+                result = _run_reduce_sum_plan(step, part_data)
+            data.append(result)
+        return tf.reshape(data[0], self.final_shape)
+
+
+@functools.lru_cache(maxsize=1024)
+def get_einsum_plan(expr, shapes, dtypes=None, fused=False):
+    """
+    cached `Einsum` for the static **shapes** (tuple of tuple) and
+    **dtypes** of the inputs
+    """
+    return Einsum(expr, shapes, fused=fused)
 
 
 def symbol_generate(base_map):
@@ -103,15 +191,13 @@ def replace_none_in_shape(x, num=-1):
     return shape
 
 
-def remove_size1(expr, *args, extra=None):
-    """remove order independent indices (size 1)"""
-    if extra is None:
-        extra = []
+def _remove_size1_plan(expr, shapes, extra):
+    """indices and shapes of inputs without the indices of size 1"""
     sub = expr.split("->")[0].split(",")
 
     size_map = {}
-    for idx, shape in zip(sub, args):
-        for i, j in zip(idx, shape.shape):
+    for idx, shape in zip(sub, shapes):
+        for i, j in zip(idx, shape):
             l = size_map.get(i, 1)
             if j is None or j >= l:
                 size_map[i] = j
@@ -121,17 +207,16 @@ def remove_size1(expr, *args, extra=None):
         if size_map[i] == 1 and i not in extra:
             remove_idx.append(i)
 
-    idxs = expr.split("->")[0].split(",")
     idxs2 = []
     ret = []
-    for idx, arg in zip(idxs, args):
+    for idx, arg_shape in zip(sub, shapes):
         shape = []
         idx2 = []
-        for i, j in zip(idx, arg.shape):
+        for i, j in zip(idx, arg_shape):
             if i not in remove_idx:
                 shape.append(j)
                 idx2.append(i)
-        ret.append(tf.reshape(arg, replace_none_in_shape(shape, -1)))
+        ret.append(tuple(shape))
         idxs2.append("".join(idx2))
 
     final_idx = expr.split("->")[1]
@@ -142,71 +227,237 @@ def remove_size1(expr, *args, extra=None):
     return expr2, ret, size_map
 
 
-def einsum(expr, *args, **kwargs):
-    shapes = [replace_none_in_shape(i.shape, 10000) for i in args]
-    expr, extra = replace_ellipsis(expr, shapes)
-    path, path_info = contract_path(
-        expr, *shapes, shapes=True, optimize="auto"
+def remove_size1(expr, *args, extra=None):
+    """remove order independent indices (size 1)"""
+    if extra is None:
+        extra = []
+    expr2, shapes, size_map = _remove_size1_plan(
+        expr, [i.shape for i in args], extra
     )
-    final_idx = expr.split("->")[1]
-    expr2, args, size_map = remove_size1(expr, *args, extra=extra)
-    final_shape = [size_map[i] for i in final_idx]
-    base_order = ordered_indices(expr2, shapes)
-    ein_s = expr2.split("->")
-    final_index = ein_s[1]
-    idxs = ein_s[0].split(",")
+    ret = [
+        tf.reshape(arg, replace_none_in_shape(shape, -1))
+        for arg, shape in zip(args, shapes)
+    ]
+    return expr2, ret, size_map
+
+
+def einsum(expr, *args, fused=None, **kwargs):
+    """
+    :code:`tf.einsum` by the optimized path of :code:`opt_einsum`. The
+    contraction plan is cached for the static shapes and dtypes of
+    **args**, see `Einsum`.
 
-    data = list(args)
-    in_idx = list(idxs)
-    for idx in path:
-        part_data = [data[i] for i in idx]
-        part_in_idx = [in_idx[i] for i in idx]
-        for i in sorted(idx)[::-1]:
-            del data[i]
-            del in_idx[i]
-        out_idx = set("".join(part_in_idx)) & set(
-            final_index + "".join(in_idx)
+    :param fused: Each pairwise step is one :code:`tf.einsum` operation,
+        default is the config "einsum_fused".
+    """
+    if fused is None:
+        fused = get_config(EINSUM_FUSED)
+    shapes = tuple(tuple(i.shape) for i in args)
+    dtypes = tuple(i.dtype for i in args)
+    plan = get_einsum_plan(expr, shapes, dtypes, fused)
+    return plan(*args)
+
+
+class SparseEinsum(object):
+    """
+    Contraction plan of **expr** over the structurally non-zero entries of
+    the inputs. **masks** are the boolean masks of the explicit (not
+    :code:`...`) indices of the inputs, None for dense inputs, and
+    **shapes** are the sizes of the explicit indices.
+
+    The tuples of all the indices with all the masks true are found once,
+    and grouped by the output indices into segments of the same size
+    (padded by a zero entry). Each call gathers the entries of the inputs
+    for the tuples, multiplies them, and sums each segment. The inputs
+    without explicit indices are multiplied after the sum, and the output
+    is filled back to the dense shape with zeros.
+
+    >>> a = tf.ones((3, 2, 2))
+    >>> mask = np.eye(2, dtype=bool)
+    >>> f = SparseEinsum("...ab,...bc->...ac", [(2, 2), (2, 2)], [mask, None])
+    >>> f(a * mask, a).shape
+    TensorShape([3, 2, 2])
+
+    """
+
+    def __init__(self, expr, shapes, masks):
+        self.expr = expr
+        self.shapes = [tuple(i) for i in shapes]
+        self.masks = [
+            np.ones(j, dtype=bool) if i is None else np.asarray(i, dtype=bool)
+            for i, j in zip(masks, self.shapes)
+        ]
+        self.build()
+
+    def build(self):
+        ein_s = self.expr.replace("...", "").split("->")
+        self.in_idx = ein_s[0].split(",")
+        out_idx = ein_s[1]
+        size_map = {}
+        for idx, shape, mask in zip(self.in_idx, self.shapes, self.masks):
+            if len(set(idx)) != len(idx) or mask.shape != shape:
+                raise ValueError(
+                    "invalid indices or mask for {}".format(self.expr)
+                )
+            for i, j in zip(idx, shape):
+                size_map[i] = max(size_map.get(i, 1), j)
+        all_idx = out_idx + "".join(sorted(set(size_map) - set(out_idx)))
+        # non-zero tuples of all indices, sorted by the output indices
+        full = np.ones([size_map[i] for i in all_idx], dtype=bool)
+        for idx, mask in zip(self.in_idx, self.masks):
+            order = sorted(
+                range(len(idx)), key=lambda k: all_idx.index(idx[k])
+            )
+            shape = [
+                mask.shape[idx.index(i)] if i in idx else 1 for i in all_idx
+            ]
+            full = full & np.reshape(np.transpose(mask, order), shape)
+        nz = np.argwhere(full)
+        self.out_shape = [size_map[i] for i in out_idx]
+        out_flat = _ravel_index(
+            [nz[:, k] for k in range(len(out_idx))], self.out_shape, len(nz)
+        )
+        out_nz, segment_ids, counts = np.unique(
+            out_flat, return_inverse=True, return_counts=True
+        )
+        self.n_out = len(out_nz)
+        self.segment_size = int(np.max(counts, initial=0))
+        # position of the tuples in the segments, -1 for padding
+        pos = np.full((self.n_out, self.segment_size), -1)
+        start = np.cumsum(counts) - counts
+        for i, (j, k) in enumerate(zip(start, counts)):
+            pos[i, :k] = np.arange(j, j + k)
+        pos = pos.reshape(-1)
+        self.padded = bool(np.any(pos < 0))
+        self.gather_idx = []
+        self.pad_input = None
+        for k, (idx, shape) in enumerate(zip(self.in_idx, self.shapes)):
+            if len(idx) == 0:
+                self.gather_idx.append(None)
+                continue
+            # size 1 indices are broadcasted
+            tuples = [
+                nz[:, all_idx.index(i)] * (j > 1) for i, j in zip(idx, shape)
+            ]
+            g = _ravel_index(tuples, shape, len(nz))[np.maximum(pos, 0)]
+            if self.padded and self.pad_input is None:
+                self.pad_input = k
+                g = np.where(pos < 0, int(np.prod(shape)), g)
+            self.gather_idx.append(g)
+        # index of the output entries, the last one for zero
+        self.out_map = np.full(int(np.prod(self.out_shape)), self.n_out)
+        self.out_map[out_nz] = np.arange(self.n_out)
+        self.dense_out = bool(np.all(self.out_map < self.n_out))
+
+    def __call__(self, *args):
+        ret = None
+        scalar = None
+        for k, (arg, idx, g) in enumerate(
+            zip(args, self.in_idx, self.gather_idx)
+        ):
+            if g is None:
+                scalar = arg if scalar is None else scalar * arg
+                continue
+            n_batch = len(arg.shape) - len(idx)
+            x = tf.reshape(arg, tf.concat([tf.shape(arg)[:n_batch], [-1]], 0))
+            if k == self.pad_input:
+                x = tf.concat([x, tf.zeros_like(x[..., :1])], axis=-1)
+            x = tf.gather(x, g, axis=-1)
+            ret = x if ret is None else ret * x
+        if ret is None:  # no explicit indices
+            return scalar
+        batch_shape = tf.shape(ret)[:-1]
+        out_shape = tf.concat(
+            [batch_shape, tf.constant(self.out_shape, tf.int32)], 0
         )
-        out_idx = "".join(sorted(out_idx, key=lambda x: base_order[x]))
-        in_idx.append(out_idx)
-        expr_i = "{}->{}".format(",".join(part_in_idx), out_idx)
-        result = tensor_einsum_reduce_sum(expr_i, *part_data, order=base_order)
-        data.append(result)
-    return tf.reshape(data[0], replace_none_in_shape(final_shape, -1))
+        if self.n_out == 0:
+            return tf.zeros(out_shape, dtype=ret.dtype)
+        seg_shape = tf.constant([self.n_out, self.segment_size], tf.int32)
+        ret = tf.reshape(ret, tf.concat([batch_shape, seg_shape], 0))
+        ret = tf.reduce_sum(ret, axis=-1)
+        if scalar is not None:
+            ret = ret * tf.expand_dims(scalar, axis=-1)
+        if not self.dense_out:
+            ret = tf.concat([ret, tf.zeros_like(ret[..., :1])], axis=-1)
+            ret = tf.gather(ret, self.out_map, axis=-1)
+        return tf.reshape(ret, out_shape)
+
+
+def _ravel_index(pos, shape, n):
+    if len(shape) == 0:
+        return np.zeros(n, dtype=np.int64)
+    return np.ravel_multi_index(pos, shape)
+
+
+@functools.lru_cache(maxsize=1024)
+def get_sparse_einsum_plan(expr, shapes, masks):
+    """
+    cached `SparseEinsum`, **masks** is the tuple of :code:`(shape, bytes)`
+    or None for the masks.
+    """
+    masks = [
+        None if i is None else np.frombuffer(i[1], dtype=bool).reshape(i[0])
+        for i in masks
+    ]
+    return SparseEinsum(expr, shapes, masks)
 
 
-def tensor_einsum_reduce_sum(expr, *args, order):
+def sparse_einsum(expr, *args, masks=None):
     """
-    "abe,bcf->acef"  =reshape=> "ab1e1,1bc1f->acef" =product=> "abcef->acef" =reduce_sum=> "acef"
+    :code:`tf.einsum` over the non-zero entries of **args** given by the
+    boolean **masks** of their explicit indices (None for dense). The
+    contraction plan is cached for the masks and the static shapes of the
+    explicit indices, see `SparseEinsum`.
+
+    >>> a = tf.ones((3, 2, 2))
+    >>> mask = np.eye(2, dtype=bool)
+    >>> sparse_einsum("...ab,...bc->...ac", a * mask, a, masks=[mask, None])[0]
+    <tf.Tensor: shape=(2, 2), dtype=float32, numpy=
+    array([[1., 1.],
+           [1., 1.]], dtype=float32)>
+
+    """
+    if masks is None:
+        masks = [None] * len(args)
+    in_idx = expr.replace("...", "").split("->")[0].split(",")
+    shapes = tuple(
+        tuple(j.shape[len(j.shape) - len(i) :]) for i, j in zip(in_idx, args)
+    )
+    masks = tuple(
+        None if i is None else (np.shape(i), np.asarray(i, bool).tobytes())
+        for i in masks
+    )
+    plan = get_sparse_einsum_plan(expr, shapes, masks)
+    return plan(*args)
+
+
+def _reduce_sum_plan(expr, shapes, order):
+    """
+    transposes, reshapes and summed axes of `tensor_einsum_reduce_sum`, and
+    the shape of the result, None for inner product.
     """
     ein_s = expr.split("->")
     final_index = ein_s[1]
     idxs = ein_s[0].split(",")
     for i in idxs:
         if len(set(i)) != len(i):  # inner product
-            warnings.warn("inner product")
-            return tf.einsum(expr, *args)
+            return None, tuple(None for _ in final_index)
 
-    require_order = sorted(set(ein_s[0]) - {","}, key=lambda x: order[x])
+    # the same order for the indices with the same value in **order**
+    key = lambda x: (order[x], x)
+    require_order = sorted(set(ein_s[0]) - {","}, key=key)
 
     # transpose
-    t_args = []
-    n_args = len(idxs)
-
-    def args_it(it):
-        i, j = idxs[it], args[it]
-        sorted_idx = sorted(i, key=lambda x: order[x])
+    def trans_it(i):
+        sorted_idx = sorted(i, key=key)
         if list(i) == sorted_idx:
-            return j
-        else:
-            trans = [i.index(k) for k in sorted_idx]
-            return tf.transpose(j, trans)
+            return None
+        return [i.index(k) for k in sorted_idx]
 
-    t_args = [args_it(it) for it in range(n_args)]
+    trans = [trans_it(i) for i in idxs]
     # reshape
     sum_idx = set(require_order) - set(final_index)
     sum_idx_idx = [i for i, j in enumerate(require_order) if j in sum_idx]
-    shapes = [i.shape for i in args]
 
     def expand_shape_it(idx, shape):
         shape_dict = dict(zip(idx, shape))
@@ -216,18 +467,36 @@ def tensor_einsum_reduce_sum(expr, *args, order):
     expand_shapes = [
         expand_shape_it(idx, shape) for idx, shape in zip(idxs, shapes)
     ]
-
-    # print(expr, order, expand_shapes)
+    out_shape = []
+    for i, j in enumerate(require_order):
+        if j in sum_idx:
+            continue
+        sizes = [k[i] for k in expand_shapes]
+        out_shape.append(None if None in sizes else max(sizes))
+    reshapes = [replace_none_in_shape(i, -1) for i in expand_shapes]
+    return (trans, reshapes, sum_idx_idx), tuple(out_shape)
+
+
+def _run_reduce_sum_plan(step, args):
+    trans, reshapes, sum_idx_idx = step
     s_args = [
-        tf.reshape(j, replace_none_in_shape(i, -1))
-        for i, j in zip(expand_shapes, t_args)
+        tf.reshape(j if t is None else tf.transpose(j, t), r)
+        for t, r, j in zip(trans, reshapes, args)
     ]
-
     # product
     ret_1 = s_args.pop()
     while len(s_args) > 0:
         ret_1 = ret_1 * s_args.pop()
-
     # reduce_sum
-    ret = tf.reduce_sum(ret_1, axis=sum_idx_idx)
-    return ret
+    return tf.reduce_sum(ret_1, axis=sum_idx_idx)
+
+
+def tensor_einsum_reduce_sum(expr, *args, order):
+    """
+    "abe,bcf->acef"  =reshape=> "ab1e1,1bc1f->acef" =product=> "abcef->acef" =reduce_sum=> "acef"
+    """
+    step, _ = _reduce_sum_plan(expr, [i.shape for i in args], order)
+    if step is None:  # inner product
+        warnings.warn("inner product")
+        return tf.einsum(expr, *args)
+    return _run_reduce_sum_plan(step, args)
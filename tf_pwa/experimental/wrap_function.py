@@ -1,3 +1,8 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
 import numpy as np
 import tensorflow as tf
 
@@ -53,12 +58,170 @@ def _nest(dic, value, idx=None):
     return dic
 
 
+def _unique_variables(variables):
+    names, ret = [], []
+    ids = set()
+    for k, v in variables.items():
+        if id(v) not in ids:
+            ids.add(id(v))
+            names.append(k)
+            ret.append(v)
+    return names, ret
+
+
+def _pack_variables(variables):
+    return tf.concat([tf.reshape(i, (-1,)) for i in variables], axis=0)
+
+
+def _assign_variables(variables, params):
+    offset = 0
+    for i in variables:
+        size = int(np.prod(i.shape))
+        i.assign(tf.reshape(params[offset : offset + size], i.shape))
+        offset += size
+
+
+def graph_fingerprint(key, spec, variables_name):
+    """fingerprint of a traced graph, it include the user key (configuration),
+    input signature, variables and the version of TensorFlow"""
+    info = [
+        str(key),
+        repr(spec),
+        repr(list(variables_name)),
+        tf.__version__,
+    ]
+    return hashlib.sha256("\n".join(info).encode()).hexdigest()[:32]
+
+
+class GraphModule(tf.Module):
+    """Module for saving the traced function :code:`f(*x)` together with
+    it's VJP. All the variables are passed as one flat tensor :code:`params`,
+    so the loaded graph can be driven by the variables in current process.
+    """
+
+    def __init__(self, f, variables, spec, jit_compile=False):
+        super().__init__()
+        self.all_variables = list(variables)
+        n_params = sum(int(np.prod(i.shape)) for i in self.all_variables)
+        params_spec = tf.TensorSpec([n_params], self.all_variables[0].dtype)
+
+        def _forward(params, *x):
+            _assign_variables(self.all_variables, params)
+            return f(*x)
+
+        self.forward = tf.function(
+            _forward,
+            input_signature=[params_spec, *spec],
+            jit_compile=jit_compile,
+        )
+        y = self.forward.get_concrete_function().structured_outputs
+        dy_spec = tf.TensorSpec([None, *y.shape[1:]], y.dtype)
+
+        def _backward(params, dy, *x):
+            _assign_variables(self.all_variables, params)
+            with tf.GradientTape() as tape:
+                tape.watch(self.all_variables)
+                y = f(*x)
+            g = tape.gradient(
+                y,
+                self.all_variables,
+                output_gradients=dy,
+                unconnected_gradients="zero",
+            )
+            return _pack_variables(g)
+
+        self.backward = tf.function(
+            _backward, input_signature=[params_spec, dy_spec, *spec]
+        )
+        self.backward.get_concrete_function()
+
+
+def save_graph(module, path):
+    """save the module to path atomically, the path will not be overwrite
+    if it exists (created by other process)."""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(base_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=base_dir)
+    try:
+        tf.saved_model.save(module, tmp_dir)
+        os.rename(tmp_dir, path)
+    except OSError:
+        if not os.path.exists(os.path.join(path, "saved_model.pb")):
+            raise
+    finally:
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+
+
+def load_graph(path, variables):
+    """load the graph saved by :code:`save_graph`, the function returned is
+    evaluated with the values of `variables` and the gradients is propagated
+    to them."""
+    module = tf.saved_model.load(path)
+
+    def _call(*x):
+        params = _pack_variables(variables)
+
+        @tf.custom_gradient
+        def _f(params):
+            y = module.forward(params, *x)
+
+            def _grad(dy, variables=None):
+                g = module.backward(params, dy, *x)
+                if variables is None:
+                    return g
+                return g, [tf.zeros_like(i) for i in variables]
+
+            return y, _grad
+
+        return _f(params)
+
+    return _call
+
+
 class WrapFun:
-    def __init__(self, f, jit_compile=False):
+    """Wrap function `f` as concrete function for each structure of inputs.
+
+    If `cache_dir` is set, the traced graphs are saved in `cache_dir` and
+    loaded directly in the next process with the same `cache_key`. In this
+    case, `variables` (a function returning the dict of all tf.Variable used
+    by `f`, such as :code:`lambda: vm.variables`) is required.
+    """
+
+    def __init__(
+        self,
+        f,
+        jit_compile=False,
+        cache_dir=None,
+        cache_key="",
+        variables=None,
+    ):
         self.f = f
         self.cached_f = {}
         self.struct = {}
         self.jit_compile = jit_compile
+        self.cache_dir = cache_dir
+        self.cache_key = cache_key
+        self.variables = variables
+
+    def _get_graph(self, idx):
+        def _g(*x):
+            new_args, new_kwargs = _nest(self.struct[idx], x)
+            return self.f(*new_args, **new_kwargs)
+
+        spec = list(_flatten(self.struct[idx]))
+        if self.cache_dir is not None:
+            var_name, variables = _unique_variables(self.variables())
+            path = os.path.join(
+                self.cache_dir,
+                graph_fingerprint(self.cache_key, spec, var_name),
+            )
+            if not os.path.exists(os.path.join(path, "saved_model.pb")):
+                module = GraphModule(_g, variables, spec, self.jit_compile)
+                save_graph(module, path)
+            return load_graph(path, variables)
+        _g2 = tf.function(_g, jit_compile=self.jit_compile)
+        return _g2.get_concrete_function(*spec)
 
     def __call__(self, *args, **kwargs):
 
@@ -67,18 +230,7 @@ class WrapFun:
 
         if idx not in self.cached_f:
             self.struct[idx] = _wrap_struct((args, kwargs))
-
-            def _g(*x):
-                new_args, new_kwargs = _nest(self.struct[idx], x)
-                return self.f(
-                    *new_args, **new_kwargs
-                )  # *new_args, **new_kwargs)
-
-            _g2 = tf.function(_g, jit_compile=self.jit_compile)
-
-            self.cached_f[idx] = _g2.get_concrete_function(
-                *list(_flatten(self.struct[idx]))
-            )
+            self.cached_f[idx] = self._get_graph(idx)
         new_x = [
             tf.convert_to_tensor(i) if not isinstance(i, tf.Tensor) else i
             for i in new_x
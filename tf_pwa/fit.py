@@ -1,11 +1,12 @@
 import json
 import time
+import warnings
 
 import numpy as np
 import tensorflow as tf
 from scipy.optimize import BFGS, basinhopping, minimize
 
-from .fit_improve import Cached_FG
+from .fit_improve import Cached_FG, load_checkpoint, save_checkpoint
 from .fit_improve import minimize as my_minimize
 from .utils import time_print
 
@@ -14,6 +15,84 @@ class LargeNumberError(ValueError):
     pass
 
 
+class BFGSCheckpoint:
+    """
+    Checkpoint of :code:`scipy.optimize.minimize(method="BFGS")`. The
+    inverse Hessian of scipy is not accessible, it is rebuilt from the steps
+    and gradients in the callback with the same update formula, and is used
+    as :code:`hess_inv0` when resuming.
+
+    :param file_name: JSON file of the checkpoint.
+    :param f_g: Function returns the value and gradient.
+    :param interval: Iterations between checkpoints.
+    """
+
+    def __init__(self, file_name, f_g, interval=1):
+        self.file_name = file_name
+        self.f_g = f_g
+        self.interval = interval
+        self.nit = 0
+        self.x = None
+        self.grad = None
+        self.hess_inv = None
+        self.last = None
+
+    def __call__(self, x):
+        f, g = self.f_g(x)
+        self.last = (np.array(x), np.array(g), f)
+        if self.x is None:
+            self.x, self.grad, _ = self.last
+            self.hess_inv = np.eye(self.x.shape[0])
+        return f, g
+
+    def update(self, x):
+        """update the inverse Hessian in the callback of each iteration"""
+        if not np.array_equal(self.last[0], x):
+            self(x)
+        _, g, f = self.last
+        sk = x - self.x
+        yk = g - self.grad
+        rhok_inv = np.dot(yk, sk)
+        rhok = 1000.0 if rhok_inv == 0 else 1.0 / rhok_inv
+        eye = np.eye(sk.shape[0])
+        a1 = eye - sk[:, None] * yk[None, :] * rhok
+        a2 = eye - yk[:, None] * sk[None, :] * rhok
+        self.hess_inv = np.dot(a1, np.dot(self.hess_inv, a2)) + (
+            rhok * sk[:, None] * sk[None, :]
+        )
+        self.x, self.grad = np.array(x), g
+        self.nit += 1
+        if self.nit % self.interval == 0:
+            save_checkpoint(
+                self.file_name,
+                {
+                    "nit": self.nit,
+                    "x": self.x,
+                    "fun": float(f),
+                    "grad": self.grad,
+                    "hess_inv": self.hess_inv,
+                },
+            )
+
+    def load(self):
+        """load the checkpoint if it exists, return if it is loaded"""
+        state = load_checkpoint(self.file_name)
+        if state is None:
+            return False
+        self.nit = state["nit"]
+        self.x = np.array(state["x"])
+        self.grad = np.array(state["grad"])
+        hess_inv = np.array(state["hess_inv"])
+        # scipy requires exactly symmetric and positive definite hess_inv0
+        self.hess_inv = (hess_inv + hess_inv.T) / 2
+        if np.any(np.linalg.eigvalsh(self.hess_inv) <= 0):
+            self.hess_inv = np.eye(self.x.shape[0])
+        print(
+            "resume from {} at iteration {}".format(self.file_name, self.nit)
+        )
+        return True
+
+
 def fit_minuit(fcn, bounds_dict={}, hesse=True, minos=False, **kwargs):
     try:
         import iminuit
@@ -198,15 +277,25 @@ def fit_scipy(
     standard_complex=True,
     grad_scale=1.0,
     gtol=1e-3,
+    checkpoint=None,
+    checkpoint_interval=1,
+    resume=False,
 ):
     """
 
     :param fcn:
     :param method:
     :param bounds_dict:
+    :param checkpoint: JSON file for the state of "BFGS" and "test"
+        methods, written every **checkpoint_interval** iterations.
+    :param resume: Continue from the **checkpoint** if it exists. "test"
+        continues exactly, "BFGS" restarts from the parameters and inverse
+        Hessian.
     :param kwargs:
     :return:
     """
+    if checkpoint is not None and method not in ["BFGS", "test"]:
+        warnings.warn("checkpoint is not supported by {}".format(method))
     gtol *= grad_scale
     args_name = fcn.vm.trainable_vars
     x0 = []
@@ -289,7 +378,14 @@ def fit_scipy(
                     method=method,
                     jac=True,
                     callback=callback,
-                    options={"disp": 1, "gtol": gtol, "maxiter": maxiter},
+                    options={
+                        "disp": 1,
+                        "gtol": gtol,
+                        "maxiter": maxiter,
+                        "checkpoint": checkpoint,
+                        "checkpoint_interval": checkpoint_interval,
+                        "resume": resume,
+                    },
                 )
             except LargeNumberError:
                 return except_result(fcn, x0.shape[0])
@@ -305,6 +401,30 @@ def fit_scipy(
                 )
             except LargeNumberError:
                 return except_result(fcn, x0.shape[0])
+        elif checkpoint is not None and method == "BFGS":
+            ckpt = BFGSCheckpoint(checkpoint, f_g, checkpoint_interval)
+            options = {"disp": 1, "gtol": gtol, "maxiter": maxiter}
+            if resume and ckpt.load():
+                x0 = ckpt.x
+                options["hess_inv0"] = ckpt.hess_inv
+                options["maxiter"] = max(maxiter - ckpt.nit, 0)
+
+            def callback_ckpt(x):
+                callback(x)
+                ckpt.update(x)
+
+            try:
+                s = minimize(
+                    ckpt,
+                    x0,
+                    method=method,
+                    jac=True,
+                    callback=callback_ckpt,
+                    options=options,
+                )
+            except LargeNumberError:
+                return except_result(fcn, x0.shape[0])
+            s.nit = ckpt.nit
         else:
             try:
                 s = minimize(
@@ -396,6 +516,18 @@ def fit_scipy(
     elif method in ["root"]:
         m = fit_root_fitter(fcn)
         return m
+    elif method.startswith("staged"):
+        return fit_staged(
+            fcn,
+            method=method[7:] or "BFGS",
+            bounds_dict=bounds_dict,
+            maxiter=maxiter,
+            jac=jac,
+            callback=callback,
+            standard_complex=standard_complex,
+            grad_scale=grad_scale,
+            gtol=gtol / grad_scale,
+        )
     else:
         raise Exception("unknown method")
     if check_grad:
@@ -493,6 +625,92 @@ def fit_newton_cg(
     )
 
 
+def fit_staged(
+    fcn,
+    method="BFGS",
+    bounds_dict={},
+    n_init=10000,
+    growth=4.0,
+    theta=1.0,
+    stage_maxiter=100,
+    seed=None,
+    **kwargs,
+):
+    """
+    Fit with subsamples of increasing size before the full sample.
+
+    The stages use `FCN.subsample` with the fraction of
+    :math:`n_{init}/N_{data}` growing by the factor **growth**. In each
+    stage, the NLL of the subsample is minimized by BFGS until the gradient
+    is dominated by the noise of subsampling, that is
+    :math:`|g| < \\theta \\sigma_g` (norm test). :math:`\\sigma_g` is
+    estimated from the difference of the gradients of two independent
+    subsamples at the beginning of the stage. The last stage is the fit of
+    the full sample by `fit_scipy` with **method**.
+
+    The diagnostics of the stages are in :code:`extra["stages"]` of the
+    result.
+
+    :param fcn: FCN object with the method ``subsample``.
+    :param method: Method of the fit of full sample.
+    :param n_init: Number of data events in the first stage.
+    :param growth: Factor of the sample size between stages.
+    :param theta: Ratio of the gradient to its noise for stopping a stage.
+    :param stage_maxiter: Maximum iterations of each stage.
+    :param seed: Random seed of the subsamples.
+    :param kwargs: Other arguments for `fit_scipy`.
+    :return: FitResult object.
+    """
+    from tf_pwa.data import data_shape
+
+    rng = np.random.default_rng(seed)
+    fcns = getattr(fcn, "fcns", [fcn])
+    n_data = sum(data_shape(i.data) for i in fcns)
+    fraction = min(1.0, n_init / n_data)
+    stages = []
+    fcn.vm.set_bound(bounds_dict)
+    while fraction < 1.0:
+        now = time.time()
+        try:
+            sub = fcn.subsample(fraction, rng)
+            sub2 = fcn.subsample(fraction, rng)
+        except NotImplementedError as e:
+            print("skip subsample stages:", e)
+            break
+        f_g = fcn.vm.trans_fcn_grad(sub.nll_grad)
+        x0 = np.array(fcn.vm.get_all_val(True))
+        _, g1 = f_g(x0)
+        _, g2 = fcn.vm.trans_fcn_grad(sub2.nll_grad)(x0)
+        noise = np.max(np.abs(g1 - g2)) / np.sqrt(2)
+        s = minimize(
+            Cached_FG(f_g),
+            x0,
+            method="BFGS",
+            jac=True,
+            options={"gtol": theta * noise, "maxiter": stage_maxiter},
+        )
+        fcn.vm.set_trans_var(s.x)
+        stage = {
+            "fraction": fraction,
+            "n_data": sum(
+                data_shape(i.data) for i in getattr(sub, "fcns", [sub])
+            ),
+            "NLL": float(s.fun),
+            "grad": float(np.max(np.abs(s.jac))),
+            "noise": float(noise),
+            "nit": int(s.nit),
+            "time": time.time() - now,
+        }
+        print("stage:", json.dumps(stage), flush=True)
+        stages.append(stage)
+        fraction = min(1.0, fraction * growth)
+    fcn.vm.remove_bound()
+    ret = fit_scipy(fcn, method=method, bounds_dict=bounds_dict, **kwargs)
+    if isinstance(ret, FitResult):
+        ret.extra["stages"] = stages
+    return ret
+
+
 def except_result(fcn, ndf):
     params = fcn.vm.get_all_dic()
     return FitResult(
@@ -1,3 +1,5 @@
+import json
+import os
 from warnings import warn
 
 import numpy as np
@@ -89,6 +91,31 @@ class Seq:
             self._cached.pop(0)
 
 
+def save_checkpoint(file_name, state):
+    """
+    Write the state (dict of numbers and arrays) as JSON atomically, the
+    file is replaced only after the new one is written completely.
+    """
+    state = {
+        k: v.tolist() if isinstance(v, np.ndarray) else v
+        for k, v in state.items()
+    }
+    tmp_file = file_name + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, file_name)
+
+
+def load_checkpoint(file_name):
+    """read the state written by `save_checkpoint`, None if no file"""
+    if file_name is None or not os.path.exists(file_name):
+        return None
+    with open(file_name) as f:
+        return json.load(f)
+
+
 def fmin_bfgs_f(
     f_g,
     x0,
@@ -99,28 +126,70 @@ def fmin_bfgs_f(
     maxiter=None,
     callback=None,
     norm_ord=np.Inf,
+    checkpoint=None,
+    checkpoint_interval=1,
+    resume=False,
     **_kwargs
 ):
-    """test BFGS with nonmonote line search"""
-    fk, gk = f_g(x0)
-    if B0 is None:
-        Bk = np.eye(len(x0))
-    else:
-        Bk = B0
-    Hk = np.linalg.inv(Bk)
+    """
+    test BFGS with nonmonote line search
+
+    If **checkpoint** is set, the full state of the iterations is saved to
+    the file every **checkpoint_interval** iterations. With
+    :code:`resume=True`, the iterations continue from the checkpoint (if it
+    exists) as the same as without stopping.
+    """
     maxiter = 200 * len(x0) if maxiter is None else maxiter
-    xk = x0
     norm = lambda x: np.linalg.norm(x, ord=norm_ord)
     theta = 0.9
     C = 0.5
-    k = 0
-    old_old_fval = fk + np.linalg.norm(gk) / 2
-    old_fval = fk
     f_s = Seq(M)
-    f_s.add(fk)
+    state = load_checkpoint(checkpoint) if resume else None
+    if state is None:
+        fk, gk = f_g(x0)
+        if B0 is None:
+            Bk = np.eye(len(x0))
+        else:
+            Bk = B0
+        Hk = np.linalg.inv(Bk)
+        xk = x0
+        k_start = 0
+        old_old_fval = fk + np.linalg.norm(gk) / 2
+        old_fval = fk
+        f_s.add(fk)
+        re_search = 0
+    else:
+        xk, gk, Bk, Hk = [np.array(state[i]) for i in ["x", "grad", "B", "H"]]
+        fk = state["fun"]
+        old_fval = state["old_fval"]
+        old_old_fval = state["old_old_fval"]
+        f_s._cached = state["f_s"]
+        re_search = state["re_search"]
+        k_start = state["nit"]
+        f_g.ncall = state["ncall"]
+        print("resume from {} at iteration {}".format(checkpoint, k_start))
+
+    def save(k):
+        save_checkpoint(
+            checkpoint,
+            {
+                "nit": k,
+                "x": xk,
+                "fun": fk,
+                "grad": gk,
+                "B": Bk,
+                "H": Hk,
+                "old_fval": old_fval,
+                "old_old_fval": old_old_fval,
+                "f_s": f_s._cached,
+                "re_search": re_search,
+                "ncall": f_g.ncall,
+            },
+        )
+
+    k = k_start
     flag = 0
-    re_search = 0
-    for k in range(maxiter):
+    for k in range(k_start, maxiter):
         if norm(gk) <= gtol:
             break
         dki = -np.dot(Hk, gk)
@@ -195,6 +264,8 @@ def fmin_bfgs_f(
         f_s.add(fk)
         if callback is not None:
             callback(xk)
+        if checkpoint is not None and (k + 1) % checkpoint_interval == 0:
+            save(k + 1)
     else:
         flag = 2
     # print("fit final: ", k, p, f_g.ncall)
@@ -208,6 +279,7 @@ def fmin_bfgs_f(
     s.x = np.array(xk)
     s.jac = np.array(gk)
     s.hess = np.array(Bk)
+    s.hess_inv = np.array(Hk)
     s.success = flag == 0
     return s
 
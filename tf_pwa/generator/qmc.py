@@ -0,0 +1,166 @@
+"""
+Sources of uniform random numbers in :math:`[0, 1)^{d}` for the phase
+space generators, and the integration error from randomised replicas.
+
+The quasi-random sequences (scrambled Sobol) and the stratified samples
+(Latin hypercube) cover the unit cube more evenly than pseudo-random
+numbers, so the integration error of smooth functions decreases faster
+than :math:`1/\\sqrt{N}`. The error of them can only be estimated from
+independent randomised replicas, see `integral_replicas`.
+"""
+
+import warnings
+
+import numpy as np
+
+
+class UniformRandom:
+    """
+    Pseudo-random numbers from :code:`numpy.random.Generator`.
+
+    >>> rnd = UniformRandom(seed=1)
+    >>> rnd(5, 2).shape
+    (5, 2)
+
+    """
+
+    def __init__(self, seed=None):
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed = seed
+        self.rng = np.random.default_rng(self.seed)
+
+    def __call__(self, n, dim):
+        """random numbers with the shape (n, dim)"""
+        return self.rng.random((n, dim))
+
+    def spawn(self, n):
+        """n independent copies, such as the randomised replicas"""
+        return [type(self)(i) for i in self.seed.spawn(n)]
+
+
+class QMCRandom(UniformRandom):
+    """
+    Base class of the samples from :code:`scipy.stats.qmc`, one engine for
+    each dimension.
+    """
+
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self.engines = {}
+
+    def get_engine(self, dim):
+        raise NotImplementedError("get_engine")
+
+    def __call__(self, n, dim):
+        if dim not in self.engines:
+            self.engines[dim] = self.get_engine(dim)
+        with warnings.catch_warnings():
+            # balance properties of Sobol for n of not power of 2
+            warnings.simplefilter("ignore", UserWarning)
+            return self.engines[dim].random(n)
+
+
+class SobolRandom(QMCRandom):
+    """
+    Scrambled Sobol sequence. The sequence continues between calls with
+    the same **dim**. :math:`n` of power of 2 keeps the balance properties.
+
+    >>> rnd = SobolRandom(seed=1)
+    >>> x = rnd(1024, 2)
+    >>> count, *_ = np.histogram2d(x[:, 0], x[:, 1], bins=4, range=[(0, 1)] * 2)
+    >>> bool(np.all(count == 64))
+    True
+
+    """
+
+    def get_engine(self, dim):
+        from scipy.stats import qmc
+
+        return qmc.Sobol(d=dim, scramble=True, seed=self.rng)
+
+
+class StratifiedRandom(QMCRandom):
+    """
+    Stratified samples (Latin hypercube), each dimension of the :math:`n`
+    points has one point in each of the :math:`n` equal strata.
+
+    >>> rnd = StratifiedRandom(seed=1)
+    >>> x = rnd(100, 3)
+    >>> bool(np.all(np.sort(np.floor(x * 100), axis=0) == np.arange(100)[:, None]))
+    True
+
+    """
+
+    def get_engine(self, dim):
+        from scipy.stats import qmc
+
+        return qmc.LatinHypercube(d=dim, seed=self.rng)
+
+
+RANDOM_METHODS = {
+    "pseudo": UniformRandom,
+    "sobol": SobolRandom,
+    "stratified": StratifiedRandom,
+}
+
+
+def get_random(random, seed=None):
+    """
+    Source of random numbers from name ("pseudo", "sobol" or
+    "stratified"). None is kept for the default :code:`tf.random`.
+    """
+    if random is None or not isinstance(random, str):
+        return random
+    if random not in RANDOM_METHODS:
+        raise ValueError(
+            "unknown random method {}, available: {}".format(
+                random, list(RANDOM_METHODS)
+            )
+        )
+    return RANDOM_METHODS[random](seed)
+
+
+def integral_replicas(
+    f, gen, N, n_replica=10, random=None, seed=None, weighted=False
+):
+    """
+    Mean value of **f** in the phase space from **N** events of **gen**,
+    and its error. The events are split into **n_replica** replicas with
+    independent random numbers (independent scrambling for Sobol), the
+    error is the standard error of the means of the replicas.
+
+    The accept-reject of flat events breaks the smoothness of the
+    integrand, the weighted events (:code:`weighted=True`, for
+    `PhaseSpaceGenerator` only) benefit more from the quasi-random numbers.
+
+    >>> from tf_pwa.phasespace import PhaseSpaceGenerator
+    >>> gen = PhaseSpaceGenerator(3.0, [0.5, 0.5, 0.5])
+    >>> mean, error = integral_replicas(lambda p: p[0][:, 0], gen, 8192, random="sobol")
+    >>> bool(error < 1e-3)
+    True
+
+    :param f: Function of the output of :code:`gen.generate`.
+    :param gen: Generator with method :code:`set_random`.
+    :param random: Source of random numbers, default is the one of **gen**.
+    :param weighted: Use the weighted events of
+        :code:`gen.generate(n, flatten=False)`.
+    :return: mean, error
+    """
+    old_random = gen.random
+    if random is None:
+        random = "pseudo" if old_random is None else old_random
+    random = get_random(random, seed)
+    n = N // n_replica
+    values = []
+    try:
+        for replica in random.spawn(n_replica):
+            gen.set_random(replica)
+            if weighted:
+                w, p = gen.generate(n, flatten=False)
+                values.append(float(np.sum(w * f(p)) / np.sum(w)))
+            else:
+                values.append(float(np.mean(f(gen.generate(n)))))
+    finally:
+        gen.set_random(old_random)
+    return np.mean(values), np.std(values, ddof=1) / np.sqrt(n_replica)
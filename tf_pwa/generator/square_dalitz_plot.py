@@ -3,6 +3,7 @@ import tensorflow as tf
 
 from tf_pwa.angle import LorentzVector
 from tf_pwa.generator import BaseGenerator
+from tf_pwa.generator.qmc import get_random
 
 
 def square_dalitz_variables(p):
@@ -82,11 +83,14 @@ def square_dalitz_cut(p):
     return tf.where(prob < 1.0, prob, tf.ones_like(prob))
 
 
-def generate_SDP(m0, mi, N=1000, legacy=True):
+def generate_SDP(m0, mi, N=1000, legacy=True, random=None):
     """generate square dalitz plot ditribution for 1,2
 
     The legacy mode will include a cut off in the threshold.
 
+    **random** is the source of uniform random numbers, see
+    `tf_pwa.generator.qmc`.
+
     .. plot::
 
         >>> import matplotlib.pyplot as plt
@@ -113,17 +117,23 @@ def generate_SDP(m0, mi, N=1000, legacy=True):
         from tf_pwa.generator.generator import multi_sampling
         from tf_pwa.phasespace import PhaseSpaceGenerator
 
-        gen = PhaseSpaceGenerator(m0, mi)
+        gen = PhaseSpaceGenerator(m0, mi, random=random)
         ret, _ = multi_sampling(
             gen.generate, square_dalitz_cut, N=N, max_weight=1, display=False
         )
     else:
-        rnd = tf.random.uniform((N,), dtype="float64")
-        m12 = 0.5 * (tf.cos(np.pi * rnd) + 1) * (m0 - sum(mi)) + mi[0] + mi[1]
-        theta1 = tf.random.uniform((N,), dtype="float64") * np.pi
-        costheta0 = tf.random.uniform((N,), dtype="float64") * 2 - 1
-        phi0 = tf.random.uniform((N,), dtype="float64") * np.pi * 2
-        phi1 = tf.random.uniform((N,), dtype="float64") * np.pi * 2
+        random = get_random(random)
+        if random is None:
+            rnd = [tf.random.uniform((N,), dtype="float64") for i in range(5)]
+        else:
+            rnd = tf.unstack(tf.convert_to_tensor(random(N, 5)), axis=-1)
+        m12 = (
+            0.5 * (tf.cos(np.pi * rnd[0]) + 1) * (m0 - sum(mi)) + mi[0] + mi[1]
+        )
+        theta1 = rnd[1] * np.pi
+        costheta0 = rnd[2] * 2 - 1
+        phi0 = rnd[3] * np.pi * 2
+        phi1 = rnd[4] * np.pi * 2
 
         from tf_pwa.data_trans.helicity_angle import generate_p
 
@@ -138,10 +148,14 @@ def generate_SDP(m0, mi, N=1000, legacy=True):
 
 
 class SDPGenerator(BaseGenerator):
-    def __init__(self, m0, mi, legacy=True):
+    def __init__(self, m0, mi, legacy=True, random=None):
         self.m0 = m0
         self.mi = mi
         self.legacy = legacy
+        self.set_random(random)
+
+    def set_random(self, random):
+        self.random = get_random(random)
 
     def generate(self, N):
         """
@@ -151,4 +165,6 @@ class SDPGenerator(BaseGenerator):
         >>> p1, p2, p3 = gen.generate(100)
 
         """
-        return generate_SDP(self.m0, self.mi, N, legacy=self.legacy)
+        return generate_SDP(
+            self.m0, self.mi, N, legacy=self.legacy, random=self.random
+        )
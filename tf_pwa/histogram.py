@@ -1,7 +1,10 @@
-import matplotlib.pyplot as plt
 import numpy as np
 from scipy.interpolate import UnivariateSpline, interp1d
 
+from .utils import LazyModule
+
+plt = LazyModule("matplotlib.pyplot")
+
 
 def plot_hist(binning, count, ax=plt, **kwargs):
     n = count.shape[0]
@@ -0,0 +1,131 @@
+"""
+Batched linear solver for small matrices, such as the
+:math:`(I - iK\\rho)` in K matrix.
+
+For :math:`n \\le 5`, the solution is written with elementwise operations
+(closed form for :math:`n \\le 3`, unrolled Gaussian elimination without
+pivoting for :math:`n = 4, 5`), which is much faster than the batched
+:code:`tf.linalg.inv` for many events. Larger matrices use
+:code:`tf.linalg.solve`.
+"""
+
+from tf_pwa.tensorflow_wrapper import tf
+
+MAX_UNROLLED_SIZE = 5
+
+
+def small_solve(matrix, rhs, adjoint=False):
+    """
+    Solve :math:`A x = b` as :code:`tf.linalg.solve`.
+
+    >>> import numpy as np
+    >>> a = np.random.random((10, 3, 3)) + np.eye(3)
+    >>> b = np.random.random((10, 3, 2))
+    >>> x = small_solve(a, b)
+    >>> np.allclose(np.matmul(a, x), b)
+    True
+
+    :param matrix: tensor with shape :math:`(..., n, n)`
+    :param rhs: tensor with shape :math:`(..., n, k)`
+    :param adjoint: solve :math:`A^{\\dagger} x = b` instead
+    :return: tensor with shape :math:`(..., n, k)`
+    """
+    matrix = tf.convert_to_tensor(matrix)
+    rhs = tf.cast(rhs, matrix.dtype)
+    n = matrix.shape[-1]
+    if n is None or n > MAX_UNROLLED_SIZE:
+        return tf.linalg.solve(matrix, rhs, adjoint=adjoint)
+    batch = tf.broadcast_dynamic_shape(
+        tf.shape(matrix)[:-2], tf.shape(rhs)[:-2]
+    )
+    matrix = tf.broadcast_to(
+        matrix, tf.concat([batch, tf.shape(matrix)[-2:]], axis=0)
+    )
+    rhs = tf.broadcast_to(rhs, tf.concat([batch, tf.shape(rhs)[-2:]], axis=0))
+    return _small_solve(matrix, rhs, adjoint)
+
+
+def small_inv(matrix):
+    """
+    Inverse of matrix, the same as :code:`tf.linalg.inv`.
+
+    >>> import numpy as np
+    >>> a = np.random.random((10, 4, 4)) + np.eye(4)
+    >>> np.allclose(small_inv(a), np.linalg.inv(a))
+    True
+
+    """
+    matrix = tf.convert_to_tensor(matrix)
+    n = matrix.shape[-1]
+    if n is None or n > MAX_UNROLLED_SIZE:
+        return tf.linalg.inv(matrix)
+    return small_solve(matrix, tf.eye(n, dtype=matrix.dtype))
+
+
+def _small_solve(matrix, rhs, adjoint):
+    @tf.custom_gradient
+    def _solve(a, b):
+        x = _unrolled_solve(a, b, adjoint)
+
+        def grad(dx):
+            # the same as the gradient of tf.linalg.solve
+            db = _unrolled_solve(a, dx, not adjoint)
+            if adjoint:
+                da = -tf.matmul(x, db, adjoint_b=True)
+            else:
+                da = -tf.matmul(db, x, adjoint_b=True)
+            return da, db
+
+        return x, grad
+
+    return _solve(matrix, rhs)
+
+
+def _unrolled_solve(matrix, rhs, adjoint=False):
+    if adjoint:
+        matrix = tf.linalg.adjoint(matrix)
+    a = [
+        [tf.expand_dims(j, axis=-1) for j in tf.unstack(i, axis=-1)]
+        for i in tf.unstack(matrix, axis=-2)
+    ]
+    b = tf.unstack(rhs, axis=-2)
+    n = len(b)
+    if n == 1:
+        x = [b[0] / a[0][0]]
+    elif n == 2:
+        det = a[0][0] * a[1][1] - a[0][1] * a[1][0]
+        x = [
+            (a[1][1] * b[0] - a[0][1] * b[1]) / det,
+            (a[0][0] * b[1] - a[1][0] * b[0]) / det,
+        ]
+    elif n == 3:
+        # cofactor matrix, inv[i][j] = cof[j][i] / det
+        cof = [
+            [
+                a[(i + 1) % 3][(j + 1) % 3] * a[(i + 2) % 3][(j + 2) % 3]
+                - a[(i + 1) % 3][(j + 2) % 3] * a[(i + 2) % 3][(j + 1) % 3]
+                for j in range(3)
+            ]
+            for i in range(3)
+        ]
+        det = a[0][0] * cof[0][0] + a[0][1] * cof[0][1] + a[0][2] * cof[0][2]
+        x = [
+            (cof[0][i] * b[0] + cof[1][i] * b[1] + cof[2][i] * b[2]) / det
+            for i in range(3)
+        ]
+    else:
+        a = [list(i) for i in a]
+        b = list(b)
+        for k in range(n):
+            for i in range(k + 1, n):
+                f = a[i][k] / a[k][k]
+                for j in range(k + 1, n):
+                    a[i][j] = a[i][j] - f * a[k][j]
+                b[i] = b[i] - f * b[k]
+        x = [None] * n
+        for i in range(n - 1, -1, -1):
+            tmp = b[i]
+            for j in range(i + 1, n):
+                tmp = tmp - a[i][j] * x[j]
+            x[i] = tmp / a[i][i]
+    return tf.stack(x, axis=-2)
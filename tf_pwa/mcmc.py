@@ -0,0 +1,305 @@
+"""
+Affine invariant ensemble sampler (stretch move of Goodman & Weare) for the
+posterior distribution of the parameters.
+
+The walkers are split into two halves, the proposals of a whole half are
+made together and evaluated by one call of the vectorised log probability,
+such as `FCN.nll_many`.
+
+The chain is written to a memory mapped :code:`.npy` file, and the state
+of the sampler is saved as checkpoint, so a stopped run can be resumed by
+running the same sampler again.
+"""
+
+import json
+import os
+
+import numpy as np
+
+
+def autocorr_function(x):
+    """
+    Normalized autocorrelation function of the chain **x** (the first
+    axis), calculated by FFT.
+    """
+    x = np.asarray(x)
+    n = x.shape[0]
+    n_fft = 2 ** int(np.ceil(np.log2(2 * n)))
+    x = x - np.mean(x, axis=0)
+    f = np.fft.rfft(x, n=n_fft, axis=0)
+    acf = np.fft.irfft(f * np.conj(f), axis=0)[:n]
+    return acf / np.where(acf[0] == 0, 1, acf[0])
+
+
+def autocorr_time(chain, c=5):
+    """
+    Integrated autocorrelation time of each parameter, with the automatic
+    window :math:`M \\ge c \\tau(M)` of Sokal. The autocorrelation function
+    is averaged over the walkers.
+
+    >>> x = np.random.normal(size=(4000, 8, 1))
+    >>> bool(abs(autocorr_time(x)[0] - 1) < 0.2)
+    True
+
+    :param chain: Array with the shape (n_steps, n_walkers, n_dim)
+    :return: Array with the shape (n_dim,)
+    """
+    chain = np.asarray(chain)
+    acf = np.mean(autocorr_function(chain), axis=1)
+    taus = 2.0 * np.cumsum(acf, axis=0) - 1.0
+    ret = []
+    for tau in taus.T:
+        m = np.arange(tau.shape[0]) < c * tau
+        window = np.argmin(m) if not np.all(m) else tau.shape[0] - 1
+        ret.append(tau[window])
+    return np.array(ret)
+
+
+class EnsembleSampler:
+    """
+    Affine invariant ensemble sampler with stretch move.
+
+    >>> sampler = EnsembleSampler(lambda x: -np.sum(x**2, axis=-1) / 2, 16, 2, seed=1)
+    >>> chain = sampler.run(np.random.normal(size=(16, 2)), 1000, report=0)
+    >>> bool(np.all(np.abs(np.std(chain[200:], axis=(0, 1)) - 1) < 0.2))
+    True
+
+    :param log_prob: Function of the walkers with the shape (k, n_dim),
+        returns the log probability with the shape (k,).
+    :param n_walkers: Number of walkers, even number larger than n_dim.
+    :param n_dim: Number of parameters.
+    :param a: Scale parameter of the stretch move.
+    :param chain_file: Prefix of the output files. The chain is saved in
+        :code:`{chain_file}.npy` with the log probability in the last
+        column, and the checkpoint in :code:`{chain_file}_state.json`.
+        The chain is kept in memory if it is None.
+    :param checkpoint: Steps between checkpoints.
+    :param seed: Random seed.
+    """
+
+    def __init__(
+        self,
+        log_prob,
+        n_walkers,
+        n_dim,
+        a=2.0,
+        chain_file=None,
+        checkpoint=100,
+        seed=None,
+    ):
+        if n_walkers % 2 != 0 or n_walkers <= n_dim:
+            raise ValueError(
+                "n_walkers should be an even number larger than n_dim"
+            )
+        self.log_prob_fn = log_prob
+        self.n_walkers = n_walkers
+        self.n_dim = n_dim
+        self.a = a
+        self.chain_file = chain_file
+        self.checkpoint = checkpoint
+        self.rng = np.random.default_rng(seed)
+        self.step = 0
+        self.n_accepted = np.zeros(n_walkers)
+        self.x = None
+        self.log_p = None
+        self.samples = None
+
+    @property
+    def chain(self):
+        """chain with the shape (n_steps, n_walkers, n_dim)"""
+        return self.samples[: self.step, :, : self.n_dim]
+
+    @property
+    def log_prob(self):
+        """log probability with the shape (n_steps, n_walkers)"""
+        return self.samples[: self.step, :, self.n_dim]
+
+    @property
+    def acceptance_fraction(self):
+        return self.n_accepted / max(self.step, 1)
+
+    def get_autocorr_time(self, discard=0, c=5):
+        return autocorr_time(self.chain[discard:], c=c)
+
+    def get_ess(self, discard=0, c=5):
+        """effective sample size of each parameter"""
+        n = (self.step - discard) * self.n_walkers
+        return n / self.get_autocorr_time(discard, c=c)
+
+    def _state_file(self):
+        return self.chain_file + "_state.json"
+
+    def _open_samples(self, n_steps):
+        shape = (n_steps, self.n_walkers, self.n_dim + 1)
+        if self.chain_file is None:
+            samples = np.zeros(shape)
+            if self.samples is not None:
+                samples[: self.step] = self.samples[: self.step]
+            self.samples = samples
+            return
+        file_name = self.chain_file + ".npy"
+        if self.step > 0 and os.path.exists(file_name):
+            old = np.lib.format.open_memmap(file_name, mode="r+")
+            if old.shape[0] >= n_steps:
+                self.samples = old
+                return
+            old = np.array(old[: self.step])
+            del self.samples
+        else:
+            old = None
+        self.samples = np.lib.format.open_memmap(
+            file_name, mode="w+", dtype=np.float64, shape=shape
+        )
+        if old is not None:
+            self.samples[: self.step] = old
+
+    def save_state(self):
+        """write the checkpoint, the chain is flushed before"""
+        if self.chain_file is None:
+            return
+        self.samples.flush()
+        state = {
+            "step": self.step,
+            "x": self.x.tolist(),
+            "log_p": self.log_p.tolist(),
+            "n_accepted": self.n_accepted.tolist(),
+            "rng": self.rng.bit_generator.state,
+        }
+        tmp_file = self._state_file() + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_file, self._state_file())
+
+    def load_state(self):
+        """read the checkpoint if it exists, return if it is loaded"""
+        if self.chain_file is None or not os.path.exists(self._state_file()):
+            return False
+        with open(self._state_file()) as f:
+            state = json.load(f)
+        self.step = state["step"]
+        self.x = np.array(state["x"])
+        self.log_p = np.array(state["log_p"])
+        self.n_accepted = np.array(state["n_accepted"])
+        self.rng.bit_generator.state = state["rng"]
+        return True
+
+    def stretch_move(self):
+        """update the two halves of the walkers in turn"""
+        half = self.n_walkers // 2
+        first, second = slice(None, half), slice(half, None)
+        for s, c in [(first, second), (second, first)]:
+            x_s, x_c = self.x[s], self.x[c]
+            n = x_s.shape[0]
+            z = ((self.a - 1) * self.rng.random(n) + 1) ** 2 / self.a
+            x_j = x_c[self.rng.integers(0, x_c.shape[0], n)]
+            y = x_j + z[:, None] * (x_s - x_j)
+            log_p_y = np.asarray(self.log_prob_fn(y))
+            log_r = (self.n_dim - 1) * np.log(z) + log_p_y - self.log_p[s]
+            accept = np.log(self.rng.random(n)) < log_r
+            self.x[s] = np.where(accept[:, None], y, x_s)
+            self.log_p[s] = np.where(accept, log_p_y, self.log_p[s])
+            self.n_accepted[s] += accept
+
+    def run(self, x0, n_steps, report=100, discard=0):
+        """
+        Run the sampler until **n_steps** steps in total. If there is a
+        checkpoint in **chain_file**, it resumes from the checkpoint and
+        **x0** is not used.
+
+        :param x0: Initial walkers with the shape (n_walkers, n_dim).
+        :param n_steps: Total number of steps.
+        :param report: Steps between printing the acceptance fraction,
+            autocorrelation time and ESS, 0 for no report.
+        :param discard: Steps discarded in the report.
+        :return: The chain with the shape (n_steps, n_walkers, n_dim).
+        """
+        if self.x is None and not self.load_state():
+            self.x = np.array(x0, dtype=np.float64)
+            assert self.x.shape == (self.n_walkers, self.n_dim)
+            self.log_p = np.asarray(self.log_prob_fn(self.x), np.float64)
+            if not np.all(np.isfinite(self.log_p)):
+                raise ValueError("log_prob of initial walkers is not finite")
+        self._open_samples(n_steps)
+        while self.step < n_steps:
+            self.stretch_move()
+            self.samples[self.step, :, : self.n_dim] = self.x
+            self.samples[self.step, :, self.n_dim] = self.log_p
+            self.step += 1
+            if self.step % self.checkpoint == 0:
+                self.save_state()
+            if report and self.step % report == 0:
+                self.print_report(discard)
+        self.save_state()
+        return self.chain
+
+    def print_report(self, discard=0):
+        tau = self.get_autocorr_time(min(discard, self.step - 1))
+        ess = (self.step - discard) * self.n_walkers / tau
+        print(
+            "step: {}, acceptance fraction: {:.3f}, max tau: {:.1f}, "
+            "min ESS: {:.1f}".format(
+                self.step,
+                np.mean(self.acceptance_fraction),
+                np.max(tau),
+                np.min(ess),
+            )
+        )
+
+
+def fcn_log_prob(fcn):
+    """
+    Log probability :math:`-NLL` of the trainable parameters of **fcn**,
+    with flat prior inside the bounds of the variables. All the walkers
+    are evaluated by one call of `FCN.nll_many`.
+    """
+    vm = fcn.vm
+    lower = np.full(len(vm.trainable_vars), -np.inf)
+    upper = np.full(len(vm.trainable_vars), np.inf)
+    for i, name in enumerate(vm.trainable_vars):
+        if name in vm.bnd_dic:
+            a, b = vm.bnd_dic[name]
+            lower[i] = -np.inf if a is None else a
+            upper[i] = np.inf if b is None else b
+
+    def log_prob(x):
+        x = np.asarray(x)
+        ret = np.full(x.shape[0], -np.inf)
+        inside = np.all((x >= lower) & (x <= upper), axis=-1)
+        if np.any(inside):
+            ret[inside] = -fcn.nll_many(x[inside])
+        return np.where(np.isnan(ret), -np.inf, ret)
+
+    return log_prob
+
+
+def sample_fcn(
+    fcn, n_steps, n_walkers=None, x0=None, scale=1e-3, seed=None, **kwargs
+):
+    """
+    Sample the posterior distribution of the parameters of **fcn**.
+
+    :param fcn: `FCN` object.
+    :param n_steps: Total number of steps.
+    :param n_walkers: Number of walkers, default is
+        :math:`2 \\times (n_{dim} + 1)`.
+    :param x0: Center of the initial walkers, default is the current values.
+    :param scale: Width of the initial gaussian ball, the same shape as x0.
+    :param kwargs: Arguments for `EnsembleSampler` and `EnsembleSampler.run`.
+    :return: `EnsembleSampler` object.
+    """
+    n_dim = len(fcn.vm.trainable_vars)
+    if n_walkers is None:
+        n_walkers = 2 * (n_dim + 1)
+    if x0 is None:
+        x0 = fcn.vm.get_all_val()
+    run_kwargs = {
+        k: kwargs.pop(k) for k in ["report", "discard"] if k in kwargs
+    }
+    params = fcn.vm.get_all_dic()
+    log_prob = fcn_log_prob(fcn)
+    sampler = EnsembleSampler(log_prob, n_walkers, n_dim, seed=seed, **kwargs)
+    rng = np.random.default_rng(seed)
+    x0 = np.array(x0) + scale * rng.normal(size=(n_walkers, n_dim))
+    sampler.run(x0, n_steps, **run_kwargs)
+    fcn.vm.set_all(params)
+    return sampler
@@ -2,13 +2,14 @@
 This module provides methods to calculate NLL(Negative Log-Likelihood) as well as its derivatives.
 """
 
+import copy
 import math
 import warnings
 from itertools import repeat as _loop_generator
 
 import numpy as np
 
-from ..config import create_config, get_config
+from ..config import create_config, get_config, regist_config
 from ..data import (
     EvalLazy,
     data_merge,
@@ -37,6 +38,9 @@ def _resolution_shape(x):
 
 set_nll_model, get_nll_model, register_nll_model = create_config()
 
+COMBINE_FCN_WORKERS = "combine_fcn_workers"
+regist_config(COMBINE_FCN_WORKERS, 1)
+
 
 def _batch_sum(f, data_i, weight_i, trans, resolution_size, args, kwargs):
     weight_shape = (-1, min(_resolution_shape(weight_i), resolution_size))
@@ -338,6 +342,27 @@ class BaseModel(object):
             tf.reduce_sum(weight * ln_data) - sw * self.int_f(int_mc)
         )
 
+    def nll_many(self, data, mcdata, xs):
+        """Negative log-Likelihood for many sets of parameters **xs**"""
+        weight = data.get("weight", tf.ones((data_shape(data),)))
+        sw = tf.reduce_sum(weight)
+        rw = tf.reshape(weight, (-1, self.resolution_size))
+        amp_s2 = self.Amp.pdf_many(data, xs) * weight
+        amp_s2 = tf.reduce_sum(
+            tf.reshape(amp_s2, (len(xs), -1, self.resolution_size)), axis=-1
+        )
+        weight = tf.reduce_sum(rw, axis=-1)
+        dom_weight = tf.where(weight == 0, 1.0, weight)
+        ln_data = clip_log(amp_s2 / dom_weight)
+        mc_weight = mcdata.get("weight", tf.ones((data_shape(mcdata),)))
+        int_mc = tf.reduce_sum(
+            mc_weight * self.Amp.pdf_many(mcdata, xs), axis=-1
+        ) / tf.reduce_sum(mc_weight)
+        alpha = sw / tf.reduce_sum(weight**2)
+        return -alpha * (
+            tf.reduce_sum(weight * ln_data, axis=-1) - sw * self.int_f(int_mc)
+        )
+
     def sum_nll_grad_bacth(self, data):
         weight = [i.get("weight", tf.ones((data_shape(i),))) for i in data]
         ln_data, g_ln_data = sum_gradient(
@@ -684,6 +709,24 @@ class Model(object):
             {**data, "weight": weight}, {**mcdata, "weight": mc_weight}
         )
 
+    def nll_many(self, data, mcdata, xs, weight=1.0, bg=None, mc_weight=1.0):
+        """
+        Calculate NLL for many sets of trainable parameters at once. The
+        parameters are the same with ``self.nll()``, except **xs**.
+
+        :param xs: Array with the shape :math:`(K, n_{par})`, values of the
+            trainable variables.
+        :return: Tensor with the shape :math:`(K,)`.
+        """
+        data, weight = self.get_weight_data(data, weight, bg=bg)
+        if isinstance(mc_weight, float):
+            mc_weight = tf.convert_to_tensor(
+                [mc_weight] * data_shape(mcdata), dtype="float64"
+            )
+        return self.model.nll_many(
+            {**data, "weight": weight}, {**mcdata, "weight": mc_weight}, xs
+        )
+
     def nll_grad(
         self, data, mcdata, weight=1.0, batch=65000, bg=None, mc_weight=1.0
     ):
@@ -1222,6 +1265,82 @@ class FCN(object):
         )
         return self.cached_nll
 
+    def nll_many(self, X):
+        """
+        NLL (the same as ``self(x)``) for many sets of parameters with the
+        same data. The amplitudes of all the sets are calculated together,
+        only the parameters dependent parts are repeated for each set.
+        The parameters are restored after calculation.
+
+        :param X: 2-D Array with the shape :math:`(K, n_{par})`. Values of
+            variables.
+        :return: Array with the shape :math:`(K,)`.
+        """
+        X = np.reshape(X, (-1, len(self.vm.trainable_vars)))
+        params = self.vm.get_all_dic()
+        if (
+            type(self.model).nll is not Model.nll
+            or self.vm.strategy is not None
+        ):
+            # only the default nll has the batched version
+            ret = [self(x) for x in X]
+        else:
+            nll = self.model.nll_many(
+                self.data,
+                self.mcdata,
+                X,
+                weight=self.weight,
+                mc_weight=self.mc_weight,
+            )
+            ret = []
+            for x, nll_i in zip(X, nll):
+                self.vm.set_all(x)
+                ret.append(nll_i + self.gauss_constr.get_constrain_term())
+            self.n_call += len(X)
+        self.vm.set_all(params)
+        return np.array([float(i) for i in ret])
+
+    def subsample(self, fraction, seed=None):
+        """
+        FCN of a random subsample of data and MC, each event is kept with
+        the probability **fraction**. The data weights are scaled by the
+        inverse of the kept fraction, so the NLL and gradients from
+        ``nll_grad`` are estimates of the ones of the full sample.
+
+        :param fraction: Real number in :math:`(0, 1]`.
+        :param seed: Random seed or :code:`numpy.random.Generator`.
+        :return: FCN object sharing the model with this one.
+        """
+        from tf_pwa.data import LazyCall, data_mask
+
+        if isinstance(self.data, LazyCall) or isinstance(
+            self.mcdata, LazyCall
+        ):
+            raise NotImplementedError("subsample of LazyCall data")
+        rng = np.random.default_rng(seed)
+        resolution_size = getattr(self.model, "resolution_size", 1)
+
+        def _mask(n, size=1):
+            mask = rng.random(n // size) < fraction
+            if not np.any(mask):
+                mask[rng.integers(0, n // size)] = True
+            return np.repeat(mask, size), mask.shape[0] / np.sum(mask)
+
+        ret = copy.copy(self)
+        mask, scale = _mask(data_shape(self.data), resolution_size)
+        ret.data = data_mask(self.data, mask)
+        ret.weight = tf.boolean_mask(self.weight, mask) * scale
+        mask, _ = _mask(data_shape(self.mcdata))
+        ret.mcdata = data_mask(self.mcdata, mask)
+        mc_weight = tf.boolean_mask(self.mc_weight, mask)
+        ret.mc_weight = mc_weight / tf.reduce_sum(mc_weight)
+        ret.batch_data = ret._convert_batch(ret.data, self.batch)
+        ret.batch_mcdata = ret._convert_batch(ret.mcdata, self.batch)
+        ret.batch_weight = ret._convert_batch(ret.weight, self.batch)
+        ret.batch_mc_weight = ret._convert_batch(ret.mc_weight, self.batch)
+        ret.cached_mc = {}
+        return ret
+
     def get_grad(self, x={}):
         """
         :param x: List. Values of variables.
@@ -1314,6 +1433,14 @@ class FCN(object):
         return grad, hessp
 
 
+def _fcn_size(fcn):
+    """number of events as the cost of FCN"""
+    try:
+        return data_shape(fcn.data) + data_shape(fcn.mcdata)
+    except Exception:
+        return 0
+
+
 class CombineFCN(object):
     """
     This class implements methods to calculate the NLL as well as its derivatives for a general function.
@@ -1323,6 +1450,8 @@ class CombineFCN(object):
     :param mcdata: list of MCdata array.
     :param bg: list of Background array.
     :param batch: The length of array to calculate as a vector at a time. How to fold the data array may depend on the GPU computability.
+    :param n_workers: Number of threads to evaluate the FCNs concurrently,
+        default is the config ``"combine_fcn_workers"`` (1, serial).
     """
 
     def __init__(
@@ -1334,7 +1463,10 @@ class CombineFCN(object):
         fcns=None,
         batch=65000,
         gauss_constr={},
+        n_workers=None,
     ):
+        self.n_workers = n_workers
+        self._executor = None
         if fcns is None:
             assert model is not None, "model required"
             assert data is not None, "data required"
@@ -1355,14 +1487,36 @@ class CombineFCN(object):
     def get_params(self, trainable_only=False):
         return self.vm.get_all_dic(trainable_only)
 
+    def _map_fcns(self, f, x={}):
+        """
+        :code:`[f(i, x) for i in self.fcns]`. For more than one worker, the
+        FCNs are evaluated concurrently in a thread pool (TensorFlow
+        releases the GIL in the kernels). The parameters are set once
+        before, and the FCNs with more events are submitted first, so the
+        wall time is close to the one of the largest FCN.
+        """
+        n_workers = self.n_workers
+        if n_workers is None:
+            n_workers = get_config(COMBINE_FCN_WORKERS)
+        if n_workers <= 1 or len(self.fcns) <= 1:
+            return [f(i, x) for i in self.fcns]
+        if self._executor is None or self._executor[0] != n_workers:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = (n_workers, ThreadPoolExecutor(n_workers))
+        self.vm.set_all(x)
+        sizes = [_fcn_size(i) for i in self.fcns]
+        futures = [None] * len(self.fcns)
+        for idx in np.argsort(sizes)[::-1]:
+            futures[idx] = self._executor[1].submit(f, self.fcns[idx], {})
+        return [i.result() for i in futures]
+
     def get_nll(self, x={}):
         """
         :param x: List. Values of variables.
         :return nll: Real number. The value of NLL.
         """
-        nlls = []
-        for i in self.fcns:
-            nlls.append(i.get_nll(x))
+        nlls = self._map_fcns(lambda fcn, x: fcn.get_nll(x), x)
         return sum(nlls)
 
     def __call__(self, x={}):
@@ -1371,15 +1525,22 @@ class CombineFCN(object):
         )
         return self.cached_nll
 
+    def subsample(self, fraction, seed=None):
+        """
+        CombineFCN of the random subsamples of all the FCNs, see
+        `FCN.subsample`.
+        """
+        rng = np.random.default_rng(seed)
+        ret = copy.copy(self)
+        ret.fcns = [i.subsample(fraction, rng) for i in self.fcns]
+        return ret
+
     def get_grad(self, x={}):
         """
         :param x: List. Values of variables.
         :return gradients: List of real numbers. The gradients for each variable.
         """
-        gs = []
-        for i in self.fcns:
-            g = i.get_grad(x)
-            gs.append(g)
+        gs = self._map_fcns(lambda fcn, x: fcn.get_grad(x), x)
         return sum(gs)
 
     def grad(self, x={}):
@@ -1393,8 +1554,7 @@ class CombineFCN(object):
         """
         nlls = []
         gs = []
-        for i in self.fcns:
-            nll, g = i.get_nll_grad(x)
+        for nll, g in self._map_fcns(lambda fcn, x: fcn.get_nll_grad(x), x):
             nlls.append(nll)
             gs.append(g)
         return sum(nlls), tf.reduce_sum(gs, axis=0)
@@ -1417,8 +1577,9 @@ class CombineFCN(object):
         nlls = []
         gs = []
         hs = []
-        for i in self.fcns:
-            nll, g, h = i.get_nll_grad_hessian(x)
+        for nll, g, h in self._map_fcns(
+            lambda fcn, x: fcn.get_nll_grad_hessian(x), x
+        ):
             nlls.append(nll)
             gs.append(g)
             hs.append(h)
@@ -1445,8 +1606,9 @@ class CombineFCN(object):
         """
         hs = []
         gs = []
-        for i in self.fcns:
-            g, h = i.get_grad_hessp(x, p, batch)
+        for g, h in self._map_fcns(
+            lambda fcn, x: fcn.get_grad_hessp(x, p, batch), x
+        ):
             hs.append(h)
             gs.append(g)
         return tf.reduce_sum(gs, axis=0), tf.reduce_sum(hs, axis=0)
@@ -1458,7 +1620,6 @@ class CombineFCN(object):
 
 
 class MixLogLikehoodFCN(CombineFCN):
-
     """
     This class implements methods to calculate the NLL as well as its derivatives for a general function.
 
@@ -1479,6 +1640,8 @@ class MixLogLikehoodFCN(CombineFCN):
         gauss_constr={},
     ):
         self.cached_nll = 0.0
+        self.n_workers = None
+        self._executor = None
         assert model is not None, "model required"
         assert data is not None, "data required"
         assert mcdata is not None, "mcdata required"
@@ -1505,6 +1668,9 @@ class MixLogLikehoodFCN(CombineFCN):
         self.vm = self.model[0].vm
         self.gauss_constr = GaussianConstr(self.vm, gauss_constr)
 
+    def subsample(self, fraction, seed=None):
+        raise NotImplementedError("subsample of mix likelihood")
+
     def get_nll_grad(self, x={}):
         """
         :param x: List. Values of variables.
@@ -33,65 +33,108 @@ class ParamsTrans:
             del self.tape
         return grad
 
-    def get_error(self, vals, keep=False):
-        if isinstance(vals, (list, tuple)):
-            ret = type(vals)([self.get_error(v, keep=True) for v in vals])
-        elif isinstance(vals, dict):
-            ret = {k: self.get_error(v, keep=True) for k, v in vals.items()}
-        elif isinstance(vals, tf.Tensor):
-            if len(vals.shape) == 0:  # scalar
-                grad = self.tape.gradient(
-                    vals,
-                    self.vm.trainable_variables,
-                    unconnected_gradients="zero",
-                )
-                grad = tf.stack(grad, axis=-1)
-                ret = tf.sqrt(
-                    tf.reduce_sum(
-                        tf.linalg.matvec(self.err_matrix, grad) * grad
-                    )
-                )
-            else:  # vector
-                grad = self.tape.jacobian(
-                    vals,
-                    self.vm.trainable_variables,
-                    unconnected_gradients="zero",
-                )
-                grad = tf.stack(grad, axis=-1)
-                grad = tf.reshape(grad, (-1, len(self.vm.trainable_variables)))
-                new_err_matrix = tf.matmul(
-                    tf.matmul(grad, self.err_matrix), grad, transpose_b=True
-                )
-                ret = tf.sqrt(tf.linalg.tensor_diag_part(new_err_matrix))
-                ret = tf.reshape(ret, vals.shape)
-        else:
-            raise TypeError(
-                f"unsuported type {type(vals)}, use tensor instead"
-            )
+    def get_jacobian(self, vals, keep=False):
+        """
+        Jacobian of all the values in **vals** (tensor, or list, tuple and
+        dict of them), with the shape :math:`(n_{vals}, n_{params})`. The
+        values are flattened to one vector, and its Jacobian is calculated
+        by one vectorized pass.
+        """
+        with self.tape:
+            flat = _flatten_vals(vals)
+        jac = self.tape.jacobian(
+            flat, self.vm.trainable_variables, unconnected_gradients="zero"
+        )
         if not keep:
             del self.tape
-        return ret
+        return tf.stack(jac, axis=-1)
+
+    def get_error(self, vals, keep=False):
+        jac = self.get_jacobian(vals, keep=keep)
+        err = tf.reduce_sum(tf.matmul(jac, self.err_matrix) * jac, axis=-1)
+        return _pack_vals(vals, tf.sqrt(err))
 
     def get_error_matrix(self, vals, keep=False):
-        if isinstance(vals, (list, tuple)):
-            grad = [
-                self.tape.gradient(
-                    i,
-                    self.vm.trainable_variables,
-                    unconnected_gradients="zero",
-                )
-                for i in vals
-            ]
-        elif isinstance(vals, tf.Tensor):
-            grad = self.tape.jacobian(
-                vals, self.vm.trainable_variables, unconnected_gradients="zero"
-            )
-        if not keep:
-            del self.tape
-        # print(grad)
-        grad = np.stack(grad).reshape((-1, len(self.vm.trainable_variables)))
-        # print(grad, self.err_matrix, np.dot(grad, self.err_matrix), grad.T)
+        grad = self.get_jacobian(vals, keep=keep).numpy()
         return np.dot(np.dot(grad, self.err_matrix), grad.T)
 
+    def propagate_error(self, f, method="reverse", n_sample=1000, seed=None):
+        """
+        Errors of the values returned by **f** (tensor, or list, tuple and
+        dict of them), without tape in the context.
+
+        :param method: How to calculate the error.
+
+            * "reverse": the Jacobian by one vectorized pass of the reverse
+              mode, one call of **f**.
+            * "forward": the Jacobian by forward mode, one call of **f** for
+              each parameter. It is faster for more values than parameters.
+            * "sample": the covariance of values from **n_sample** calls of
+              **f** with the parameters sampled from the error matrix, for
+              nonlinear **f**.
+
+        :return: errors in the same structure as the values, and the error
+            matrix of flattened values.
+        """
+        var = self.vm.trainable_variables
+        if method == "reverse":
+            with tf.GradientTape() as tape:
+                vals = f()
+                flat = _flatten_vals(vals)
+            jac = tape.jacobian(flat, var, unconnected_gradients="zero")
+            jac = tf.stack(jac, axis=-1).numpy()
+            err_matrix = np.dot(np.dot(jac, self.err_matrix), jac.T)
+        elif method == "forward":
+            from tensorflow.python.eager import forwardprop
+
+            jac = []
+            for i in range(len(var)):
+                tangents = [tf.zeros_like(j) for j in var]
+                tangents[i] = tf.ones_like(var[i])
+                with forwardprop.ForwardAccumulator(var, tangents) as acc:
+                    vals = f()
+                jvp = acc.jvp(vals, unconnected_gradients="zero")
+                jac.append(_flatten_vals(jvp))
+            jac = tf.stack(jac, axis=-1).numpy()
+            err_matrix = np.dot(np.dot(jac, self.err_matrix), jac.T)
+        elif method == "sample":
+            rng = np.random.default_rng(seed)
+            params = self.vm.get_all_dic()
+            x0 = np.array(self.vm.get_all_val())
+            X = rng.multivariate_normal(x0, self.err_matrix, size=n_sample)
+            samples = []
+            try:
+                for x in X:
+                    self.vm.set_all(x)
+                    vals = f()
+                    samples.append(_flatten_vals(vals).numpy())
+            finally:
+                self.vm.set_all(params)
+            err_matrix = np.atleast_2d(np.cov(np.stack(samples), rowvar=False))
+        else:
+            raise ValueError(f"unknown method {method}")
+        err = np.sqrt(np.diag(err_matrix))
+        return _pack_vals(vals, tf.constant(err)), err_matrix
+
     def __getitem__(self, key):
         return self.vm.variables[key]
+
+
+def _flatten_vals(vals):
+    """concatenate all the tensors in **vals** as one vector"""
+    flat = tf.nest.flatten(vals)
+    for i in flat:
+        if not isinstance(i, (tf.Tensor, tf.Variable)):
+            raise TypeError(f"unsuported type {type(i)}, use tensor instead")
+    return tf.concat([tf.reshape(i, (-1,)) for i in flat], axis=0)
+
+
+def _pack_vals(vals, flat):
+    """split **flat** into the same structure as **vals**"""
+    ret = []
+    n = 0
+    for i in tf.nest.flatten(vals):
+        size = int(np.prod(i.shape))
+        ret.append(tf.reshape(flat[n : n + size], i.shape))
+        n += size
+    return tf.nest.pack_sequence_as(vals, ret)
@@ -4,6 +4,7 @@ import numpy as np
 import tensorflow as tf
 
 from .angle import LorentzVector
+from .generator.qmc import get_random
 
 
 def get_p(M, ma, mb):
@@ -29,14 +30,37 @@ class UniformGenerator:
 
 
 class PhaseSpaceGenerator(object):
-    """Phase Space Generator for n-body decay"""
+    """Phase Space Generator for n-body decay
 
-    def __init__(self, m0, mass):
+    :param random: Source of the uniform random numbers, "sobol",
+        "stratified" or object in `tf_pwa.generator.qmc`. None for the
+        default :code:`tf.random.uniform`.
+    """
+
+    def __init__(self, m0, mass, random=None):
         self.m_mass = []
         self.set_decay(m0, mass)
         self.sum_mass = sum(self.m_mass)
         self.mass_range = self.get_mass_range()
         self.mass_generator = [None for i in self.mass_range]
+        self.set_random(random)
+
+    def set_random(self, random):
+        self.random = get_random(random)
+
+    def get_random(self, n_iter, flatten=True):
+        """
+        uniform random numbers from `self.random` for the masses, the
+        angles and the accept-reject, None for the default.
+        """
+        if self.random is None:
+            return None, None, None
+        n_mass = self.m_nt - 2
+        n_angle = 2 * (self.m_nt - 1)
+        rnd = self.random(n_iter, n_mass + n_angle + int(flatten))
+        rnd = [tf.convert_to_tensor(i, tf.float64) for i in rnd.T]
+        accept = rnd[-1] if flatten else None
+        return rnd[:n_mass], rnd[n_mass : n_mass + n_angle], accept
 
     def get_mass_range(self):
         sm = self.sum_mass - self.m_mass[-1] - self.m_mass[-2]
@@ -53,7 +77,7 @@ class PhaseSpaceGenerator(object):
             # ret.append(ms)
         return ret
 
-    def generate_mass(self, n_iter):
+    def generate_mass(self, n_iter, rnd=None):
         """generate possible inner mass."""
         sm = self.sum_mass - self.m_mass[-1] - self.m_mass[-2]
         m_n = self.m_mass[-1]
@@ -62,7 +86,10 @@ class PhaseSpaceGenerator(object):
             b = self.m0 - sm
             a = m_n + self.m_mass[-i - 2]
             if self.mass_generator[i] is None:
-                random = tf.random.uniform([n_iter], dtype="float64")
+                if rnd is None:
+                    random = tf.random.uniform([n_iter], dtype="float64")
+                else:
+                    random = rnd[i]
                 ms = (b - a) * random + a
             else:
                 ms = self.mass_generator[i].generate(n_iter)
@@ -104,15 +131,21 @@ class PhaseSpaceGenerator(object):
         n_gen = 0
         n_total = n_iter
 
-        mass = self.generate_mass(n_iter)
+        rnd_m, rnd_a, rnd_w = self.get_random(
+            n_iter, flatten and self.m_nt != 2
+        )
+        mass = self.generate_mass(n_iter, rnd_m)
         if not flatten or self.m_nt == 2:
-            pi = self.generate_momentum(mass, n_iter)
+            pi = self.generate_momentum(mass, n_iter, rnd_a)
             if flatten:
                 return pi
             weight = self.get_weight(mass, importances=importances)
             return weight, pi
 
-        mass_f = self.flatten_mass(mass, importances=importances)
+        # angles are kept with mass for the random numbers from self.random
+        mass_f = self.flatten_mass(
+            [*mass, *(rnd_a or [])], importances=importances, rnd=rnd_w
+        )
         n_gen += int(mass_f[0].shape[0])
 
         # loop until number of generated events above required
@@ -120,17 +153,20 @@ class PhaseSpaceGenerator(object):
             # guess the total events required
             n_iter2 = int(1.01 * (n_total - n_gen) / (n_gen + 1) * n_iter)
             n_iter2 = min(n_iter2, 4000000)
-            mass2 = self.generate_mass(n_iter2)
-            mass_f2 = self.flatten_mass(mass2)
+            rnd_m, rnd_a, rnd_w = self.get_random(n_iter2)
+            mass2 = self.generate_mass(n_iter2, rnd_m)
+            mass_f2 = self.flatten_mass([*mass2, *(rnd_a or [])], rnd=rnd_w)
             n_gen += mass_f2[0].shape[0]
             n_total += n_iter2
             mass_f = [tf.concat([i, j], 0) for i, j in zip(mass_f, mass_f2)]
 
         if force:
             mass_f = [i[:n_iter] for i in mass_f]
-        return self.generate_momentum(mass_f)
+        n_mass = self.m_nt - 2
+        rnd_a = mass_f[n_mass:] if self.random is not None else None
+        return self.generate_momentum(mass_f[:n_mass], rnd=rnd_a)
 
-    def generate_momentum(self, mass, n_iter=None):
+    def generate_momentum(self, mass, n_iter=None, rnd=None):
         """generate random momentum from mass, boost them to a same rest frame"""
         if n_iter is None:
             n_iter = mass[0].shape[0]
@@ -142,20 +178,31 @@ class PhaseSpaceGenerator(object):
         p_list = []
         for i in range(0, self.m_nt - 1):
             p_list = self.generate_momentum_i(
-                mass_t[i + 1], mass_t[i], self.m_mass[-i - 2], n_iter, p_list
+                mass_t[i + 1],
+                mass_t[i],
+                self.m_mass[-i - 2],
+                n_iter,
+                p_list,
+                rnd=None if rnd is None else rnd[2 * i : 2 * i + 2],
             )
 
         return p_list
 
-    def generate_momentum_i(self, m0, m1, m2, n_iter, p_list=[]):
+    def generate_momentum_i(self, m0, m1, m2, n_iter, p_list=[], rnd=None):
         """
         :math:`|p|` =  m0,m1,m2 in m0 rest frame
         :param p_list: extra list for momentum need to boost
+        :param rnd: uniform random numbers for :math:`\\cos\\theta` and
+            :math:`\\phi`
         """
         # random angle
-        cos_theta = 2 * tf.random.uniform([n_iter], dtype="float64") - 1
+        if rnd is None:
+            rnd = [
+                tf.random.uniform([n_iter], dtype="float64") for _ in range(2)
+            ]
+        cos_theta = 2 * rnd[0] - 1
         sin_theta = tf.sqrt(1 - cos_theta * cos_theta)
-        phi = 2 * pi * tf.random.uniform([n_iter], dtype="float64")
+        phi = 2 * pi * rnd[1]
         # 4-momentum
         q = tf.broadcast_to(get_p(m0, m1, m2), phi.shape)
         p_0 = tf.sqrt(q * q + m2 * m2)
@@ -173,10 +220,15 @@ class PhaseSpaceGenerator(object):
             ret.append(LorentzVector.rest_vector(p_boost, i))
         return ret
 
-    def flatten_mass(self, ms, importances=True):
-        """sampling from mass with weight"""
-        weight = self.get_weight(ms, importances=importances)
-        rnd = tf.random.uniform(weight.shape, dtype="float64")
+    def flatten_mass(self, ms, importances=True, rnd=None):
+        """sampling from mass with weight
+
+        :param ms: list of mass, extra items after the inner masses are
+            selected in the same way
+        """
+        weight = self.get_weight(ms[: self.m_nt - 2], importances=importances)
+        if rnd is None:
+            rnd = tf.random.uniform(weight.shape, dtype="float64")
         select = weight > rnd
         return [tf.boolean_mask(i, select) for i in ms]
 
@@ -304,13 +356,26 @@ class ChainGenerator:
     m0 -> float
     mi -> float | struct
 
+    Each decay uses independent copies of **random** (see
+    `PhaseSpaceGenerator`).
+
     """
 
-    def __init__(self, m0, mi):
+    def __init__(self, m0, mi, random=None):
         struct = (m0, mi)
         self.struct = struct
         self.idxs, self.gen = _get_generator(struct)
         self.unpack_map = {}
+        self.set_random(random)
+
+    def set_random(self, random):
+        self.random = get_random(random)
+        if self.random is None:
+            randoms = [None] * len(self.gen)
+        else:
+            randoms = self.random.spawn(len(self.gen))
+        for gen, random in zip(self.gen, randoms):
+            gen.set_random(random)
 
     def generate(self, N):
         pi = [i.generate(N) for i in self.gen]
@@ -0,0 +1,33 @@
+import numpy as np
+
+from tf_pwa.adaptive_bins import AdaptiveBound, binned_numbers
+
+
+def test_bin_index():
+    np.random.seed(1)
+    data = np.random.normal(size=(3, 2000))
+    adapter = AdaptiveBound(data, [[2, 3, 2], [2, 2, 1]])
+    x = np.random.normal(size=(3, 5000)) * 1.5
+    idx = adapter.get_bin_index(x)
+    masks = []
+    for lb, rb in adapter.get_bounds():
+        mask = np.all((x >= lb[:, None]) & (x < rb[:, None]), axis=0)
+        masks.append(mask)
+        assert np.all(x[:, mask] >= lb[:, None])
+    for i, mask in enumerate(masks):
+        assert np.all((idx == i) == mask)
+    assert np.all((idx == -1) == ~np.any(masks, axis=0))
+    splited = adapter.split_data(x)
+    assert [i.shape[-1] for i in splited] == [np.sum(i) for i in masks]
+
+
+def test_binned_numbers():
+    np.random.seed(2)
+    data = np.random.normal(size=(2, 1000))
+    phsp = np.random.uniform(-3, 3, size=(2, 10000))
+    adapter = AdaptiveBound(data, [[2, 2], [2, 2]])
+    w = np.exp(-np.sum(phsp**2, axis=0) / 2)
+    numbers = binned_numbers(adapter, data, phsp, w)
+    assert numbers.shape == (16, 2)
+    assert np.allclose(numbers[:, 0], 1000 / 16, atol=2)
+    assert np.allclose(np.sum(numbers[:, 1]), 1000, rtol=0.01)
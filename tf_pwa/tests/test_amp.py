@@ -3,6 +3,7 @@ import pytest
 from tf_pwa.amp import *
 from tf_pwa.cal_angle import cal_angle_from_momentum
 from tf_pwa.model import FCN, Model
+from tf_pwa.phasespace import PhaseSpaceGenerator
 
 from .common import write_temp_file
 
@@ -145,6 +146,18 @@ def test_flatte():
     assert b.numpy().real == 0
 
 
+def test_lazy_model():
+    from tf_pwa.amp.core import _lazy_models
+
+    register_lazy_model(PARTICLE_MODEL, "lazy_flatte", "tf_pwa.amp.flatte")
+    assert get_particle_model("lazy_flatte") is None
+    assert "lazy_flatte" not in _lazy_models[PARTICLE_MODEL]
+    from tf_pwa.amp.flatte import ParticleFlatte
+
+    assert get_particle_model("Flatte") is ParticleFlatte
+    assert get_decay_model("LS-decay") is not None
+
+
 def test_gs():
     a = get_particle("gs", J=1, P=-1, model="GS_rho", mass=3.6, width=0.01)
     b = [get_particle(i, J=0, P=-1) for i in "ac"]
@@ -467,3 +480,150 @@ def test_gls_reduce_h0():
     p = dict(zip([b, c, d], test_data[0]))
     data = cal_angle_from_momentum(p, dg)
     amp1 = amp(data)
+
+
+def test_fuse_lineshape():
+    a = get_particle("A", J=0, P=-1, mass=5.0)
+    b = get_particle("B", J=0, P=-1, mass=1.0)
+    c = get_particle("C", J=0, P=-1, mass=0.5)
+    d = get_particle("D", J=0, P=-1, mass=0.5)
+    decs = []
+    for i, (J, P) in enumerate([(0, 1), (1, -1), (2, 1), (1, -1)]):
+        r = get_particle(f"R{i}", J=J, P=P, mass=2.0 + 0.2 * i, width=0.1)
+        decs += [[get_decay(a, [r, d]), get_decay(r, [b, c])]]
+    r = get_particle("R4", J=1, P=-1, mass=1.5, width=0.1)
+    decs += [[get_decay(a, [r, b]), get_decay(r, [c, d])]]
+    dg = DecayGroup(decs)
+    amp = AmplitudeModel(dg)
+    p = PhaseSpaceGenerator(5.0, [1.0, 0.5, 0.5]).generate(100)
+    data = cal_angle_from_momentum(dict(zip([b, c, d], p)), dg)
+    amp1 = amp(data)
+    DecayGroup.fuse_lineshape = False
+    try:
+        amp2 = amp(data)
+    finally:
+        DecayGroup.fuse_lineshape = True
+    assert np.allclose(amp1, amp2)
+
+
+def test_stack_chains():
+    a = get_particle("A", J=1, P=-1, spins=(-1, 1))
+    b = get_particle("B", J=1, P=-1, mass=1.0)
+    c = get_particle("C", J=0, P=-1, mass=0.5)
+    d = get_particle("D", J=1, P=-1, mass=0.5)
+    decs = []
+    for i in range(3):
+        r = get_particle(f"R{i}", J=1, P=1, mass=2.0 + 0.2 * i, width=0.1)
+        decs += [[get_decay(a, [r, d]), get_decay(r, [b, c])]]
+    for i in range(2):
+        r = get_particle(f"Z{i}", J=1, P=-1, mass=1.2 + 0.1 * i, width=0.1)
+        decs += [[get_decay(a, [r, b]), get_decay(r, [c, d])]]
+    dg = DecayGroup(decs)
+    amp = AmplitudeModel(dg)
+    p = PhaseSpaceGenerator(5.0, [1.0, 0.5, 0.5]).generate(100)
+    data = cal_angle_from_momentum(dict(zip([b, c, d], p)), dg)
+    amp1 = amp(data)
+    DecayGroup.stack_chains = True
+    try:
+        amp2 = amp(data)
+    finally:
+        DecayGroup.stack_chains = False
+    assert np.allclose(amp1, amp2)
+
+
+def test_sparse_helicity():
+    a = get_particle("A", J=0.5, P=1, mass=5.0)
+    b = get_particle("B", J=0.5, P=1, mass=1.0)
+    c = get_particle("C", J=1, P=-1, mass=0.5)
+    d = get_particle("D", J=1, P=-1, mass=0.0)
+    decs = []
+    for i in range(2):
+        r = get_particle(f"R{i}", J=1.5, P=1, mass=2.0 + 0.2 * i, width=0.1)
+        decs += [[get_decay(a, [r, d]), get_decay(r, [b, c])]]
+    r = get_particle("Z", J=1, P=-1, mass=1.5, width=0.1)
+    decs += [
+        [get_decay(a, [r, b]), get_decay(r, [c, d], model="helicity_full")]
+    ]
+    r = get_particle("X", J=0.5, P=1, mass=2.5, width=0.1)
+    decs += [
+        [get_decay(a, [r, c]), get_decay(r, [b, d], model="gls_reduce_h0")]
+    ]
+    dg = DecayGroup(decs)
+    amp = AmplitudeModel(dg)
+    amp.vm.set_all(np.random.normal(size=len(amp.vm.trainable_vars)))
+    p = PhaseSpaceGenerator(5.0, [1.0, 0.5, 0.0]).generate(100)
+    data = cal_angle_from_momentum(dict(zip([b, c, d], p)), dg)
+    for i in dg:
+        for j in i:
+            assert j.get_amp_mask() is not None
+    amp1 = amp(data)
+    for stack in [False, True]:
+        DecayGroup.stack_chains = stack
+        DecayChain.sparse_helicity = True
+        try:
+            amp2 = amp(data)
+        finally:
+            DecayGroup.stack_chains = False
+            DecayChain.sparse_helicity = False
+        assert np.allclose(amp1, amp2)
+
+
+def test_helicity_block():
+    a = get_particle("A", J=1, P=-1, mass=5.0, polarization="vector")
+    b1 = get_particle("B1", J=1, P=-1, mass=1.0)
+    b2 = get_particle("B2", J=1, P=-1, mass=1.0)
+    c = get_particle("C", J=0, P=-1, mass=0.5)
+    r = get_particle("R", J=1, P=1, mass=2.0, width=0.2)
+    s = get_particle("S", J=2, P=1, mass=2.5, width=0.2)
+    dg = DecayGroup(
+        [
+            [get_decay(a, [r, b2]), get_decay(r, [b1, c])],
+            [get_decay(a, [s, c]), get_decay(s, [b1, b2])],
+        ]
+    )
+    dg.identical_particles = [["B1", "B2"]]
+    amp = AmplitudeModel(dg)
+    amp.vm.set_all(np.random.normal(size=len(amp.vm.trainable_vars)))
+    p = PhaseSpaceGenerator(5.0, [1.0, 1.0, 0.5]).generate(100)
+    data = cal_angle_from_momentum(dict(zip([b1, b2, c], p)), dg)
+    assert "id_swap" in data
+    amp1 = amp.pdf(data)
+    for block in [1, 2]:
+        DecayGroup.helicity_block = block
+        try:
+            amp2 = amp.pdf(data)
+            amp3 = tf.function(amp.pdf)(data)
+        finally:
+            DecayGroup.helicity_block = None
+        assert np.allclose(amp1, amp2)
+        assert np.allclose(amp1, amp3)
+
+
+def test_tabulated():
+    a = get_particle("A", J=0, P=-1, mass=5.0)
+    b = get_particle("B", J=0, P=-1, mass=1.0)
+    c = get_particle("C", J=0, P=-1, mass=0.5)
+    d = get_particle("D", J=0, P=-1, mass=0.5)
+    r = get_particle("R", J=1, P=-1, mass=2.0, width=0.1, tabulated=True)
+    r2 = get_particle("R2", J=0, P=1, model="Kpi_Swave", tabulated=True)
+    dg = DecayGroup(
+        [
+            [get_decay(a, [r, d]), get_decay(r, [b, c])],
+            [get_decay(a, [r2, b]), get_decay(r2, [c, d])],
+        ]
+    )
+    amp = AmplitudeModel(dg)
+    p = PhaseSpaceGenerator(5.0, [1.0, 0.5, 0.5]).generate(100)
+    data = cal_angle_from_momentum(dict(zip([b, c, d], p)), dg)
+    amp1 = amp(data)
+    assert r.get_mass_range() == (1.5, 4.5)
+    assert r._lineshape_table.error < 1e-6
+    assert r2._lineshape_table.error < 1e-6
+    r.tabulated, r2.tabulated = False, False
+    amp2 = amp(data)
+    assert np.allclose(amp1, amp2, rtol=1e-4)
+    amp.set_params({"R_mass": 2.2})
+    amp3 = amp(data)
+    r.tabulated, r2.tabulated = True, True
+    assert np.allclose(amp(data), amp3, rtol=1e-4)
+    assert r._lineshape_table_key[0] == 2.2
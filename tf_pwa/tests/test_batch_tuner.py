@@ -0,0 +1,59 @@
+import numpy as np
+import tensorflow as tf
+import yaml
+
+from tf_pwa.batch_tuner import BatchTuner
+from tf_pwa.tests.test_full import ConfigLoader, gen_toy, this_dir
+
+
+def test_choose():
+    probes = [[1000, 1.0, 10.0], [2000, 1.05, 20.0], [4000, 3.0, 40.0]]
+    assert BatchTuner().choose(probes) == 2000
+    assert BatchTuner(memory_limit=15).choose(probes) == 1000
+    # nothing under the limit, by the linear fit of memory
+    assert 400 < BatchTuner(memory_limit=5).choose(probes) <= 500
+    # extrapolated to the memory limit
+    probes = [[1000, 1.0, 10.0], [2000, 1.0, 20.0]]
+    tuner = BatchTuner(memory_limit=100, max_batch=8000)
+    assert tuner.choose(probes, limited=True) == 8000
+    assert tuner.choose(probes, limited=False) == 2000
+
+
+def test_tune(tmp_path):
+    cache_file = str(tmp_path / "batch.json")
+    data = {"x": np.random.random((5000,))}
+    tuner = BatchTuner(cache_file=cache_file, min_batch=1000, repeat=1)
+    key = tuner.cache_key("model", "test")
+    f = lambda x: tf.reduce_sum(x["x"] ** 2)
+    batch = tuner.tune(f, data, key=key, multiple=3)
+    probes = tuner.results[key]["probes"]
+    assert batch in [i[0] for i in probes]
+    assert all(i[0] % 3 == 0 for i in probes)
+    assert tuner.tune(f, {"x": np.ones((10,))}, default=7) == 7
+
+    def no_call(x):
+        raise AssertionError("should be cached")
+
+    tuner2 = BatchTuner(cache_file=cache_file)
+    assert tuner2.tune(no_call, data, key=key) == batch
+
+
+def test_config_auto_batch(gen_toy, tmp_path):
+    with open(f"{this_dir}/config_toy.yml") as f:
+        dic = yaml.full_load(f)
+    cache_file = str(tmp_path / "batch.json")
+    dic["data"]["auto_batch"] = {"cache": cache_file, "min_batch": 2500}
+    config = ConfigLoader(dic)
+    config.set_params(f"{this_dir}/exp_params.json")
+    batch = config.get_batch("nll_grad")
+    assert batch in [2500, 5000, 10000]
+    assert config.get_batch("nll_grad", 1234) == 1234
+    fcn = config.get_fcn()
+    assert fcn.batch == batch
+    config2 = ConfigLoader(dic)
+    assert config2.get_batch("nll_grad") == batch
+    del dic["data"]["auto_batch"]
+    config3 = ConfigLoader(dic)
+    assert (
+        config3.get_batch("hessian") == ConfigLoader.default_batch["hessian"]
+    )
@@ -38,3 +38,54 @@ def test_process():
     data.savetxt("cal_angle_file.txt", ["C", "D"])
     data.savetxt("cal_angle_file.txt")
     hist = data.mass_hist("(C, D)")
+
+
+def test_id_swap():
+    from tf_pwa.phasespace import PhaseSpaceGenerator
+
+    a, b1, b2, c = [BaseParticle(i) for i in ["A", "B1", "B2", "C"]]
+    decs = DecayGroup(DecayChain.from_particles(a, [b1, b2, c]))
+    decs.identical_particles = [["B1", "B2"]]
+    structure = decs.topology_structure()
+    swap = {"B1": "B2", "B2": "B1"}
+    # (B1, B2)->B1+B2 is reversed by the swap
+    assert len(swap_decay_chain_map(structure, swap)) == 2
+    p4 = PhaseSpaceGenerator(3.0, [0.5, 0.5, 0.3]).generate(100)
+    p = dict(zip([b1, b2, c], p4))
+    data = cal_angle_from_momentum(p, decs, batch=30)
+    data = data_to_numpy(data)
+    assert len(data["id_swap"]) == 1
+    for (new_order, _), v in data["id_swap"].items():
+        p_swap = dict(zip(new_order, p.values()))
+        data_swap = cal_angle_from_momentum_base(p_swap, decs, batch=30)
+        data_swap = flatten_dict_data(data_to_numpy(data_swap))
+        v = flatten_dict_data(v)
+        assert set(v) == set(data_swap)
+        for k in v:
+            assert np.allclose(v[k], data_swap[k])
+
+
+def test_vectorized_kinematics():
+    from tf_pwa.config import temp_config
+    from tf_pwa.phasespace import PhaseSpaceGenerator
+
+    a, b, c, d, e = [BaseParticle(i) for i in ["A", "B", "C", "D", "E"]]
+    decs = DecayGroup(DecayChain.from_particles(a, [b, c, d, e]))
+    p4 = PhaseSpaceGenerator(4.0, [0.5, 0.5, 0.3, 0.3]).generate(100)
+    p = dict(zip([b, c, d, e], p4))
+    data = flatten_dict_data(data_to_numpy(cal_angle_from_momentum(p, decs)))
+    with temp_config(VECTORIZED_KINEMATICS, False):
+        data2 = cal_angle_from_momentum(p, decs)
+    data2 = flatten_dict_data(data_to_numpy(data2))
+    assert set(data) == set(data2)
+    for k in data:
+        if k.endswith("aligned_angle/alpha"):
+            # only alpha + gamma is defined for beta = 0
+            k2 = k[: -len("alpha")] + "gamma"
+            v, v2 = data[k] + data[k2], data2[k] + data2[k2]
+        elif k.endswith("aligned_angle/gamma"):
+            continue
+        else:
+            v, v2 = data[k], data2[k]
+        # angles of +pi and -pi are the same
+        assert np.allclose(np.exp(1j * v), np.exp(1j * v2))
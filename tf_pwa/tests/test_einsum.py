@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from tf_pwa.einsum import einsum, get_einsum_plan, sparse_einsum
+from tf_pwa.tensorflow_wrapper import tf
+
+
+@pytest.mark.parametrize("fused", [False, True])
+@pytest.mark.parametrize(
+    "expr,shapes",
+    [
+        ("...ab,...bc->...ac", [(10, 2, 4), (10, 4, 5)]),
+        (
+            "...a,...ab,...bc,...c->...",
+            [(10, 3), (10, 3, 1), (10, 1, 4), (10, 4)],
+        ),
+        (
+            "...aed,...ebc,...,...bB,...cC->...aBCd",
+            [(7, 2, 3, 1), (7, 3, 3, 3), (7,), (7, 3, 3), (7, 3, 3)],
+        ),
+        ("ab,bc->ac", [(2, 3), (3, 4)]),
+        # summed indices with the same order
+        ("...dbc,...bB,...cC->...BCd", [(5, 3, 2, 4), (5, 2, 2), (5, 4, 4)]),
+    ],
+)
+def test_einsum(expr, shapes, fused):
+    args = [tf.constant(np.random.normal(size=i)) for i in shapes]
+    ref = np.einsum(expr, *[i.numpy() for i in args])
+    assert np.allclose(einsum(expr, *args, fused=fused), ref)
+    n_plan = get_einsum_plan.cache_info().currsize
+    assert np.allclose(einsum(expr, *args, fused=fused), ref)
+    assert get_einsum_plan.cache_info().currsize == n_plan
+    if expr.startswith("..."):
+        spec = [tf.TensorSpec((None,) + i[1:], tf.float64) for i in shapes]
+        f = tf.function(
+            lambda *x: einsum(expr, *x, fused=fused), input_signature=spec
+        )
+        assert np.allclose(f(*args), ref)
+
+
+@pytest.mark.parametrize(
+    "expr,shapes",
+    [
+        ("...ard,...rbc,...->...abcd", [(10, 2, 4, 3), (10, 4, 2, 3), (10,)]),
+        ("...ab,...bc->...ac", [(10, 2, 4), (1, 4, 1)]),
+        ("ab,bc->ac", [(2, 3), (3, 4)]),
+    ],
+)
+def test_sparse_einsum(expr, shapes):
+    n_idx = [len(i) for i in expr.replace("...", "").split("->")[0].split(",")]
+    masks = [
+        np.random.random(i[len(i) - n :]) > 0.5 if n > 0 else None
+        for i, n in zip(shapes, n_idx)
+    ]
+    args = [
+        np.random.normal(size=i) * (1 if m is None else m)
+        for i, m in zip(shapes, masks)
+    ]
+    ref = np.einsum(expr, *args)
+    args = [tf.constant(i) for i in args]
+    assert np.allclose(sparse_einsum(expr, *args, masks=masks), ref)
+    zero = [np.zeros_like(m) if m is not None else None for m in masks]
+    assert np.allclose(sparse_einsum(expr, *args, masks=zero), 0.0)
+    if expr.startswith("..."):
+        spec = [tf.TensorSpec((None,) + i[1:], tf.float64) for i in shapes]
+        f = tf.function(
+            lambda *x: sparse_einsum(expr, *x, masks=masks),
+            input_signature=spec,
+        )
+        assert np.allclose(f(*args), ref)
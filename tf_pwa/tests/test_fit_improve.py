@@ -41,3 +41,20 @@ def test_minimize():
     ret = minimize(my_fit_fun, x0)
     print(ret)
     assert np.allclose(ret.x, np.ones_like(x0))
+
+
+def test_checkpoint(tmp_path):
+    def my_fit_fun(x):
+        return rosen(x), rosen_der(x)
+
+    x0 = np.array([2.0, 1.3, 0.7, 0.8, 1.9, 1.2])
+    ret = minimize(my_fit_fun, x0, options={"maxiter": 40})
+    checkpoint = str(tmp_path / "checkpoint.json")
+    options = {"checkpoint": checkpoint, "checkpoint_interval": 5}
+    ret1 = minimize(my_fit_fun, x0, options={"maxiter": 15, **options})
+    assert ret1.status == 2
+    ret2 = minimize(
+        my_fit_fun, x0, options={"maxiter": 40, "resume": True, **options}
+    )
+    assert np.all(ret2.x == ret.x)
+    assert ret2.nit == ret.nit
@@ -144,6 +144,24 @@ def test_save_model(toy_config):
     config.save_tensorflow_model("toy_data/model")
 
 
+def test_graph_cache(gen_toy):
+    with open(f"{this_dir}/config_toy.yml") as f:
+        dic = yaml.full_load(f)
+    dic["data"]["use_tf_function"] = True
+    dic["data"]["graph_cache"] = "toy_data/graph_cache"
+    ret = []
+    for i in range(2):
+        config = ConfigLoader(dic)
+        config.set_params(f"{this_dir}/exp_params.json")
+        fcn = config.get_fcn(batch=600)
+        fcn.nll_grad()
+        ret.append(fcn.nll_grad())
+    assert len(os.listdir("toy_data/graph_cache")) == 1
+    assert np.allclose(ret[0][0], ret[1][0])
+    assert np.allclose(ret[0][1], ret[1][1])
+    assert np.allclose(ret[0][0], -204.9468493307786)
+
+
 def test_cfit(gen_toy):
     config = ConfigLoader(f"{this_dir}/config_cfit.yml")
     config.set_params(f"{this_dir}/gen_params.json")
@@ -208,6 +226,71 @@ def test_precached(gen_toy):
     config.plot_partial_wave(prefix="toy_data/figure/s5")
 
 
+def test_nll_many(gen_toy):
+    for name in ["config_toy.yml", "config_precached.yml"]:
+        config = ConfigLoader(f"{this_dir}/{name}")
+        config.set_params(f"{this_dir}/gen_params.json")
+        fcn = config.get_fcn()
+        x0 = np.array(fcn.vm.get_all_val())
+        X = x0 + np.random.normal(scale=0.01, size=(3, x0.shape[0]))
+        nll = fcn.nll_many(X)
+        assert np.allclose(fcn.vm.get_all_val(), x0)
+        assert np.allclose(nll, [fcn(x) for x in X])
+
+
+def test_sample_fcn(gen_toy, tmp_path):
+    from tf_pwa.mcmc import sample_fcn
+
+    config = ConfigLoader(f"{this_dir}/config_precached.yml")
+    config.set_params(f"{this_dir}/gen_params.json")
+    fcn = config.get_fcn()
+    x0 = fcn.vm.get_all_val()
+    sampler = sample_fcn(
+        fcn, 3, chain_file=str(tmp_path / "chain"), report=1, seed=1
+    )
+    assert sampler.chain.shape == (3, 2 * (len(x0) + 1), len(x0))
+    assert np.allclose(fcn.vm.get_all_val(), x0)
+    assert np.all(np.isfinite(sampler.log_prob))
+
+
+def test_fit_staged(gen_toy):
+    from tf_pwa.data import data_shape
+    from tf_pwa.fit import fit_staged
+
+    config = ConfigLoader(f"{this_dir}/config_toy.yml")
+    fcn = config.get_fcn()
+    nll, g = fcn.nll_grad()
+    sub = fcn.subsample(1.0)
+    nll2, g2 = sub.nll_grad()
+    assert np.allclose(nll, nll2)
+    assert np.allclose(g, g2)
+    sub = fcn.subsample(0.5, seed=1)
+    assert data_shape(sub.data) < data_shape(fcn.data)
+    assert np.allclose(np.sum(sub.weight), np.sum(fcn.weight), rtol=0.1)
+    assert np.allclose(np.sum(sub.mc_weight), 1.0)
+    fit_result = fit_staged(fcn, n_init=500, stage_maxiter=5, maxiter=5)
+    stages = fit_result.extra["stages"]
+    assert len(stages) == 2
+    assert all(i["n_data"] < data_shape(fcn.data) for i in stages)
+
+
+def test_fit_checkpoint(gen_toy, tmp_path):
+    import json
+
+    config = ConfigLoader(f"{this_dir}/config_toy.yml")
+    checkpoint = str(tmp_path / "checkpoint.json")
+    config.fit(method="BFGS", maxiter=2, checkpoint=checkpoint)
+    with open(checkpoint) as f:
+        assert json.load(f)["nit"] == 2
+    fit_result = config.fit(
+        method="BFGS", maxiter=4, checkpoint=checkpoint, resume=True
+    )
+    with open(checkpoint) as f:
+        state = json.load(f)
+    assert state["nit"] == 4
+    assert np.allclose(fit_result.min_nll, state["fun"])
+
+
 def test_precached2(gen_toy):
     config = ConfigLoader(f"{this_dir}/config_precached2.yml")
     config.set_params(f"{this_dir}/gen_params.json")
@@ -274,6 +357,28 @@ def test_fit_lazy_call(gen_toy):
     config.cal_fitfractions()
 
 
+def test_lazy_call_sharded_cache(gen_toy, tmp_path):
+    with open(f"{this_dir}/config_toy.yml") as f:
+        config_dic = yaml.full_load(f)
+    config = ConfigLoader(config_dic)
+    config.set_params(f"{this_dir}/exp_params.json")
+    nll = config.get_fcn().nll_grad()[0]
+    config_dic["data"]["lazy_call"] = True
+    config_dic["data"]["cached_lazy_call"] = str(tmp_path) + "/"
+    config_dic["data"]["lazy_num_parallel"] = 2
+    config_dic["data"]["lazy_cache_chunk"] = 1500
+    config_dic["data"]["lazy_prefetch_memory"] = 10
+    shards = []
+    for batch in [1000, 700]:
+        config = ConfigLoader(config_dic)
+        config.set_params(f"{this_dir}/exp_params.json")
+        assert np.allclose(config.get_fcn(batch=batch).nll_grad()[0], nll)
+        shards.append(sorted(tmp_path.glob("s0phsp_chunk1500_*.index")))
+    # shards are shared by the batch sizes
+    assert len(shards[0]) > 1
+    assert shards[0] == shards[1]
+
+
 def test_cfit_resolution(gen_toy):
     with open(f"{this_dir}/config_rec.yml") as f:
         config_dic = yaml.full_load(f)
@@ -429,6 +534,24 @@ def test_fit_combine(toy_config2):
     toy_config2.plot_partial_wave(results)
 
 
+def test_combine_workers(gen_toy):
+    from tf_pwa.config import temp_config
+    from tf_pwa.model.model import COMBINE_FCN_WORKERS
+
+    config = MultiConfig(
+        [f"{this_dir}/config_toy.yml", f"{this_dir}/config_toy2.yml"]
+    )
+    fcn = config.get_fcn()
+    x = fcn.vm.get_all_val()
+    nll, g = fcn.nll_grad(x)
+    with temp_config(COMBINE_FCN_WORKERS, 2):
+        nll2, g2 = fcn.nll_grad(x)
+        nll3 = fcn(x)
+    assert np.allclose(nll, nll2)
+    assert np.allclose(g, g2)
+    assert np.allclose(nll, nll3, rtol=1e-3)
+
+
 def test_plot_combine(gen_toy):
     config = MultiConfig(
         [f"{this_dir}/config_plot2.yml", f"{this_dir}/config_toy.yml"],
@@ -477,3 +600,27 @@ def test_factor_hel():
     amp(phsp)
     amp.get_amp_list_part(phsp)
     amp.decay_group.get_factor()
+
+
+def test_significance_scan(gen_toy):
+    from tf_pwa.fit import FitResult
+
+    config = ConfigLoader(f"{this_dir}/config_toy.yml")
+    config.set_params(f"{this_dir}/exp_params.json")
+    fcn = config.get_fcn()
+    vm = fcn.vm
+    trainable = list(vm.trainable_vars)
+    params = vm.get_all_dic()
+    fit_result = FitResult(params, fcn, fcn.nll_grad()[0])
+    drops = ["R_BC", ["A->R_BD.C_g_ls_2r", "A->R_BD.C_g_ls_2i"]]
+    ret = config.significance_scan(drops, fit_result, maxiter=2)
+    assert ret["R_BC"]["ndf"] == 6
+    assert ret["A->R_BD.C_g_ls_2r,A->R_BD.C_g_ls_2i"]["ndf"] == 2
+    assert all(i["delta_NLL"] > 0 for i in ret.values())
+    assert vm.trainable_vars == trainable
+    new_params = vm.get_all_dic()
+    assert all(np.allclose(params[k], new_params[k]) for k in params)
+    ret2 = config.significance_scan(
+        drops[:1], fit_result, maxiter=2, n_workers=2
+    )
+    assert np.allclose(ret2["R_BC"]["NLL"], ret["R_BC"]["NLL"])
@@ -46,3 +46,51 @@ def test_spline_c_idx():
         amp = p(np.array([1.0, 3.0, 2.0, 4.0]))
 
     assert np.allclose(amp, [0.0, 1 + 1j, 0.0, 2 + 2j])
+
+
+def test_mass_cache():
+    from tf_pwa.amp import DecayGroup, HelicityDecay, get_particle
+    from tf_pwa.cal_angle import cal_angle_from_momentum
+    from tf_pwa.phasespace import PhaseSpaceGenerator
+
+    m = np.linspace(1.0, 3.0, 51)
+    for model in [
+        "interp_c",
+        "spline_c",
+        "interp1d3",
+        "interp_lagrange",
+        "interp_hist",
+        "spline_c_idx",
+        "interp_l3",
+    ]:
+        p = get_particle("a", model=model, min_m=1.0, max_m=3.0, interp_N=8)
+        with variable_scope() as vm:
+            p.init_params()
+            vm.set_all({k: np.random.random() for k in vm.trainable_vars})
+            cache = p.get_mass_cache(m)
+            amp = p.get_amp({"m": m, "mass_cache": {"a": cache}})
+            assert np.allclose(amp, p.interp(m))
+    p = get_particle("b", model="sppchip", min_m=1.0, max_m=3.0, interp_N=8)
+    assert p.get_mass_cache(m) is None
+
+    a, b, c, d = [get_particle(i, J=0, P=-1) for i in "ABCD"]
+    a.mass = 3.0
+    r = get_particle(
+        "R", J=0, P=1, model="spline_c", min_m=0.5, max_m=2.5, interp_N=10
+    )
+    decs = DecayGroup([[HelicityDecay(a, [r, d]), HelicityDecay(r, [b, c])]])
+    p4 = PhaseSpaceGenerator(3.0, [0.2, 0.2, 0.2]).generate(1000)
+    data = cal_angle_from_momentum(dict(zip([b, c, d], p4)), decs)
+    with variable_scope() as vm:
+        decs.init_params()
+        vm.set_all({k: np.random.random() for k in vm.trainable_vars})
+        amp = decs.get_amp(data)
+        data = decs.build_mass_cache(data)
+        cached = [
+            i["mass_cache"]
+            for i in data["particle"].values()
+            if "mass_cache" in i
+        ]
+        assert len(cached) == 1 and "R" in cached[0]
+        amp2 = decs.get_amp(data)
+    assert np.allclose(amp, amp2)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from tf_pwa.linalg import small_inv, small_solve
+from tf_pwa.tensorflow_wrapper import tf
+
+
+def random_complex(*shape):
+    return np.random.random(shape) + 1.0j * np.random.random(shape)
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 4, 5, 6])
+@pytest.mark.parametrize("adjoint", [False, True])
+def test_small_solve(n, adjoint):
+    a = tf.constant(random_complex(20, n, n) + 2 * np.eye(n))
+    b = tf.constant(random_complex(20, n, 2))
+    w = tf.constant(random_complex(20, n, 2))
+    with tf.GradientTape(persistent=True) as tape:
+        tape.watch([a, b])
+        x = small_solve(a, b, adjoint=adjoint)
+        y = tf.math.real(tf.reduce_sum(x * w))
+        x2 = tf.linalg.solve(a, b, adjoint=adjoint)
+        y2 = tf.math.real(tf.reduce_sum(x2 * w))
+    assert np.allclose(x, x2)
+    for i, j in zip(tape.gradient(y, [a, b]), tape.gradient(y2, [a, b])):
+        assert np.allclose(i, j)
+
+
+def test_small_inv():
+    a = random_complex(20, 3, 3) + 2 * np.eye(3)
+    assert np.allclose(small_inv(a), np.linalg.inv(a))
+    b = random_complex(3, 1)
+    x = np.linalg.solve(a, np.broadcast_to(b, (20, 3, 1)))
+    assert np.allclose(small_solve(a, b), x)
@@ -0,0 +1,45 @@
+import numpy as np
+
+from tf_pwa.mcmc import EnsembleSampler, autocorr_time
+
+
+def log_prob(x):
+    return -np.sum(x**2 / np.array([1.0, 4.0]), axis=-1) / 2
+
+
+def test_ensemble_sampler():
+    sampler = EnsembleSampler(log_prob, 20, 2, seed=1)
+    x0 = np.random.normal(size=(20, 2))
+    chain = sampler.run(x0, 2000, report=500)
+    assert chain.shape == (2000, 20, 2)
+    assert np.allclose(sampler.log_prob, log_prob(chain))
+    assert np.all(np.abs(np.std(chain[500:], axis=(0, 1)) - [1, 2]) < 0.2)
+    assert 0.2 < np.mean(sampler.acceptance_fraction) < 0.9
+    tau = sampler.get_autocorr_time(500)
+    assert np.all(tau > 1) and np.all(tau < 100)
+    assert np.allclose(sampler.get_ess(500), 1500 * 20 / tau)
+
+
+def test_resume(tmp_path):
+    x0 = np.random.normal(size=(8, 2))
+    chain_file = str(tmp_path / "chain")
+    full = EnsembleSampler(log_prob, 8, 2, seed=2).run(x0, 60, report=0)
+    sampler = EnsembleSampler(
+        log_prob, 8, 2, chain_file=chain_file, checkpoint=10, seed=2
+    )
+    sampler.run(x0, 30, report=0)
+    del sampler
+    # resume from checkpoint, and extend the chain file
+    sampler = EnsembleSampler(log_prob, 8, 2, chain_file=chain_file, seed=3)
+    chain = sampler.run(None, 60, report=0)
+    assert np.allclose(chain, full)
+    assert np.load(chain_file + ".npy").shape == (60, 8, 3)
+
+
+def test_autocorr_time():
+    x = np.zeros((5000, 4, 1))
+    noise = np.random.normal(size=x.shape)
+    for i in range(1, 5000):
+        x[i] = 0.9 * x[i - 1] + noise[i]
+    # tau = (1 + rho) / (1 - rho)
+    assert abs(autocorr_time(x)[0] - 19) < 4
@@ -35,3 +35,36 @@ def test_uniform():
     b = a.generate(10).numpy()
     assert np.all(b < 2.0)
     assert np.all(b >= 1.0)
+
+
+@pytest.mark.parametrize("random", ["sobol", "stratified"])
+def test_quasi_random(random):
+    a = PhaseSpaceGenerator(10, [3, 2, 1], random=random)
+    data = a.generate(100)
+    for i, m in zip(data, [3, 2, 1]):
+        assert i.shape == (100, 4)
+        assert np.allclose(LorentzVector.M(i), m)
+    p_all = data[0] + data[1] + data[2]
+    assert np.allclose(LorentzVector.M(p_all), 10)
+    w, data = a.generate(100, flatten=False)
+    assert w.shape == (100,)
+    (b, c), d = ChainGenerator(5.0, ((3.0, (1.0, 1.0)), 1.0), random).generate(
+        100
+    )
+    assert np.allclose(LorentzVector.M(b + c + d), 5.0)
+
+
+def test_integral_replicas():
+    from tf_pwa.generator.qmc import integral_replicas
+
+    def f(p):
+        return LorentzVector.M(p[0] + p[1]) ** 2
+
+    gen = PhaseSpaceGenerator(3.0, [0.5, 0.5, 0.3])
+    value, error = integral_replicas(f, gen, 2**14, 16, seed=1)
+    value2, error2 = integral_replicas(
+        f, gen, 2**14, 16, random="sobol", seed=1, weighted=True
+    )
+    assert gen.random is None
+    assert abs(value - value2) < 5 * error
+    assert error2 < error / 3
@@ -188,3 +188,28 @@ def test_transform():
     vm.set("a", 1.0)
     assert vm.get_all_dic(False) == {"a": 2.0, "b": 1.0, "c": 1.0}
     print(vm.get_all_dic(True))
+
+
+def test_propagate_error():
+    with variable_scope() as vm:
+        a = Variable("a", value=1.0)
+        b = Variable("b", value=2.0)
+    err_matrix = np.array([[0.01, 0.002], [0.002, 0.04]])
+
+    def f():
+        return {"x": a() * b(), "y": [tf.stack([a() + b(), a() - b()])]}
+
+    jac = np.array([[2.0, 1.0], [1.0, 1.0], [1.0, -1.0]])
+    err_ref = np.sqrt(np.diag(jac @ err_matrix @ jac.T))
+    with vm.error_trans(err_matrix) as pt:
+        vals = f()
+    err = pt.get_error(vals)
+    assert np.allclose(err["x"], err_ref[0])
+    assert np.allclose(err["y"][0], err_ref[1:])
+    for method in ["reverse", "forward"]:
+        err, err_m = pt.propagate_error(f, method=method)
+        assert np.allclose(err["y"][0], err_ref[1:])
+        assert np.allclose(err_m, jac @ err_matrix @ jac.T)
+    err, err_m = pt.propagate_error(f, method="sample", n_sample=4000, seed=1)
+    assert np.allclose(err["y"][0], err_ref[1:], rtol=0.1)
+    assert np.allclose(vm.get_all_val(), [1.0, 2.0])
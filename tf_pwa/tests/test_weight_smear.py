@@ -1,3 +1,4 @@
+import numpy as np
 import yaml
 
 from tf_pwa.tests.test_full import ConfigLoader, gen_toy, this_dir
@@ -31,3 +32,22 @@ def test_gamma(gen_toy):
 def test_get_weight_smear():
     get_weight_smear("Gamma")
     get_weight_smear({"name": "Gamma"})
+
+
+def test_bootstrap(gen_toy):
+    from tf_pwa.bootstrap import BootstrapFCN
+
+    config = ConfigLoader(f"{this_dir}/config_toy.yml")
+    config.set_params(f"{this_dir}/exp_params.json")
+    fcn = config.get_fcn()
+    x0 = np.array(fcn.vm.get_all_val())
+    bs = BootstrapFCN(fcn, 2, seed=1)
+    nll, g = bs.nll_grad_replicas(x0)
+    nll2, g2 = bs.nll_grad_many(np.tile(x0, (2, 1)))
+    assert np.allclose(nll, nll2)
+    assert np.allclose(g, g2)
+    assert np.allclose(fcn.vm.get_all_val(), x0)
+    x = bs.fit(x0, hess_inv=np.eye(x0.shape[0]) * 1e-3, maxiter=2)
+    assert x.shape == (2, x0.shape[0])
+    assert np.all(bs.nll < nll)
+    assert len(bs.get_params_error()) == x0.shape[0]
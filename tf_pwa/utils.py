@@ -2,6 +2,7 @@
 This module provides some functions that may be useful in other modules.
 """
 import functools
+import importlib
 import json
 import math
 import time
@@ -15,6 +16,45 @@ class AttrDict(dict):
     __getattr__ = dict.__getitem__
 
 
+class LazyModule(object):
+    """Proxy of module `name`, the module is only imported when one of its
+    attributes is required.
+
+    >>> np2 = LazyModule("numpy")
+    >>> float(np2.sqrt(4.0))
+    2.0
+    >>> np2 == np
+    True
+
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        if self._module is None:
+            self.__dict__["_module"] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyModule):
+            return self._name == other._name
+        return getattr(other, "__name__", None) == self._name
+
+    def __hash__(self):
+        return hash(self._name)
+
+    def __repr__(self):
+        return "<lazy module '{}'>".format(self._name)
+
+
 has_yaml = True
 try:
     import yaml
@@ -5,11 +5,13 @@ import contextlib
 import warnings
 
 import numpy as np
-import sympy as sy
 
 from .config import get_config, regist_config
 from .params_trans import ParamsTrans
 from .tensorflow_wrapper import tf
+from .utils import LazyModule
+
+sy = LazyModule("sympy")
 
 
 def combineVM(vm1, vm2, name="", same_list=None):
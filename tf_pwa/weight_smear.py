@@ -19,15 +19,18 @@ def get_weight_smear(name):
 
 
 @register_weight_smear("Poisson")
-def poisson_smear(weight, **kwargs):
-    return weight * np.random.poisson(size=weight.shape[0])
+def poisson_smear(weight, rng=None, **kwargs):
+    rng = np.random if rng is None else rng
+    return weight * rng.poisson(size=weight.shape[0])
 
 
 @register_weight_smear("Dirichlet")
-def dirichlet_smear(weight, **kwargs):
-    return weight * np.random.dirichlet(weight) * np.sum(weight)
+def dirichlet_smear(weight, rng=None, **kwargs):
+    rng = np.random if rng is None else rng
+    return weight * rng.dirichlet(weight) * np.sum(weight)
 
 
 @register_weight_smear("Gamma")
-def gamma_smear(weight, **kwargs):
-    return weight * np.random.gamma(1, size=weight.shape[0])
+def gamma_smear(weight, rng=None, **kwargs):
+    rng = np.random if rng is None else rng
+    return weight * rng.gamma(1, size=weight.shape[0])
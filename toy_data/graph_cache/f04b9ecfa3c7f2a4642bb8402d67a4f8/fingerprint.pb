@@ -0,0 +1 @@
+ῖ" ^(2:'238098944726346714507716773468929880356
\ No newline at end of file
@@ -0,0 +1 @@
+ɩ؁* (2:&42353545902978644712966509191920376884
\ No newline at end of file